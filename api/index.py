@@ -3,21 +3,52 @@ Main API handler for Vercel serverless deployment
 Handles all API endpoints for WordPress Link Manager
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Header, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.routing import Match
 from pydantic import BaseModel, HttpUrl
-from typing import List, Optional, Dict, Any
+from contextlib import ExitStack
+from typing import List, Optional, Dict, Any, Tuple
+import asyncio
+import codecs
 import logging
 import os
+import re
+import time
+from datetime import datetime
 
 # Import utilities
 from utils.config import load_websites_config, get_website_config, save_websites_config, WebsiteConfig
-from utils.wordpress import add_link_to_wordpress, test_wordpress_connection
+from utils.wordpress import (add_link_to_wordpress, test_wordpress_connection, collect_site_links, add_shard_listener,
+                             ERROR_NOT_FOUND, LinkResponse as LinkResult)
+from utils.idempotency import IdempotencyStore, IdempotencyKeyConflict, request_fingerprint, REPLAYED_HEADER
+from utils.log_pipeline import setup_logging
+from utils.serialization import FastJSONResponse, GZIP_MINIMUM_SIZE, GZIP_COMPRESS_LEVEL
+from utils.website_index import make_etag, etag_matches
+from utils.config_snapshot import ConfigSnapshot, ConfigStore, replace_config, with_continuation_pages
+from utils.liveness import link_checker
+from utils.site_import import import_overview, configured_sites, site_key
+from utils.page_discovery import discover_page_ids, DEFAULT_SLUGS
+from utils.website_batch import plan_website_batch
+from utils.link_matrix import run_link_matrix
+from utils.latency import latency_profile
+from utils.rate_limit import rate_limiter
+from utils.profiling import (PROFILING_TOKEN, CPROFILE_THREAD_NOTE, ProfileSession, ProfilerBusy, memory_tracker,
+                             request_profile_mode, token_valid)
+from utils.http_client import PREWARM_CONNECTIONS, prewarm_new_sites
+from utils import deadline
+from utils.deadline import (Deadline, InvalidContinuationToken, request_digest, encode_continuation,
+                            decode_continuation, CONTINUATION_HEADER, REMAINING_HEADER)
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging - no background writer on Vercel, the function may be frozen between invocations
+setup_logging(use_queue=not os.environ.get("VERCEL_ENV"))
 logger = logging.getLogger(__name__)
 
+if not deadline.CONTINUATION_SECRET:
+    logger.warning("⚠️ CONTINUATION_SECRET is not set: /add-bulk-links continuation tokens can be forged")
+
 # Initialize FastAPI app
 app = FastAPI(
     title="WordPress Link Manager API",
@@ -39,8 +70,47 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=[CONTINUATION_HEADER, REMAINING_HEADER, REPLAYED_HEADER],
 )
 
+# Compress large responses (e.g. /websites, /add-bulk-links) for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
+def route_endpoint(request: Request):
+    """Endpoint function of the route that will handle request (None when no route matches)"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "endpoint", None)
+    return None
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    With X-Profile: sampling|cprofile and a valid X-Profile-Token, run the request under that
+    profiler; the profile file is returned in X-Profile-File (X-Profile-Skipped says why not).
+    cprofile requests to sync endpoints are sampled instead; X-Profile-Mode and X-Profile-Note say so
+    """
+    requested = request.headers.get("x-profile")
+    if not requested or not token_valid(request.headers.get("x-profile-token")):
+        return await call_next(request)
+    mode = request_profile_mode(requested, route_endpoint(request))
+    with ExitStack() as stack:
+        try:
+            session = stack.enter_context(ProfileSession(mode, "request" + request.url.path.replace("/", "-")))
+        except (ProfilerBusy, ValueError) as e:
+            response = await call_next(request)
+            response.headers["X-Profile-Skipped"] = str(e)
+            return response
+        response = await call_next(request)
+    response.headers["X-Profile-File"] = session.path
+    response.headers["X-Profile-Mode"] = mode
+    if mode != requested:
+        response.headers["X-Profile-Note"] = "sync endpoint runs in a worker thread; sampled instead of cprofile"
+    elif mode == "cprofile":
+        response.headers["X-Profile-Note"] = CPROFILE_THREAD_NOTE
+    return response
+
 # Pydantic models
 class LinkRequest(BaseModel):
     anchor_text: str
@@ -53,6 +123,19 @@ class BulkLinkRequest(BaseModel):
     link_url: HttpUrl
     website_urls: List[str]
     page_id: Optional[int] = None
+    check_link: bool = False  # Refuse the whole request if link_url does not resolve
+    time_budget_seconds: Optional[float] = None  # Stop starting new sites when this runs low
+    continuation_token: Optional[str] = None  # From X-Continuation-Token of the previous response
+
+class LinkMatrixEntry(BaseModel):
+    website_url: str
+    anchor_text: str
+    link_url: HttpUrl
+
+class LinkMatrixRequest(BaseModel):
+    entries: List[LinkMatrixEntry]  # (site, anchor, url) triples; one page write per site
+    page_id: Optional[int] = None
+    max_workers: int = 8
 
 class WebsiteRequest(BaseModel):
     website_url: str
@@ -60,6 +143,7 @@ class WebsiteRequest(BaseModel):
     page_id: int
     username: str
     app_password: str
+    max_page_bytes: Optional[int] = None  # Link page size before continuing on a new page
 
 class UpdateWebsiteRequest(BaseModel):
     original_url: str
@@ -68,6 +152,25 @@ class UpdateWebsiteRequest(BaseModel):
     page_id: int
     username: str
     app_password: str
+    max_page_bytes: Optional[int] = None  # Link page size before continuing on a new page
+
+class WebsiteBatchRequest(BaseModel):
+    add: List[WebsiteRequest] = []
+    update: List[UpdateWebsiteRequest] = []
+    delete: List[str] = []  # Website URLs
+    atomic: bool = True  # Apply nothing when any item fails
+
+class PageDiscoveryRequest(BaseModel):
+    website_urls: Optional[List[str]] = None  # Defaults to every site without a page_id
+    slugs: Optional[List[str]] = None  # Link page slugs to look for, most likely first
+    title_pattern: Optional[str] = None  # Case-insensitive regex on page titles
+    apply: bool = False  # Store found page IDs in the config instead of only proposing them
+    refresh: bool = False  # Fetch page listings again instead of using the cache
+
+class LinkCheckRequest(BaseModel):
+    link_urls: List[str] = []
+    website_urls: Optional[List[str]] = None  # Also check the links already on these sites' pages
+    all_websites: bool = False  # Also check the links on every configured site
 
 class LinkResponse(BaseModel):
     success: bool
@@ -75,9 +178,14 @@ class LinkResponse(BaseModel):
     website_url: str
     page_id: int
     link_added: bool = False
+    error: Optional[str] = None  # timeout, connection, http, not_found or error when success is false
+    fetch_ms: Optional[float] = None
+    update_ms: Optional[float] = None
 
 class WebsiteListResponse(BaseModel):
     websites: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
 
 class WebsiteResponse(BaseModel):
     success: bool
@@ -85,15 +193,33 @@ class WebsiteResponse(BaseModel):
     website_url: str
     site_name: str
 
-# Global variable to store website configs (loaded on each request in serverless)
-websites_config: List[WebsiteConfig] = []
+# Website configs, published as immutable snapshots (loaded lazily in serverless)
+config_store = ConfigStore()
+if PREWARM_CONNECTIONS:
+    # Open DNS + keep-alive connections to the sites of each (re)loaded config in the background
+    config_store.add_listener(prewarm_new_sites)
+
+# Outcomes per Idempotency-Key (kept for the lifetime of a warm serverless instance)
+idempotency_store = IdempotencyStore(
+    ttl_seconds=float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 24 * 3600)),
+    replay_exceptions=(HTTPException,)
+)
 
-def ensure_config_loaded():
-    """Ensure website configuration is loaded"""
-    global websites_config
-    if not websites_config:
-        websites_config = load_websites_config()
-    return websites_config
+def ensure_config_loaded() -> ConfigSnapshot:
+    """Ensure website configuration is loaded; returns the current snapshot"""
+    snapshot = config_store.current
+    if not snapshot.configs:
+        snapshot = config_store.replace(load_websites_config(), loaded_at=datetime.now().isoformat())
+    return snapshot
+
+def record_continuation_page(config: WebsiteConfig, page_ids: List[int]):
+    """Publish the continuation pages used once a site's link page was full and persist them (only possible outside Vercel)"""
+    ensure_config_loaded()
+    snapshot = config_store.update(lambda snapshot: with_continuation_pages(snapshot, config, page_ids))
+    if not save_websites_config(snapshot):
+        logger.warning(f"⚠️ Continuation pages {page_ids} for {config.website_url} are only kept in memory")
+
+add_shard_listener(record_continuation_page)
 
 # API Endpoints
 @app.get("/")
@@ -105,6 +231,51 @@ async def root():
         "environment": os.environ.get("VERCEL_ENV", "development")
     }
 
+@app.get("/latency-profile")
+async def get_latency_profile(limit: Optional[int] = Query(None, ge=1, le=1000)):
+    """Per-site GET/update latency (EWMA and p95), slowest sites first"""
+    sites = latency_profile.report(limit)
+    return {"sites": sites, "total": len(sites)}
+
+@app.get("/rate-limit")
+async def get_rate_limit():
+    """Outbound rate limits (WP_RATE_LIMIT_*) and how often they throttled requests"""
+    return rate_limiter.stats()
+
+def require_profiling_token(token: Optional[str]):
+    """Profiling is only available with PROFILING_TOKEN set and sent as X-Profile-Token"""
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not token_valid(token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@app.post("/debug/profile")
+async def profile_process(seconds: float = Query(10, gt=0, le=300), mode: str = "sampling",
+                          x_profile_token: Optional[str] = Header(None)):
+    """
+    Profile the whole process for a number of seconds; returns the profile file
+    Only sampling sees every thread; cprofile profiles the event loop (see note in the response)
+    """
+    require_profiling_token(x_profile_token)
+    try:
+        with ProfileSession(mode, "process") as session:
+            await asyncio.sleep(seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"mode": mode, "seconds": seconds, "path": session.path,
+            "note": CPROFILE_THREAD_NOTE if mode == "cprofile" else None}
+
+@app.post("/debug/memory-snapshot")
+async def memory_snapshot(stop: bool = False, x_profile_token: Optional[str] = Header(None)):
+    """
+    tracemalloc snapshot with the largest growth since the first snapshot
+    Tracing starts with the first call and costs memory and CPU until a call with stop=true
+    """
+    require_profiling_token(x_profile_token)
+    return await run_in_threadpool(memory_tracker.stop if stop else memory_tracker.snapshot)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -117,9 +288,24 @@ async def health_check():
     }
 
 @app.get("/websites", response_model=WebsiteListResponse)
-async def get_websites():
-    """Get list of available websites"""
-    configs = ensure_config_loaded()
+async def get_websites(
+    request: Request,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """Get list of available websites (searchable with q, paginated with cursor/limit, ETag/304 aware)"""
+    snapshot = ensure_config_loaded()
+    etag = make_etag(snapshot.loaded_at, snapshot.version, q, cursor, limit)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        configs, next_cursor, total = snapshot.index.page(q, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     websites = [
         {
             "website_url": config.website_url,
@@ -128,10 +314,9 @@ async def get_websites():
         }
         for config in configs
     ]
-    return WebsiteListResponse(websites=websites)
+    return FastJSONResponse({"websites": websites, "next_cursor": next_cursor, "total": total}, headers=headers)
 
-@app.post("/add-link", response_model=LinkResponse)
-async def add_link(request: LinkRequest):
+def process_link_request(request: LinkRequest) -> LinkResponse:
     """Add a single link to a WordPress website"""
     configs = ensure_config_loaded()
     config = get_website_config(request.website_url, configs)
@@ -151,43 +336,331 @@ async def add_link(request: LinkRequest):
     
     return LinkResponse(**result.to_dict())
 
-@app.post("/add-bulk-links", response_model=List[LinkResponse])
-async def add_bulk_links(request: BulkLinkRequest):
-    """Add the same link to multiple WordPress websites"""
+def bulk_time_budget(request: BulkLinkRequest) -> Optional[float]:
+    """
+    Time budget for one bulk invocation
+    BULK_TIME_BUDGET_SECONDS, or 8s on Vercel (hobby functions are killed at 10s); a smaller
+    time_budget_seconds in the request wins
+    """
+    budgets = [request.time_budget_seconds]
+    if os.environ.get("BULK_TIME_BUDGET_SECONDS"):
+        budgets.append(float(os.environ["BULK_TIME_BUDGET_SECONDS"]))
+    elif os.environ.get("VERCEL_ENV"):
+        budgets.append(8.0)
+    budgets = [budget for budget in budgets if budget is not None]
+    return min(budgets) if budgets else None
+
+def process_bulk_link_request(request: BulkLinkRequest) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+    """
+    Add the same link to multiple WordPress websites within the time budget
+    Returns (results, continuation token or None, number of sites left)
+    """
     configs = ensure_config_loaded()
     results = []
     
-    for website_url in request.website_urls:
+    digest = request_digest(request.anchor_text, str(request.link_url), request.website_urls, request.page_id)
+    offset = 0
+    if request.continuation_token:
+        try:
+            offset = decode_continuation(request.continuation_token, digest)
+        except InvalidContinuationToken as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if request.check_link and offset == 0:
+        ensure_link_target_alive(str(request.link_url))
+    
+    deadline = Deadline(bulk_time_budget(request))
+    website_urls = request.website_urls[offset:]
+    
+    for done, website_url in enumerate(website_urls):
+        # Always make progress, then only start a site if the slowest one so far still fits
+        if done > 0 and not deadline.can_start():
+            remaining = len(website_urls) - done
+            logger.info(f"⏳ Time budget running low, {remaining} sites left for a follow-up call")
+            return results, encode_continuation(offset + done, digest), remaining
+        
+        site_started = time.monotonic()
         config = get_website_config(website_url, configs)
         if not config:
-            results.append(LinkResponse(
-                success=False,
-                message="Website configuration not found",
-                website_url=website_url,
-                page_id=request.page_id or 0
-            ))
+            results.append(LinkResult(success=False, message="Website configuration not found", website_url=website_url,
+                                      page_id=request.page_id or 0, error=ERROR_NOT_FOUND).to_dict())
             continue
         
         result = add_link_to_wordpress(
             config=config,
             anchor_text=request.anchor_text,
             link_url=str(request.link_url),
-            page_id=request.page_id
+            page_id=request.page_id,
+            timeout=int(max(1, min(60, deadline.remaining())))
         )
+        deadline.record(time.monotonic() - site_started)
         
-        results.append(LinkResponse(**result.to_dict()))
+        results.append(result.to_dict())
     
-    return results
+    return results, None, 0
+
+async def run_idempotent(endpoint: str, idempotency_key: Optional[str], request: BaseModel, func):
+    """
+    Run a blocking link operation, answering repeats of the same Idempotency-Key from the store
+    Returns (result, replayed)
+    
+    The follow-up calls of a bulk run reuse its key: the continuation token selects which call
+    of the run is answered and is left out of the payload the key is bound to
+    """
+    if not idempotency_key:
+        return await run_in_threadpool(func, request), False
+    
+    step = getattr(request, "continuation_token", None) or ""
+    try:
+        return await idempotency_store.execute(
+            f"{endpoint}:{idempotency_key}:{step}",
+            request_fingerprint(request.model_dump_json(exclude={"continuation_token"})),
+            lambda: run_in_threadpool(func, request)
+        )
+    except IdempotencyKeyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/add-link", response_model=LinkResponse)
+async def add_link(request: LinkRequest, response: Response, idempotency_key: Optional[str] = Header(None)):
+    """Add a single link to a WordPress website"""
+    result, replayed = await run_idempotent("add-link", idempotency_key, request, process_link_request)
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
+
+@app.post("/add-bulk-links", responses={200: {"model": List[LinkResponse]}})
+async def add_bulk_links(request: BulkLinkRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Add the same link to multiple WordPress websites
+    If the time budget runs out, the response carries X-Continuation-Token; send the same
+    request again with continuation_token set to finish the remaining sites (with the same
+    Idempotency-Key, if the first call had one)
+    """
+    (results, continuation_token, remaining), replayed = await run_idempotent(
+        "add-bulk-links", idempotency_key, request, process_bulk_link_request)
+    
+    headers = {}
+    if replayed:
+        headers[REPLAYED_HEADER] = "true"
+    if continuation_token:
+        headers[CONTINUATION_HEADER] = continuation_token
+        headers[REMAINING_HEADER] = str(remaining)
+    # Every row is a LinkResult.to_dict(), so it matches LinkResponse; it is documented, not re-validated
+    return FastJSONResponse(results, headers=headers)
+
+def process_link_matrix_request(request: LinkMatrixRequest) -> List[Dict[str, Any]]:
+    """Add (site, anchor, url) triples with one read-modify-write per site page"""
+    snapshot = ensure_config_loaded()
+    entries = [
+        {"website_url": entry.website_url, "anchor_text": entry.anchor_text, "link_url": str(entry.link_url)}
+        for entry in request.entries
+    ]
+    return run_link_matrix(
+        entries,
+        lambda website_url: get_website_config(website_url, snapshot),
+        page_id=request.page_id,
+        max_workers=max(1, min(request.max_workers, 32))
+    )
+
+@app.post("/add-link-matrix")
+async def add_link_matrix(request: LinkMatrixRequest, idempotency_key: Optional[str] = Header(None)):
+    """Add several links across overlapping sets of sites; one result per (site, anchor, url)"""
+    results, replayed = await run_idempotent("add-link-matrix", idempotency_key, request, process_link_matrix_request)
+    return FastJSONResponse(results, headers={REPLAYED_HEADER: "true"} if replayed else None)
+
+def ensure_link_target_alive(link_url: str):
+    """Pre-flight check for bulk requests: refuse dead targets before touching any site"""
+    status = link_checker.check(link_url)
+    if not status["alive"]:
+        reason = status["error"] or f"HTTP {status['status_code']}"
+        raise HTTPException(status_code=422, detail=f"Link target {link_url} is not reachable ({reason})")
+
+def process_link_check_request(request: LinkCheckRequest) -> Dict[str, Any]:
+    """Check requested link targets plus the ones already inserted on the selected sites"""
+    configs = ensure_config_loaded()
+    found_on: Dict[str, List[str]] = {url: [] for url in request.link_urls}
+    
+    if request.all_websites:
+        scan = list(configs)
+    else:
+        scan = [config for config in (get_website_config(url, configs) for url in request.website_urls or []) if config]
+    for url, sites in collect_site_links(scan).items():
+        found_on.setdefault(url, []).extend(sites)
+    
+    results = link_checker.check_many(found_on)
+    for result in results:
+        result["found_on"] = found_on[result["url"]]
+    dead = sum(1 for result in results if not result["alive"])
+    logger.info(f"🔎 Checked {len(results)} link targets, {dead} dead")
+    return {"checked": len(results), "dead": dead, "results": results}
+
+@app.post("/check-links")
+async def check_links(request: LinkCheckRequest):
+    """Check link targets concurrently (HEAD with GET fallback, results cached with TTL)"""
+    return FastJSONResponse(await run_in_threadpool(process_link_check_request, request))
+
+def apply_imported_websites(imported: List[Dict[str, Any]]) -> bool:
+    """Add imported sites (replacing the configured entry for the same site); returns whether the save succeeded"""
+    def merge(snapshot: ConfigSnapshot):
+        configs = list(snapshot)
+        configured = configured_sites(snapshot)
+        for data in imported:
+            existing = configured.get(site_key(data["website_url"]))
+            config = WebsiteConfig(**data)
+            if existing is None:
+                configs.append(config)
+                continue
+            if existing.page_id == config.page_id:
+                config.continuation_page_ids = existing.continuation_page_ids
+                config.max_page_bytes = existing.max_page_bytes
+            configs[configs.index(existing)] = config
+        return configs
+    
+    ensure_config_loaded()
+    snapshot = config_store.update(merge)
+    logger.info(f"📥 Imported {len(imported)} website configurations")
+    return save_websites_config(snapshot)
+
+def apply_discovered_page_ids(results: List[Dict[str, Any]]) -> int:
+    """Store the page IDs of 'found' results in the config, saving once"""
+    def store(snapshot: ConfigSnapshot):
+        replacements = {}
+        for result in results:
+            config = snapshot.lookup(result["website_url"])
+            if result["status"] != "found" or config is None or config.page_id == result["page_id"]:
+                continue
+            replacements[id(config)] = replace_config(config, page_id=result["page_id"], continuation_page_ids=[])
+            result["applied"] = True
+        if not replacements:
+            return None
+        return tuple(replacements.get(id(config), config) for config in snapshot)
+    
+    ensure_config_loaded()
+    snapshot = config_store.update(store)
+    applied = sum(1 for result in results if result.get("applied"))
+    if applied:
+        save_websites_config(snapshot)
+    return applied
+
+@app.post("/discover-page-ids")
+async def discover_page_ids_endpoint(request: PageDiscoveryRequest):
+    """
+    Find the link page of sites with a missing page_id by slug or title pattern
+    Listings are fetched concurrently and cached; IDs are only stored when apply is set
+    """
+    configs = ensure_config_loaded()
+    if request.website_urls:
+        targets = [config for config in (get_website_config(url, configs) for url in request.website_urls) if config]
+    else:
+        targets = [config for config in configs if not config.page_id]
+    if request.title_pattern:
+        try:
+            re.compile(request.title_pattern)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid title_pattern: {e}")
+    
+    results = await run_in_threadpool(
+        discover_page_ids,
+        targets,
+        slugs=request.slugs or DEFAULT_SLUGS,
+        title_pattern=request.title_pattern,
+        refresh=request.refresh
+    )
+    applied = apply_discovered_page_ids(results) if request.apply else 0
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return FastJSONResponse({"checked": len(results), "applied": applied, "counts": counts, "results": results})
+
+@app.post("/websites/import")
+async def import_websites(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    update_existing: bool = False,
+    max_workers: int = Query(8, ge=1, le=32)
+):
+    """
+    Import sites from a WordPress_websites_API-overzicht.csv export (semicolon separated)
+    Every row is checked against its site (credentials and page_id, max_workers at a time);
+    valid rows are written in a single config save. Returns a report entry per row.
+    """
+    configured = configured_sites(ensure_config_loaded())
+    try:
+        result = await run_in_threadpool(
+            import_overview,
+            codecs.iterdecode(file.file, "utf-8-sig"),
+            is_configured=lambda url: site_key(url) in configured,
+            update_existing=update_existing,
+            max_workers=max_workers
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    
+    imported = 0
+    saved = False
+    if not dry_run and result["valid"]:
+        saved = apply_imported_websites(result["valid"])
+        imported = len(result["valid"])
+    return FastJSONResponse({
+        "imported": imported,
+        # On Vercel the import only lives until the next cold start
+        "persisted": saved,
+        "dry_run": dry_run,
+        "counts": result["counts"],
+        "report": result["report"]
+    })
+
+def build_website_config(data: Dict[str, Any], previous: Optional[WebsiteConfig]) -> WebsiteConfig:
+    config = WebsiteConfig(**data)
+    # Continuation pages belong to the old link page, so they are kept only if it stays
+    if previous is not None and previous.page_id == config.page_id:
+        config.continuation_page_ids = previous.continuation_page_ids
+    return config
+
+@app.post("/websites/batch")
+async def batch_websites(request: WebsiteBatchRequest):
+    """
+    Add, update and delete many websites in one request
+    The batch is validated as a whole and saved once; returns a result per item.
+    With atomic (default) nothing is applied if any item fails (HTTP 422).
+    """
+    outcome = {}
+    
+    def apply(snapshot: ConfigSnapshot):
+        new_configs, results = plan_website_batch(
+            snapshot,
+            add=[website.model_dump() for website in request.add],
+            update=[website.model_dump() for website in request.update],
+            delete=request.delete,
+            build=build_website_config
+        )
+        failed = sum(1 for result in results if not result["success"])
+        outcome.update(results=results, failed=failed,
+                       applied=len(results) > failed and (failed == 0 or not request.atomic))
+        return new_configs if outcome["applied"] else None
+    
+    ensure_config_loaded()
+    snapshot = config_store.update(apply)
+    results, failed, applied = outcome["results"], outcome["failed"], outcome["applied"]
+    persisted = False
+    
+    if applied:
+        persisted = save_websites_config(snapshot)
+        logger.info(f"📦 Applied website batch: {len(results) - failed} changes, {failed} failed")
+    
+    return FastJSONResponse({
+        "applied": applied,
+        # On Vercel the batch only lives until the next cold start
+        "persisted": persisted,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results
+    }, status_code=422 if failed and not applied else 200)
 
 @app.post("/websites", response_model=WebsiteResponse)
 async def add_website(request: WebsiteRequest):
     """Add a new website configuration"""
-    configs = ensure_config_loaded()
-    
-    # Check if website already exists
-    existing = get_website_config(request.website_url, configs)
-    if existing:
-        raise HTTPException(status_code=400, detail=f"Website {request.website_url} already exists")
+    ensure_config_loaded()
     
     # Create new config
     new_config = WebsiteConfig(
@@ -195,14 +668,20 @@ async def add_website(request: WebsiteRequest):
         site_name=request.site_name,
         page_id=request.page_id,
         username=request.username,
-        app_password=request.app_password
+        app_password=request.app_password,
+        max_page_bytes=request.max_page_bytes
     )
     
-    # Add to global list
-    configs.append(new_config)
+    def add(snapshot: ConfigSnapshot):
+        # Check if website already exists
+        if snapshot.lookup(request.website_url):
+            raise HTTPException(status_code=400, detail=f"Website {request.website_url} already exists")
+        return snapshot.configs + (new_config,)
+    
+    snapshot = config_store.update(add)
     
     # Try to save (will work in development, not in production)
-    save_success = save_websites_config(configs)
+    save_success = save_websites_config(snapshot)
     if not save_success and not os.environ.get("VERCEL_ENV"):
         raise HTTPException(status_code=500, detail="Failed to save configuration")
     
@@ -223,7 +702,7 @@ async def test_connection(website_url: str):
     if not config:
         raise HTTPException(status_code=404, detail="Website configuration not found")
     
-    result = test_wordpress_connection(config)
+    result = await run_in_threadpool(test_wordpress_connection, config)
     return result
 
 # Export the app for Vercel
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, HttpUrl
@@ -6,12 +7,19 @@ from typing import List, Optional, Dict, Any
 import requests
 from requests.auth import HTTPBasicAuth
 import csv
+import html
 import json
 import logging
 from datetime import datetime
 import os
 from pathlib import Path
 
+from utils.http_client import http_session
+from utils.blogs import WordPressError, build_post_payload, create_post, update_post, delete_post, publish_to_sites
+from utils.blog_listing import BlogListing, SORT_KEYS
+from utils.media import media_library
+from utils.website_index import root_domain
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -66,19 +74,35 @@ class BlogPost(BaseModel):
     featured_image: Optional[str] = None
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
+    website_url: Optional[str] = None
+    link: Optional[str] = None
 
-class BlogCreateRequest(BaseModel):
+class BlogContent(BaseModel):
     title: str
     content: str
     excerpt: Optional[str] = None
     status: str = "draft"
     categories: Optional[List[str]] = None
     tags: Optional[List[str]] = None
+    featured_image: Optional[str] = None  # Image URL (or file under MEDIA_LOCAL_ROOT), uploaded once per site
+    upload_inline_media: bool = False  # Also upload <img> sources in content that are not on the site
+
+class BlogCreateRequest(BlogContent):
     website_url: str
 
 class BlogUpdateRequest(BlogCreateRequest):
     id: int
 
+class MultiSiteBlogRequest(BlogContent):
+    website_urls: List[str]
+    max_workers: int = 8
+
+class MultiSiteBlogResult(BaseModel):
+    website_url: str
+    success: bool
+    message: str
+    blog: Optional[BlogPost] = None
+
 class BulkLinkRequest(BaseModel):
     anchor_text: str
     link_url: HttpUrl
@@ -119,6 +143,9 @@ class WebsiteResponse(BaseModel):
 # Global variable to store website configs
 websites_config: List[WebsiteConfig] = []
 
+# Recent posts of all sites, refreshed in the background once older than BLOG_LISTING_TTL seconds
+blog_listing = BlogListing(ttl_seconds=float(os.getenv('BLOG_LISTING_TTL', 300)))
+
 def load_websites_config():
     """Load website configuration from CSV file"""
     global websites_config
@@ -266,7 +293,7 @@ def add_link_to_wordpress(config: WebsiteConfig, anchor_text: str, link_url: str
         api_base = f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
         
         # Step 1: Get existing page content
-        response = requests.get(
+        response = http_session.get(
             f"{api_base}/pages/{target_page_id}",
             auth=HTTPBasicAuth(config.username, config.app_password),
             timeout=30
@@ -302,7 +329,7 @@ def add_link_to_wordpress(config: WebsiteConfig, anchor_text: str, link_url: str
         new_content = existing_content + "\n" + new_link
         
         # Step 4: Update the page
-        update_response = requests.post(
+        update_response = http_session.post(
             f"{api_base}/pages/{target_page_id}",
             auth=HTTPBasicAuth(config.username, config.app_password),
             headers={"Content-Type": "application/json"},
@@ -466,87 +493,187 @@ async def delete_website(website_url: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Blog Management Endpoints
+def post_to_blog(post: Dict[str, Any], config: WebsiteConfig, request: BlogContent) -> BlogPost:
+    """BlogPost for a post returned by WordPress (categories/tags as the names that were sent)"""
+    return BlogPost(
+        id=post["id"],
+        title=html.unescape(post.get("title", {}).get("rendered", request.title)),
+        slug=post.get("slug", ""),
+        content=request.content,
+        excerpt=request.excerpt,
+        status=post.get("status", request.status),
+        categories=request.categories,
+        tags=request.tags,
+        featured_image=request.featured_image,
+        created_at=post.get("date"),
+        updated_at=post.get("modified"),
+        website_url=config.website_url,
+        link=post.get("link")
+    )
+
+def publish_blog(config: WebsiteConfig, request: BlogContent, blog_id: Optional[int] = None) -> Dict[str, Any]:
+    """Create (or with blog_id, update) a post on one site"""
+    content = request.content
+    if request.upload_inline_media:
+        content = media_library.replace_inline_images(config, content)
+    payload = build_post_payload(
+        config,
+        title=request.title,
+        content=content,
+        excerpt=request.excerpt,
+        status=request.status,
+        categories=request.categories,
+        tags=request.tags
+    )
+    if request.featured_image:
+        payload["featured_media"] = media_library.ensure(config, request.featured_image)["id"]
+    
+    def save():
+        if blog_id is None:
+            return create_post(config, payload)
+        return update_post(config, blog_id, payload)
+    
+    try:
+        return save()
+    except WordPressError as e:
+        # The remembered media item was deleted on the site: upload it again
+        if not request.featured_image or e.status_code != 400 or "featured media" not in e.message.lower():
+            raise
+        media_library.forget(config, payload["featured_media"])
+        payload["featured_media"] = media_library.ensure(config, request.featured_image)["id"]
+        return save()
+
 @app.get("/blogs", response_model=List[BlogPost])
-async def get_blogs(website_url: Optional[str] = None):
-    """Get blog posts, optionally filtered by website"""
-    # This is a placeholder - in a real implementation, you would
-    # fetch from WordPress API or database
-    return []
+async def get_blogs(
+    response: Response,
+    website_url: Optional[str] = None,
+    status: Optional[str] = None,
+    sort: str = Query("modified", pattern=f"^({'|'.join(SORT_KEYS)})$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    refresh: bool = False
+):
+    """
+    Get blog posts of all websites (or one), newest first by default
+    Totals are in the X-Total-Count / X-Total-Pages headers, like the WordPress REST API
+    """
+    if website_url:
+        config = get_website_config(website_url)
+        if not config:
+            raise HTTPException(status_code=404, detail="Website not found")
+        configs = [config]
+    else:
+        configs = list(websites_config)
+    
+    posts = await run_in_threadpool(blog_listing.posts, configs, refresh, sort, order == "desc")
+    if status:
+        posts = [post for post in posts if post["status"] == status]
+    
+    response.headers["X-Total-Count"] = str(len(posts))
+    response.headers["X-Total-Pages"] = str(max(1, -(-len(posts) // per_page)))
+    errors = blog_listing.errors(configs)
+    if errors:
+        response.headers["X-Failed-Sites"] = ",".join(errors)
+    start = (page - 1) * per_page
+    return posts[start:start + per_page]
 
 @app.post("/blogs", response_model=BlogPost)
 async def create_blog(request: BlogCreateRequest):
     """Create a new blog post"""
+    config = get_website_config(request.website_url)
+    if not config:
+        raise HTTPException(status_code=404, detail="Website not found")
+    
     try:
-        config = get_website_config(request.website_url)
+        post = await run_in_threadpool(publish_blog, config, request)
+    except WordPressError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    
+    logger.info(f"Blog post '{request.title}' created for {request.website_url} (id {post['id']})")
+    return post_to_blog(post, config, request)
+
+@app.post("/blogs/multi", response_model=List[MultiSiteBlogResult])
+async def create_blog_multi(request: MultiSiteBlogRequest):
+    """Publish one blog post to several websites concurrently"""
+    results = []
+    configs = []
+    # One post per site: configs are deduplicated on their normalized URL (www. and bare domain
+    # are one site); results keep the URL the caller sent first for that site
+    requested = {}
+    for website_url in dict.fromkeys(request.website_urls):
+        config = get_website_config(website_url)
         if not config:
-            raise HTTPException(status_code=404, detail="Website not found")
-        
-        # This is a placeholder - in a real implementation, you would
-        # create the blog post via WordPress API
-        blog_post = BlogPost(
-            id=1,  # Would be generated by WordPress
-            title=request.title,
-            slug=request.title.lower().replace(' ', '-'),
-            content=request.content,
-            excerpt=request.excerpt,
-            status=request.status,
-            categories=request.categories,
-            tags=request.tags,
-            created_at=datetime.now().isoformat()
-        )
-        
-        logger.info(f"Blog post '{request.title}' created for {request.website_url}")
-        return blog_post
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error creating blog post: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+            results.append(MultiSiteBlogResult(website_url=website_url, success=False, message="Website not found"))
+        elif root_domain(config.website_url) not in requested:
+            requested[root_domain(config.website_url)] = website_url
+            configs.append(config)
+    
+    published = await run_in_threadpool(
+        publish_to_sites, configs, lambda config: publish_blog(config, request),
+        max(1, min(request.max_workers, 32))
+    )
+    for result in published:
+        config = result["config"]
+        website_url = requested[root_domain(config.website_url)]
+        if result["error"] is not None:
+            results.append(MultiSiteBlogResult(website_url=website_url, success=False,
+                                               message=result["error"].message))
+        else:
+            results.append(MultiSiteBlogResult(website_url=website_url, success=True,
+                                               message="Blog post created",
+                                               blog=post_to_blog(result["post"], config, request)))
+    
+    # Keep the order of the request
+    position = {}
+    for i, website_url in enumerate(request.website_urls):
+        position.setdefault(website_url, i)
+    results.sort(key=lambda result: position.get(result.website_url, len(position)))
+    return results
 
 @app.put("/blogs/{blog_id}", response_model=BlogPost)
 async def update_blog(blog_id: int, request: BlogUpdateRequest):
     """Update an existing blog post"""
+    config = get_website_config(request.website_url)
+    if not config:
+        raise HTTPException(status_code=404, detail="Website not found")
+    
     try:
-        config = get_website_config(request.website_url)
-        if not config:
-            raise HTTPException(status_code=404, detail="Website not found")
-        
-        # This is a placeholder - in a real implementation, you would
-        # update the blog post via WordPress API
-        blog_post = BlogPost(
-            id=blog_id,
-            title=request.title,
-            slug=request.title.lower().replace(' ', '-'),
-            content=request.content,
-            excerpt=request.excerpt,
-            status=request.status,
-            categories=request.categories,
-            tags=request.tags,
-            updated_at=datetime.now().isoformat()
-        )
-        
-        logger.info(f"Blog post {blog_id} updated for {request.website_url}")
-        return blog_post
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating blog post: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        post = await run_in_threadpool(publish_blog, config, request, blog_id)
+    except WordPressError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    
+    logger.info(f"Blog post {blog_id} updated for {request.website_url}")
+    return post_to_blog(post, config, request)
 
 @app.delete("/blogs/{blog_id}")
-async def delete_blog(blog_id: int):
-    """Delete a blog post"""
+async def delete_blog(blog_id: int, website_url: Optional[str] = None, force: bool = False):
+    """
+    Delete a blog post (moved to the trash unless force is set)
+    Without website_url the site is looked up in the blog listing; an ID found on several
+    sites needs website_url
+    """
+    if website_url:
+        config = get_website_config(website_url)
+        if not config:
+            raise HTTPException(status_code=404, detail="Website not found")
+    else:
+        sites = await run_in_threadpool(blog_listing.sites_with_post, list(websites_config), blog_id)
+        if not sites:
+            raise HTTPException(status_code=404, detail=f"Blog post {blog_id} not found")
+        if len(sites) > 1:
+            raise HTTPException(status_code=409, detail=f"Blog post {blog_id} exists on {len(sites)} websites, "
+                                                        f"pass website_url")
+        config = sites[0]
+        website_url = config.website_url
+    
     try:
-        # This is a placeholder - in a real implementation, you would
-        # delete the blog post via WordPress API
-        logger.info(f"Blog post {blog_id} deleted")
-        return {"success": True, "message": f"Blog post {blog_id} deleted successfully"}
-        
-    except Exception as e:
-        logger.error(f"Error deleting blog post: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        await run_in_threadpool(delete_post, config, blog_id, force)
+    except WordPressError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    
+    logger.info(f"Blog post {blog_id} deleted from {website_url}")
+    return {"success": True, "message": f"Blog post {blog_id} deleted successfully"}
 
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,240 @@
+"""
+Recent blog posts across all configured sites
+Each site's posts are kept in memory and refreshed incrementally (modified_after), with only
+the listed fields transferred. Stale listings are served while a background sweep refreshes
+them, so after the first sweep the listing answers from memory.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import html
+import logging
+
+from requests.auth import HTTPBasicAuth
+
+from .blogs import WordPressError, response_error, taxonomy_cache
+from .http_client import http_session
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 100  # WordPress maximum
+LIST_FIELDS = "id,title,slug,excerpt,status,date,modified,link,categories,tags"
+# Trash is included so trashed posts drop out of the listing on the next incremental sweep
+LIST_STATUSES = "publish,future,draft,pending,private,trash"
+SORT_KEYS = ("modified", "date", "title", "website_url")
+
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def _site_key(config) -> Tuple[str, str]:
+    return config.website_url.rstrip("/").lower(), config.username
+
+
+class _SiteListing:
+    """Posts of one site by ID; replaced as a whole on every sync"""
+
+    __slots__ = ("posts", "modified", "full_at", "error")
+
+    def __init__(self, posts: Dict[int, Dict[str, Any]], modified: Optional[str], full_at: float,
+                 error: Optional[str] = None):
+        self.posts = posts
+        self.modified = modified
+        self.full_at = full_at
+        self.error = error
+
+
+def _fetch_posts(config, modified_after: Optional[str], timeout: float) -> List[Dict[str, Any]]:
+    params = {"per_page": PER_PAGE, "orderby": "modified", "order": "desc", "status": LIST_STATUSES,
+              "_fields": LIST_FIELDS}
+    if modified_after:
+        params["modified_after"] = modified_after
+    posts: List[Dict[str, Any]] = []
+    page_number, total_pages = 1, 1
+    while page_number <= total_pages:
+        response = http_session.get(
+            f"{config.website_url.rstrip('/')}/wp-json/wp/v2/posts",
+            params={**params, "page": page_number},
+            auth=HTTPBasicAuth(config.username, config.app_password),
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            raise response_error(response, "list posts")
+        total_pages = int(response.headers.get("X-WP-TotalPages", 1) or 1)
+        posts.extend(response.json())
+        page_number += 1
+    return posts
+
+
+def _list_entry(config, post: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    excerpt = html.unescape(_TAG_PATTERN.sub("", post.get("excerpt", {}).get("rendered", ""))).strip()
+    return {
+        "id": post["id"],
+        "title": html.unescape(post.get("title", {}).get("rendered", "")),
+        "slug": post.get("slug", ""),
+        "content": "",
+        "excerpt": excerpt or None,
+        "status": post.get("status", ""),
+        "categories": taxonomy_cache.names(config, "categories", post.get("categories") or [], timeout),
+        "tags": taxonomy_cache.names(config, "tags", post.get("tags") or [], timeout),
+        "created_at": post.get("date"),
+        "updated_at": post.get("modified"),
+        "website_url": config.website_url,
+        "link": post.get("link"),
+    }
+
+
+class BlogListing:
+    """
+    Cached cross-site post listing
+
+    A site is synced in full the first time and every full_refresh_seconds (to drop posts
+    deleted permanently); in between only posts modified since the last sync are fetched.
+    Listings older than ttl_seconds are served as they are while a background sweep runs.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, full_refresh_seconds: float = 3600,
+                 max_workers: int = 8, timeout: float = 20):
+        self.ttl_seconds = ttl_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._sites: Dict[Tuple[str, str], _SiteListing] = {}
+        self._swept_at: Dict[Tuple[str, str], float] = {}
+        self._views: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._version = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+
+    def _sync_site(self, config):
+        key = _site_key(config)
+        current = self._sites.get(key)
+        started = time.time()
+        full = current is None or started - current.full_at > self.full_refresh_seconds
+        modified_after = None
+        if not full and current.modified:
+            # Rewind a little: modified_after is exclusive and has one-second resolution
+            modified_after = (datetime.fromisoformat(current.modified) - timedelta(seconds=2)).isoformat()
+        try:
+            fetched = _fetch_posts(config, modified_after, self.timeout)
+            # One lookup per taxonomy for the term IDs not cached yet
+            for taxonomy in ("categories", "tags"):
+                taxonomy_cache.names(config, taxonomy, [term_id for post in fetched for term_id in post.get(taxonomy) or []],
+                                     self.timeout)
+            posts = {} if full else dict(current.posts)
+            for post in fetched:
+                if post.get("status") == "trash":
+                    posts.pop(post["id"], None)
+                else:
+                    posts[post["id"]] = _list_entry(config, post, self.timeout)
+            modified = max([post["modified"] for post in fetched if post.get("modified")]
+                           + ([current.modified] if current and current.modified and not full else []),
+                           default=None)
+            listing = _SiteListing(posts, modified, started if full else current.full_at)
+            changed = full or bool(fetched)
+        except Exception as e:
+            message = e.message if isinstance(e, WordPressError) else str(e)
+            logger.warning(f"⚠️ Could not list posts of {config.website_url}: {message}")
+            listing = _SiteListing(current.posts if current else {}, current.modified if current else None,
+                                   current.full_at if current else 0.0, message)
+            changed = current is None
+        with self._lock:
+            self._sites[key] = listing
+            self._swept_at[key] = time.monotonic()
+            if changed:
+                self._version += 1
+                self._views.clear()
+
+    def sweep(self, configs: Sequence[Any]):
+        """Sync every site now (concurrently, at most max_workers at a time)"""
+        with self._sweep_lock:
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(configs)))) as executor:
+                list(executor.map(self._sync_site, configs))
+            logger.info(f"📰 Synced posts of {len(configs)} sites in {time.monotonic() - started:.2f}s")
+
+    def _refresh_in_background(self, configs: Sequence[Any]):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.sweep(configs)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="blog-listing-refresh", daemon=True).start()
+
+    def posts(self, configs: Sequence[Any], refresh: bool = False, sort: str = "modified",
+              descending: bool = True) -> List[Dict[str, Any]]:
+        """
+        Posts of the given sites, sorted
+        Sites never synced (or everything, with refresh) are synced before returning; stale
+        sites are refreshed in the background and served from memory meanwhile.
+        """
+        now = time.monotonic()
+        with self._lock:
+            missing = [config for config in configs if _site_key(config) not in self._sites]
+            stale = [config for config in configs
+                     if now - self._swept_at.get(_site_key(config), 0.0) > self.ttl_seconds]
+        if refresh:
+            self.sweep(configs)
+        elif missing:
+            self.sweep(missing)
+        elif stale:
+            self._refresh_in_background(stale)
+
+        keys = tuple(sorted({_site_key(config) for config in configs}))
+        with self._lock:
+            view_key = (self._version, keys, sort, descending)
+            view = self._views.get(view_key)
+            if view is not None:
+                return view
+            entries = [entry for key in keys if key in self._sites for entry in self._sites[key].posts.values()]
+        field = {"modified": "updated_at", "date": "created_at"}.get(sort, sort)
+        view = sorted(entries, key=lambda entry: ((entry.get(field) or "").lower(), entry["id"]), reverse=descending)
+        with self._lock:
+            if view_key[0] == self._version:
+                self._views[view_key] = view
+        return view
+
+    def sites_with_post(self, configs: Sequence[Any], post_id: int) -> List[Any]:
+        """
+        Configs whose listing holds post_id
+        Sites never synced are synced first; when no listing has the post, all sites are synced
+        again (it may be newer than the last sweep)
+        """
+        def found() -> List[Any]:
+            with self._lock:
+                return [config for config in configs
+                        if _site_key(config) in self._sites and post_id in self._sites[_site_key(config)].posts]
+
+        with self._lock:
+            missing = [config for config in configs if _site_key(config) not in self._sites]
+        if missing:
+            self.sweep(missing)
+        sites = found()
+        if not sites and len(missing) < len(configs):
+            self.sweep([config for config in configs if config not in missing])
+            sites = found()
+        return sites
+
+    def errors(self, configs: Sequence[Any]) -> Dict[str, str]:
+        """website_url -> error of the last sync, for sites whose last sync failed"""
+        with self._lock:
+            return {config.website_url: self._sites[_site_key(config)].error for config in configs
+                    if _site_key(config) in self._sites and self._sites[_site_key(config)].error}
+
+    def clear(self):
+        with self._lock:
+            self._sites.clear()
+            self._swept_at.clear()
+            self._views.clear()
+            self._version += 1
@@ -0,0 +1,216 @@
+"""
+Blog posts on WordPress sites (/wp-json/wp/v2/posts)
+Category and tag names are resolved to term IDs through a per-site cache, so publishing
+one post to many sites looks each name up (or creates it) once per site
+"""
+
+import html
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+from .http_client import http_session
+
+logger = logging.getLogger(__name__)
+
+# Post fields returned by create/update (the content is not echoed back)
+POST_FIELDS = "id,title,slug,status,date,modified,link"
+
+
+class WordPressError(Exception):
+    """A WordPress REST call failed; status_code is the HTTP status (502 when there was no response)"""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _api_base(config) -> str:
+    return f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
+
+
+def _auth(config) -> HTTPBasicAuth:
+    return HTTPBasicAuth(config.username, config.app_password)
+
+
+def response_error(response: requests.Response, action: str) -> WordPressError:
+    try:
+        detail = response.json().get("message") or response.reason
+    except (ValueError, AttributeError):
+        detail = response.reason
+    return WordPressError(f"Failed to {action}: {response.status_code} {detail}", response.status_code)
+
+
+def _send(method: str, config, path: str, action: str, timeout: float, **kwargs) -> requests.Response:
+    """One REST call; connection errors and timeouts become WordPressError"""
+    try:
+        return http_session.request(method, f"{_api_base(config)}/{path}", auth=_auth(config),
+                                    timeout=timeout, **kwargs)
+    except requests.exceptions.Timeout:
+        raise WordPressError(f"Failed to {action}: request timeout", 504)
+    except requests.exceptions.RequestException as e:
+        raise WordPressError(f"Failed to {action}: {e}")
+
+
+def _json(response: requests.Response, action: str) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        raise WordPressError(f"Failed to {action}: invalid JSON in response")
+
+
+def _request(method: str, config, path: str, action: str, timeout: float, **kwargs) -> Any:
+    response = _send(method, config, path, action, timeout, **kwargs)
+    if response.status_code not in (200, 201):
+        raise response_error(response, action)
+    return _json(response, action)
+
+
+class TaxonomyCache:
+    """
+    Per-site map of category/tag name -> term ID
+
+    Names are matched case-insensitively. A name that is not cached is searched for on the
+    site and created when missing; lookups for one site and taxonomy run one at a time so
+    concurrent posts to the same site cannot create a term twice. The reverse direction
+    (term ID -> name, for listings) is cached as well.
+    """
+
+    def __init__(self):
+        self._terms: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        self._names: Dict[Tuple[str, str, str], Dict[int, str]] = {}
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, config, taxonomy: str) -> Tuple[str, str, str]:
+        return config.website_url.rstrip("/").lower(), config.username, taxonomy
+
+    def _entry(self, config, taxonomy: str) -> Tuple[Dict[str, int], threading.Lock]:
+        key = self._key(config, taxonomy)
+        with self._lock:
+            return self._terms.setdefault(key, {}), self._locks.setdefault(key, threading.Lock())
+
+    def resolve(self, config, taxonomy: str, names: Optional[Sequence[str]], timeout: float = 30) -> List[int]:
+        """Term IDs for names (in order, duplicates removed), creating missing terms"""
+        unique: Dict[str, str] = {}
+        for name in names or ():
+            if name and name.strip():
+                unique.setdefault(name.strip().lower(), name.strip())
+        names = list(unique.values())
+        if not names:
+            return []
+        terms, lock = self._entry(config, taxonomy)
+        with lock:
+            for name in names:
+                if name.lower() not in terms:
+                    terms[name.lower()] = _find_or_create_term(config, taxonomy, name, timeout)
+                    self._names.setdefault(self._key(config, taxonomy), {})[terms[name.lower()]] = name
+            return [terms[name.lower()] for name in names]
+
+    def names(self, config, taxonomy: str, term_ids: Sequence[int], timeout: float = 30) -> List[str]:
+        """Names for term IDs; unknown IDs are fetched in one request, IDs that do not exist are left out"""
+        _, lock = self._entry(config, taxonomy)
+        with lock:
+            names = self._names.setdefault(self._key(config, taxonomy), {})
+            missing = sorted({term_id for term_id in term_ids if term_id not in names})
+            for start in range(0, len(missing), 100):
+                chunk = missing[start:start + 100]
+                found = _request("GET", config, taxonomy, f"look up {taxonomy}", timeout,
+                                 params={"include": ",".join(map(str, chunk)), "per_page": 100, "_fields": "id,name"})
+                for term in found:
+                    names[term["id"]] = html.unescape(term.get("name", ""))
+            return [names[term_id] for term_id in term_ids if term_id in names]
+
+    def clear(self):
+        with self._lock:
+            self._terms.clear()
+            self._names.clear()
+            self._locks.clear()
+
+
+def _find_or_create_term(config, taxonomy: str, name: str, timeout: float) -> int:
+    found = _request("GET", config, taxonomy, f"look up {taxonomy} '{name}'", timeout,
+                     params={"search": name, "per_page": 100, "_fields": "id,name"})
+    for term in found:
+        if html.unescape(term.get("name", "")).lower() == name.lower():
+            return term["id"]
+
+    action = f"create {taxonomy} '{name}'"
+    response = _send("POST", config, taxonomy, action, timeout, json={"name": name})
+    if response.status_code in (200, 201):
+        term = _json(response, action)
+        if not isinstance(term, dict) or "id" not in term:
+            raise WordPressError(f"Failed to {action}: no term ID in response")
+        logger.info(f"🏷️ Created {taxonomy} '{name}' on {config.website_url}")
+        return term["id"]
+    try:
+        error = response.json()
+    except ValueError:
+        error = {}
+    # Someone else created it since the search
+    if isinstance(error, dict) and error.get("code") == "term_exists" and (error.get("data") or {}).get("term_id"):
+        return error["data"]["term_id"]
+    raise response_error(response, action)
+
+
+taxonomy_cache = TaxonomyCache()
+
+
+def build_post_payload(config, title: str, content: str, excerpt: Optional[str] = None, status: str = "draft",
+                       categories: Optional[Sequence[str]] = None, tags: Optional[Sequence[str]] = None,
+                       timeout: float = 30) -> Dict[str, Any]:
+    """Request body for a post on one site (category/tag names resolved to that site's IDs)"""
+    payload: Dict[str, Any] = {"title": title, "content": content, "status": status}
+    if excerpt is not None:
+        payload["excerpt"] = excerpt
+    if categories is not None:
+        payload["categories"] = taxonomy_cache.resolve(config, "categories", categories, timeout)
+    if tags is not None:
+        payload["tags"] = taxonomy_cache.resolve(config, "tags", tags, timeout)
+    return payload
+
+
+def create_post(config, payload: Dict[str, Any], timeout: float = 30) -> Dict[str, Any]:
+    return _request("POST", config, "posts", "create post", timeout, json=payload,
+                    params={"_fields": POST_FIELDS})
+
+
+def update_post(config, post_id: int, payload: Dict[str, Any], timeout: float = 30) -> Dict[str, Any]:
+    return _request("POST", config, f"posts/{post_id}", f"update post {post_id}", timeout, json=payload,
+                    params={"_fields": POST_FIELDS})
+
+
+def delete_post(config, post_id: int, force: bool = False, timeout: float = 30) -> Dict[str, Any]:
+    """Move a post to the trash, or delete it permanently with force"""
+    return _request("DELETE", config, f"posts/{post_id}", f"delete post {post_id}", timeout,
+                    params={"force": "true" if force else "false"})
+
+
+def publish_to_sites(configs: Sequence[Any], publish: Callable[[Any], Dict[str, Any]],
+                     max_workers: int = 8) -> List[Dict[str, Any]]:
+    """
+    Run publish(config) for every site concurrently (at most max_workers at a time)
+    Returns {config, post, error} per site in input order; error is a WordPressError or None
+    """
+    def run(config) -> Dict[str, Any]:
+        try:
+            return {"config": config, "post": publish(config), "error": None}
+        except WordPressError as e:
+            logger.warning(f"⚠️ Publishing to {config.website_url} failed: {e.message}")
+            return {"config": config, "post": None, "error": e}
+        except Exception as e:
+            logger.error(f"❌ Publishing to {config.website_url} failed: {e}")
+            return {"config": config, "post": None, "error": WordPressError(str(e), 500)}
+
+    if not configs:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(configs)))) as executor:
+        results = list(executor.map(run, configs))
+    published = sum(1 for result in results if result["error"] is None)
+    logger.info(f"📝 Published to {published}/{len(results)} sites")
+    return results
@@ -13,12 +13,16 @@ logger = logging.getLogger(__name__)
 
 class WebsiteConfig:
     """Website configuration model"""
-    def __init__(self, website_url: str, page_id: int, username: str, app_password: str, site_name: str):
+    def __init__(self, website_url: str, page_id: int, username: str, app_password: str, site_name: str,
+                 continuation_page_ids: Optional[List[int]] = None, max_page_bytes: Optional[int] = None):
         self.website_url = website_url
         self.page_id = page_id
         self.username = username
         self.app_password = app_password
         self.site_name = site_name
+        # Pages the link list continues on once page_id is full, oldest first
+        self.continuation_page_ids = list(continuation_page_ids or [])
+        self.max_page_bytes = max_page_bytes
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -26,7 +30,9 @@ class WebsiteConfig:
             'page_id': self.page_id,
             'username': self.username,
             'app_password': self.app_password,
-            'site_name': self.site_name
+            'site_name': self.site_name,
+            'continuation_page_ids': self.continuation_page_ids,
+            'max_page_bytes': self.max_page_bytes
         }
 
 def load_websites_config() -> List[WebsiteConfig]:
@@ -84,7 +90,9 @@ def load_websites_config() -> List[WebsiteConfig]:
                     page_id=int(data['page_id']),
                     username=data['username'],
                     app_password=data['app_password'],
-                    site_name=data['site_name']
+                    site_name=data['site_name'],
+                    continuation_page_ids=data.get('continuation_page_ids'),
+                    max_page_bytes=data.get('max_page_bytes')
                 ))
         
         logger.info(f"✅ Loaded {len(websites)} website configurations")
@@ -99,6 +107,14 @@ def get_website_config(website_url: str, websites: List[WebsiteConfig]) -> Optio
     if not website_url:
         return None
     
+    # Config snapshots carry an index (exact match, then root domain)
+    lookup = getattr(websites, "lookup", None)
+    if lookup is not None:
+        config = lookup(website_url)
+        if config is None:
+            logger.warning(f"❌ No website configuration found for: {website_url}")
+        return config
+    
     # First try exact match
     for config in websites:
         if config.website_url == website_url:
@@ -112,7 +128,7 @@ def get_website_config(website_url: str, websites: List[WebsiteConfig]) -> Optio
         for config in websites:
             config_domain = urlparse(config.website_url.lower()).netloc.replace('www.', '')
             if input_domain == config_domain:
-                logger.info(f"🔗 URL matched via domain: {website_url} -> {config.website_url}")
+                logger.debug("🔗 URL matched via domain: %s -> %s", website_url, config.website_url)
                 return config
     except Exception as e:
         logger.warning(f"⚠️ Error in URL matching for {website_url}: {e}")
@@ -0,0 +1,186 @@
+"""
+Copy-on-write website configuration
+The config is published as immutable snapshots (a tuple of configs plus their index);
+writers build the next snapshot and swap one reference, so readers never lock and a
+bulk run can keep using the snapshot it started with.
+With a SharedConfig, snapshots are mirrored to a database that all worker processes follow.
+"""
+
+import copy
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from .website_index import WebsiteIndex
+from .shared_config import SharedConfig, SharedState, seed_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigSnapshot:
+    """
+    One published version of the config
+
+    Config objects in a snapshot are never edited; a change replaces the object
+    (see replace_config), including the continuation pages the link writer adds
+    (see with_continuation_pages).
+    """
+
+    __slots__ = ("configs", "version", "loaded_at", "source", "index")
+
+    def __init__(self, configs: Iterable[Any], version: int, loaded_at: str, source: str = "unknown"):
+        self.configs: Tuple[Any, ...] = tuple(configs)
+        self.version = version
+        self.loaded_at = loaded_at
+        self.source = source
+        self.index = WebsiteIndex(self.configs, version)
+
+    def lookup(self, website_url: str) -> Optional[Any]:
+        return self.index.lookup(website_url)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.configs)
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+
+class ConfigStore:
+    """
+    Holds the current snapshot; writes are serialized, reads are a plain attribute access
+
+    With shared set, every write is a read-modify-write transaction on the shared database
+    (the version there becomes the snapshot version), and refresh() picks up writes made by
+    other processes. factory turns a stored dict back into a config object.
+    Listeners (add_listener) see every published snapshot: reloads, edits and refreshes.
+    """
+
+    def __init__(self, shared: Optional[SharedConfig] = None, factory: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.shared = shared
+        self.factory = factory
+        self._write_lock = threading.RLock()
+        self._current = ConfigSnapshot((), version=0, loaded_at="")
+        self._listeners: List[Callable[[ConfigSnapshot, ConfigSnapshot], Any]] = []
+
+    @property
+    def current(self) -> ConfigSnapshot:
+        return self._current
+
+    def _publish(self, configs: Iterable[Any], loaded_at: Optional[str], source: Optional[str],
+                 version: Optional[int] = None) -> ConfigSnapshot:
+        previous = self._current
+        snapshot = ConfigSnapshot(configs, version if version is not None else previous.version + 1,
+                                  loaded_at or previous.loaded_at, source or previous.source)
+        self._current = snapshot
+        for listener in self._listeners:
+            try:
+                listener(previous, snapshot)
+            except Exception as e:
+                logger.warning(f"⚠️ Config listener failed: {e}")
+        return snapshot
+
+    def add_listener(self, listener: Callable[[ConfigSnapshot, ConfigSnapshot], Any]):
+        """Call listener(previous, snapshot) after each new snapshot; it runs under the write lock, so keep it short"""
+        self._listeners.append(listener)
+
+    def _adopt(self, state: Optional[SharedState]) -> ConfigSnapshot:
+        # Make a state read from the database the local snapshot, unless it already is
+        if state is not None and state[0] != self._current.version:
+            version, loaded_at, source, data = state
+            self._publish([self.factory(item) for item in data], loaded_at, source, version)
+        return self._current
+
+    def refresh(self) -> ConfigSnapshot:
+        """Follow writes made by other processes; a single version read when nothing changed"""
+        if self.shared is None or self.shared.version() == self._current.version:
+            return self._current
+        with self._write_lock:
+            return self._adopt(self.shared.read())
+
+    def seed(self, configs: Iterable[Any], loaded_at: str, source: str) -> ConfigSnapshot:
+        """
+        Install the configuration this process starts with
+        Another worker of the same deployment may have seeded (and since edited) the shared
+        config already; it is then adopted instead of overwritten. A different seed (new
+        deployment) replaces it.
+        """
+        configs = tuple(configs)
+        if self.shared is None:
+            return self.replace(configs, loaded_at, source)
+        fingerprint = seed_fingerprint(list(configs))
+        with self._write_lock:
+            adopted = []
+            def apply(current, seed):
+                if current is not None and seed == fingerprint:
+                    adopted.append(current)
+                    return None
+                return loaded_at, source, fingerprint, configs
+            state = self.shared.transaction(apply)
+            if adopted:
+                logger.info(f"🔗 Using shared config v{state[0]} from {self.shared.path}")
+                return self._adopt(state)
+            return self._publish(configs, loaded_at, source, state[0])
+
+    def replace(self, configs: Iterable[Any], loaded_at: Optional[str] = None,
+                source: Optional[str] = None) -> ConfigSnapshot:
+        """Publish configs as the new snapshot (e.g. after a reload)"""
+        return self._write(lambda snapshot: configs, loaded_at, source)
+
+    def update(self, change: Callable[[ConfigSnapshot], Optional[Iterable[Any]]]) -> ConfigSnapshot:
+        """
+        Publish change(current) as the next snapshot
+        change runs under the write lock so concurrent writers cannot lose each other's edits;
+        it may raise to abort, or return None to leave the config as it is
+        """
+        return self._write(change, None, None)
+
+    def _write(self, change, loaded_at: Optional[str], source: Optional[str]) -> ConfigSnapshot:
+        with self._write_lock:
+            if self.shared is None:
+                configs = change(self._current)
+                if configs is None:
+                    return self._current
+                return self._publish(configs, loaded_at, source)
+
+            result = {}
+            def apply(current, seed):
+                # Apply the change to the latest state, including writes from other processes
+                snapshot = self._adopt(current)
+                configs = change(snapshot)
+                if configs is None:
+                    return None
+                result["configs"] = configs = tuple(configs)
+                return loaded_at or snapshot.loaded_at, source or snapshot.source, seed or "", configs
+            state = self.shared.transaction(apply)
+            if "configs" not in result:
+                return self._current
+            return self._publish(result["configs"], loaded_at, source, state[0])
+
+
+def replace_config(config: Any, **changes: Any) -> Any:
+    """Copy of a config object with some fields changed (pydantic models and plain classes)"""
+    if hasattr(config, "model_copy"):
+        return config.model_copy(update=changes)
+    updated = copy.copy(config)
+    for name, value in changes.items():
+        setattr(updated, name, value)
+    return updated
+
+
+def with_continuation_pages(snapshot: ConfigSnapshot, config: Any, page_ids: Iterable[int]) -> Optional[Tuple[Any, ...]]:
+    """
+    Configs of snapshot with page_ids added to the continuation pages of config's site (a ConfigStore.update
+    change). Pages the snapshot already has are kept, so writers from several processes merge; None when
+    nothing changes.
+    """
+    changed = False
+    configs = []
+    for item in snapshot:
+        if item.website_url == config.website_url and item.page_id == config.page_id:
+            current = list(item.continuation_page_ids or [])
+            added = [page_id for page_id in page_ids if page_id not in current]
+            if added:
+                item = replace_config(item, continuation_page_ids=current + added)
+                changed = True
+        configs.append(item)
+    return tuple(configs) if changed else None
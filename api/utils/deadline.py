@@ -0,0 +1,88 @@
+"""
+Time budgets and continuation tokens for serverless bulk runs
+A bulk request stops starting new sites when the budget runs low and returns
+a token; a follow-up call with the same body and that token finishes the rest
+Tokens are signed with CONTINUATION_SECRET; without it the signature still
+rejects edited tokens, but a client that knows the format could forge one
+(api/index.py logs a warning at startup when it is unset)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Any, Optional
+
+CONTINUATION_HEADER = "X-Continuation-Token"
+REMAINING_HEADER = "X-Remaining-Sites"
+CONTINUATION_SECRET = os.environ.get("CONTINUATION_SECRET", "")
+
+
+class InvalidContinuationToken(ValueError):
+    """Raised when a token is malformed or belongs to a different request"""
+
+
+class Deadline:
+    """
+    Budget for one invocation
+
+    A new unit of work is only started if the remaining time covers the
+    slowest unit seen so far (or `initial_estimate` before the first one).
+    """
+
+    def __init__(self, budget_seconds: Optional[float], initial_estimate: float = 2.0):
+        self.started_at = time.monotonic()
+        self.budget_seconds = budget_seconds
+        self.estimate = initial_estimate
+        self._slowest: Optional[float] = None
+
+    def remaining(self) -> float:
+        if self.budget_seconds is None:
+            return float("inf")
+        return self.budget_seconds - (time.monotonic() - self.started_at)
+
+    def record(self, duration: float):
+        self._slowest = duration if self._slowest is None else max(self._slowest, duration)
+        self.estimate = self._slowest
+
+    def can_start(self) -> bool:
+        return self.remaining() >= self.estimate
+
+
+def request_digest(*parts: Any) -> str:
+    """Short digest tying a token to the request it was issued for"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _signature(payload: str) -> str:
+    return _b64(hmac.new(CONTINUATION_SECRET.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest()[:16])
+
+
+def encode_continuation(offset: int, digest: str) -> str:
+    payload = _b64(json.dumps({"offset": offset, "request": digest}, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_signature(payload)}"
+
+
+def decode_continuation(token: str, digest: str) -> int:
+    """Return the offset to resume from, checking the token is intact and was issued for this request"""
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _signature(payload)):
+            raise ValueError("signature")
+        data = json.loads(base64.urlsafe_b64decode((payload + "=" * (-len(payload) % 4)).encode("ascii")))
+        offset = int(data["offset"])
+        issued_for = data["request"]
+    except Exception:
+        raise InvalidContinuationToken("Malformed continuation token")
+    if issued_for != digest:
+        raise InvalidContinuationToken("Continuation token does not belong to this request")
+    if offset < 0:
+        raise InvalidContinuationToken("Malformed continuation token")
+    return offset
@@ -0,0 +1,195 @@
+"""
+Shared HTTP client for WordPress traffic
+- one pooled keep-alive requests.Session instead of a new connection per call
+- a small DNS cache with TTL, used by the WordPress session's connections only
+- optional background pre-warming of DNS and connections for configured sites (PREWARM_CONNECTIONS)
+- the outbound rate limiter (utils.rate_limit) applied to every request
+Requests to other hosts (link targets, image sources) use external_session instead, so they
+neither spend the WordPress rate budget nor get a WordPress site's pause after a 429.
+"""
+
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from .rate_limit import RateLimiter, RateLimitedAdapter, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class DnsCache:
+    """Caches getaddrinfo results per (host, port) for ttl_seconds"""
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((host, port))
+        if entry and entry[0] > now:
+            return entry[1]
+
+        addresses = []
+        for *_, sockaddr in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        with self._lock:
+            self._entries[(host, port)] = (now + self.ttl_seconds, addresses)
+        return addresses
+
+    def invalidate(self, host: str, port: int):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+dns_cache = DnsCache(ttl_seconds=float(os.environ.get("DNS_CACHE_TTL", 300)))
+PREWARM_CONNECTIONS = os.environ.get("PREWARM_CONNECTIONS", "").lower() in ("1", "true", "yes")
+
+
+class _DnsCachedConnection:
+    """
+    Connection mixin that connects to the addresses in dns_cache, trying each in turn
+    Only the socket target changes: the Host header, SNI and certificate check keep the host name
+    """
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            addresses = dns_cache.resolve(host.strip("[]"), self.port)
+        except socket.gaierror:
+            addresses = []
+        if not addresses:
+            return super()._new_conn()
+
+        last_error: Optional[Exception] = None
+        for ip in addresses:
+            self._dns_host = ip
+            try:
+                return super()._new_conn()
+            except (NewConnectionError, ConnectTimeoutError) as e:
+                last_error = e
+            finally:
+                self._dns_host = host
+        # Every cached address failed; the next attempt resolves again
+        dns_cache.invalidate(host.strip("[]"), self.port)
+        raise last_error
+
+
+class DnsCachedHTTPConnection(_DnsCachedConnection, HTTPConnection):
+    pass
+
+
+class DnsCachedHTTPSConnection(_DnsCachedConnection, HTTPSConnection):
+    pass
+
+
+class DnsCachedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = DnsCachedHTTPConnection
+
+
+class DnsCachedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = DnsCachedHTTPSConnection
+
+
+class DnsCachedAdapter(RateLimitedAdapter):
+    """RateLimitedAdapter whose direct connections resolve hosts through dns_cache (proxies are left alone)"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": DnsCachedHTTPConnectionPool,
+            "https": DnsCachedHTTPSConnectionPool,
+        }
+
+
+def create_session(pool_hosts: int, pool_size: int, limiter: Optional[RateLimiter] = None) -> requests.Session:
+    """Session that keeps keep-alive pools for up to pool_hosts sites, throttled by limiter"""
+    session = requests.Session()
+    adapter = DnsCachedAdapter(limiter or rate_limiter, pool_connections=pool_hosts, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def create_external_session(pool_hosts: int, pool_size: int) -> requests.Session:
+    """Pooled session without the WordPress rate limiter, for hosts that are not configured sites"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared by every WordPress call in this process
+http_session = create_session(
+    pool_hosts=int(os.environ.get("WP_POOL_HOSTS", 200)),
+    pool_size=int(os.environ.get("WP_POOL_SIZE", 10))
+)
+
+# Shared by calls to any other host (their own per-host limits live with the caller)
+external_session = create_external_session(
+    pool_hosts=int(os.environ.get("EXTERNAL_POOL_HOSTS", 100)),
+    pool_size=int(os.environ.get("EXTERNAL_POOL_SIZE", 4))
+)
+
+
+def _warm(origin: str, timeout: float) -> bool:
+    parsed = urlparse(origin)
+    try:
+        dns_cache.resolve(parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80))
+        http_session.head(f"{origin}/wp-json/", timeout=timeout, allow_redirects=False)
+        return True
+    except Exception as e:
+        logger.debug("🔥 Warm-up failed for %s: %s", origin, e)
+        return False
+
+
+def _origins(website_urls: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(
+        f"{parsed.scheme}://{parsed.netloc}"
+        for parsed in map(urlparse, website_urls) if parsed.netloc
+    ))
+
+
+def prewarm_connections(website_urls: Iterable[str], max_workers: int = 8, timeout: float = 5) -> int:
+    """Resolve DNS and open a pooled connection to every distinct site; returns the number warmed"""
+    origins = _origins(website_urls)
+    if not origins:
+        return 0
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        warmed = sum(executor.map(lambda origin: _warm(origin, timeout), origins))
+    logger.info(f"🔥 Pre-warmed {warmed}/{len(origins)} sites in {time.monotonic() - started:.1f}s")
+    return warmed
+
+
+def start_prewarm(website_urls: Iterable[str], max_workers: int = 8) -> threading.Thread:
+    """Run prewarm_connections in a background thread"""
+    thread = threading.Thread(target=prewarm_connections, args=(list(website_urls), max_workers),
+                              name="prewarm-connections", daemon=True)
+    thread.start()
+    return thread
+
+
+def prewarm_new_sites(previous: Iterable[Any], snapshot: Iterable[Any]) -> Optional[threading.Thread]:
+    """ConfigStore listener: pre-warm the sites a new snapshot adds (all of them on the first load)"""
+    known = set(_origins(config.website_url for config in previous))
+    added = [origin for origin in _origins(config.website_url for config in snapshot) if origin not in known]
+    if not added:
+        return None
+    return start_prewarm(added)
@@ -0,0 +1,116 @@
+"""
+Idempotency-Key support for link endpoints
+Stores the outcome of an operation per key so client retries are answered
+from memory instead of repeating the WordPress GET+POST
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Optional, Tuple, Type
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyKeyConflict(ValueError):
+    """Raised when a key is reused with a different request payload"""
+
+
+def request_fingerprint(payload: str) -> str:
+    """Hash a serialized request body so key reuse with other data can be detected"""
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "future", "expires_at")
+
+    def __init__(self, fingerprint: str, future: Future):
+        self.fingerprint = fingerprint
+        self.future = future
+        self.expires_at: Optional[float] = None  # None while the first attempt is running
+
+
+class IdempotencyStore:
+    """
+    In-memory outcome store keyed by Idempotency-Key
+
+    - The first request for a key runs the operation
+    - Repeats arriving while it runs wait for that same attempt
+    - Repeats arriving later get the stored outcome until the TTL expires
+    Exceptions listed in replay_exceptions (e.g. HTTPException) are part of the
+    outcome and replayed; any other exception releases the key so a retry runs again.
+    """
+
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 10000,
+                 replay_exceptions: Tuple[Type[BaseException], ...] = ()):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.replay_exceptions = replay_exceptions
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        expired = [key for key, entry in self._entries.items()
+                   if entry.expires_at is not None and entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+        # Evict oldest finished entries when over capacity; in-flight entries are never evicted
+        if len(self._entries) > self.max_entries:
+            for key in [k for k, e in self._entries.items() if e.expires_at is not None]:
+                if len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[key]
+
+    async def execute(self, key: str, fingerprint: str,
+                      operation: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run operation at most once per key
+        Returns (result, replayed) where replayed is True if the outcome came from an earlier attempt
+        """
+        with self._lock:
+            self._purge(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.fingerprint != fingerprint:
+                    raise IdempotencyKeyConflict(
+                        f"{IDEMPOTENCY_HEADER} was already used with a different request")
+                owner = False
+            else:
+                entry = _Entry(fingerprint, Future())
+                self._entries[key] = entry
+                owner = True
+
+        if not owner:
+            logger.info(f"🔁 Replaying outcome for {IDEMPOTENCY_HEADER} {key}")
+            return await asyncio.wrap_future(entry.future), True
+
+        try:
+            result = await operation()
+        except self.replay_exceptions as e:
+            self._finish(key, entry)
+            entry.future.set_exception(e)
+            raise
+        except BaseException as e:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            entry.future.set_exception(e)
+            raise
+
+        self._finish(key, entry)
+        entry.future.set_result(result)
+        return result, False
+
+    def _finish(self, key: str, entry: _Entry):
+        with self._lock:
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            if key in self._entries:
+                self._entries.move_to_end(key)
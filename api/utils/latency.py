@@ -0,0 +1,231 @@
+"""
+Per-site latency profile
+Every page GET and update feeds an EWMA and a window of recent samples per site (and an
+optional background probe keeps idle sites measured). Bulk runs use the profile to start
+the slowest sites first, which shortens the run when work is spread over a thread pool.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+import logging
+
+from requests.auth import HTTPBasicAuth
+
+from .http_client import http_session
+from .rate_limit import rate_limiter, site_key
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 200  # Samples kept per site and operation for the p95
+
+
+class _Stats:
+    __slots__ = ("ewma_ms", "samples", "count", "errors", "last_at")
+
+    def __init__(self):
+        self.ewma_ms: Optional[float] = None
+        self.samples: Deque[float] = deque(maxlen=WINDOW)
+        self.count = 0
+        self.errors = 0
+        self.last_at: Optional[str] = None
+
+    def add(self, ms: float, ok: bool, alpha: float):
+        self.ewma_ms = ms if self.ewma_ms is None else alpha * ms + (1 - alpha) * self.ewma_ms
+        self.samples.append(ms)
+        self.count += 1
+        self.errors += 0 if ok else 1
+        self.last_at = datetime.now().isoformat()
+
+    def p95_ms(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        p95 = self.p95_ms()
+        return {
+            "ewma_ms": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "count": self.count,
+            "errors": self.errors,
+            "last_at": self.last_at,
+            "samples": [round(ms, 1) for ms in self.samples],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "_Stats":
+        stats = cls()
+        stats.ewma_ms = data.get("ewma_ms")
+        stats.samples.extend(data.get("samples") or [])
+        stats.count = data.get("count", 0)
+        stats.errors = data.get("errors", 0)
+        stats.last_at = data.get("last_at")
+        return stats
+
+
+class LatencyProfile:
+    """
+    EWMA (weight alpha) and p95 of recent GET/update/probe times per site
+
+    The profile is written to path at most every save_interval seconds (and on flush()),
+    so the API and the bulk CLI build on each other's measurements.
+    """
+
+    def __init__(self, path: Optional[str] = None, alpha: float = 0.3, save_interval: float = 30):
+        self.path = path
+        self.alpha = alpha
+        self.save_interval = save_interval
+        self._sites: Dict[str, Dict[str, _Stats]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            self._sites = {site: {operation: _Stats.from_dict(stats) for operation, stats in operations.items()}
+                           for site, operations in data.get("sites", {}).items()}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not read latency profile {self.path}: {e}")
+
+    def record(self, website_url: str, operation: str, seconds: float, ok: bool = True):
+        with self._lock:
+            stats = self._sites.setdefault(site_key(website_url), {}).setdefault(operation, _Stats())
+            stats.add(seconds * 1000, ok, self.alpha)
+            self._dirty = True
+            due = time.monotonic() - self._saved_at > self.save_interval
+        if due:
+            self.flush()
+
+    def expected_ms(self, website_url: str) -> Optional[float]:
+        """Expected time of one read-modify-write on the site (None if never measured)"""
+        with self._lock:
+            operations = self._sites.get(site_key(website_url), {})
+            get = operations.get("get") or operations.get("probe")
+            update = operations.get("update")
+        if get is None or get.ewma_ms is None:
+            return None
+        # Without update measurements, assume an update costs about as much as a GET
+        return get.ewma_ms + (update.ewma_ms if update and update.ewma_ms is not None else get.ewma_ms)
+
+    def slowest_first(self, items: Iterable[Any], website_url: Callable[[Any], str]) -> List[Any]:
+        """
+        items ordered by expected time, longest first (longest-processing-time scheduling)
+        Sites without measurements are treated as the slowest, so they are measured early.
+        """
+        items = list(items)
+        expected = [self.expected_ms(website_url(item)) for item in items]
+        order = sorted(range(len(items)), key=lambda i: (expected[i] is not None, -(expected[i] or 0)))
+        return [items[i] for i in order]
+
+    def report(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-site stats, slowest first"""
+        with self._lock:
+            sites = {site: {operation: stats.to_dict() for operation, stats in operations.items()}
+                     for site, operations in self._sites.items()}
+        rows = []
+        for site, operations in sites.items():
+            for stats in operations.values():
+                del stats["samples"]
+            expected = self.expected_ms(site)
+            rows.append({"site": site, "expected_ms": round(expected, 1) if expected is not None else None, **operations})
+        rows.sort(key=lambda row: -(row["expected_ms"] or 0))
+        return rows[:limit] if limit else rows
+
+    def flush(self):
+        """Write the profile to disk if it changed"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"updated_at": datetime.now().isoformat(),
+                    "sites": {site: {operation: stats.to_dict() for operation, stats in operations.items()}
+                              for site, operations in self._sites.items()}}
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            partial = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(partial, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(partial, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save latency profile {self.path}: {e}")
+
+
+class Timer:
+    """Context manager recording the duration of an operation on a site (an exception counts as an error)"""
+
+    __slots__ = ("website_url", "operation", "profile", "ok", "started")
+
+    def __init__(self, website_url: str, operation: str, profile: Optional[LatencyProfile] = None):
+        self.website_url = website_url
+        self.operation = operation
+        self.profile = profile or latency_profile
+        self.ok = True
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.record(self.website_url, self.operation, time.perf_counter() - self.started,
+                            ok=self.ok and exc_type is None)
+        return False
+
+
+def start_probe(configs: Callable[[], Iterable[Any]], interval: float, max_workers: int = 8,
+                timeout: float = 15, profile: Optional[LatencyProfile] = None) -> threading.Thread:
+    """
+    Every interval seconds, time a minimal GET of each site's link page (only its id is returned)
+    configs is called on every round, so sites added later are probed too
+    """
+    profile = profile or latency_profile
+
+    def probe(config):
+        with rate_limiter.acquired(config.website_url), Timer(config.website_url, "probe", profile) as timing:
+            try:
+                response = http_session.get(
+                    f"{config.website_url.rstrip('/')}/wp-json/wp/v2/pages/{config.page_id}",
+                    params={"_fields": "id"},
+                    auth=HTTPBasicAuth(config.username, config.app_password),
+                    timeout=timeout
+                )
+                timing.ok = response.status_code == 200
+            except Exception:
+                timing.ok = False
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                sites = list(configs())
+                with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sites)))) as executor:
+                    list(executor.map(probe, sites))
+                profile.flush()
+                logger.debug("⏱️ Probed %d sites", len(sites))
+            except Exception as e:
+                logger.error(f"❌ Latency probe failed: {e}")
+
+    thread = threading.Thread(target=run, name="latency-probe", daemon=True)
+    thread.start()
+    logger.info(f"⏱️ Probing site latency every {interval:.0f}s")
+    return thread
+
+
+latency_profile = LatencyProfile(
+    os.environ.get("LATENCY_PROFILE_PATH", str(Path(__file__).parent.parent / "data" / "latency_profile.json"))
+)
@@ -0,0 +1,143 @@
+"""
+Links x sites matrix
+A campaign is a list of (site, anchor, url) triples. Triples are grouped per resolved site
+config (so www. and bare-domain entries for one site share a group) and each group is
+written with one read-modify-write of the link page, instead of one per link.
+"""
+
+import csv
+import io
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from .latency import latency_profile
+from .wordpress import ERROR_NOT_FOUND, ERROR_OTHER, add_links_to_page
+
+logger = logging.getLogger(__name__)
+
+# Accepted column / key names per field
+FIELD_ALIASES = {
+    "website_url": ("website_url", "site", "website"),
+    "anchor_text": ("anchor_text", "anchor"),
+    "link_url": ("link_url", "url", "link"),
+}
+
+
+def _entry(row: Dict[str, Any], where: str) -> Dict[str, str]:
+    normalized = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    entry = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = next((normalized[alias] for alias in aliases if normalized.get(alias)), None)
+        if value is None or not str(value).strip():
+            raise ValueError(f"{where}: missing {field}")
+        entry[field] = str(value).strip()
+    return entry
+
+
+def parse_matrix(text: str) -> List[Dict[str, str]]:
+    """
+    Triples from JSON (a list of objects, or {"entries": [...]}) or CSV with a header row
+    (comma, semicolon or tab separated); raises ValueError naming the offending row
+    """
+    text = text.lstrip("\ufeff")
+    if text.lstrip().startswith(("[", "{")):
+        data = json.loads(text)
+        rows = data.get("entries", []) if isinstance(data, dict) else data
+        return [_entry(row, f"Entry {i}") for i, row in enumerate(rows, 1)]
+
+    try:
+        dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    return [_entry(row, f"Row {i}") for i, row in enumerate(reader, 2) if any((value or "").strip() for value in row.values())]
+
+
+def plan_link_matrix(entries: Sequence[Dict[str, str]], resolve: Callable[[str], Optional[Any]]
+                     ) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    Group triples by the config resolve(website_url) returns
+    Returns (groups of {config, links, positions}, positions of triples without a config)
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    unresolved: List[int] = []
+    for position, entry in enumerate(entries):
+        config = resolve(entry["website_url"])
+        if config is None:
+            unresolved.append(position)
+            continue
+        group = groups.setdefault(config.website_url.rstrip("/").lower(),
+                                  {"config": config, "links": [], "positions": []})
+        group["links"].append((entry["anchor_text"], entry["link_url"]))
+        group["positions"].append(position)
+    return list(groups.values()), unresolved
+
+
+def run_link_matrix(entries: Sequence[Dict[str, str]], resolve: Callable[[str], Optional[Any]],
+                    page_id: Optional[int] = None, max_workers: int = 8, timeout: int = 60) -> List[Dict[str, Any]]:
+    """
+    Add every triple; one result per triple, in input order
+    Results carry the LinkResponse fields (error kind and fetch/update timings) plus duration_ms
+    of their site's write
+    """
+    groups, unresolved = plan_link_matrix(entries, resolve)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+
+    def result(position: int, **fields) -> Dict[str, Any]:
+        entry = entries[position]
+        return {"website_url": entry["website_url"], "anchor_text": entry["anchor_text"],
+                "link_url": entry["link_url"], **fields}
+
+    for position in unresolved:
+        results[position] = result(position, resolved_url=None, success=False,
+                                   message="Website configuration not found", page_id=page_id or 0, link_added=False,
+                                   error=ERROR_NOT_FOUND, fetch_ms=None, update_ms=None, duration_ms=None)
+
+    def write(group: Dict[str, Any]):
+        config = group["config"]
+        started = time.perf_counter()
+        try:
+            responses = [response.to_dict() for response in
+                         add_links_to_page(config, group["links"], page_id, timeout)]
+        except Exception as e:
+            logger.error(f"❌ Matrix write to {config.website_url} failed: {e}")
+            responses = [{"success": False, "message": f"Error: {e}", "page_id": page_id or config.page_id,
+                          "link_added": False, "error": ERROR_OTHER, "fetch_ms": None, "update_ms": None}
+                         for _ in group["links"]]
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        for position, response in zip(group["positions"], responses):
+            response.pop("website_url", None)
+            results[position] = result(position, resolved_url=config.website_url, duration_ms=duration_ms, **response)
+
+    def collect(done):
+        # write handles WordPress errors itself; anything else surfaces here instead of vanishing
+        for future in done:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"❌ Matrix write failed: {e}")
+
+    if groups:
+        ordered = latency_profile.slowest_first(groups, lambda group: group["config"].website_url)
+        workers = max(1, min(max_workers, len(ordered)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Bound the number of site writes queued in the executor
+            in_flight = set()
+            for group in ordered:
+                if len(in_flight) >= workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(write, group))
+            collect(wait(in_flight).done)
+
+    for position, row in enumerate(results):
+        if row is None:
+            results[position] = result(position, resolved_url=None, success=False, message="Error: no result",
+                                       page_id=page_id or 0, link_added=False, error=ERROR_OTHER,
+                                       fetch_ms=None, update_ms=None, duration_ms=None)
+    logger.info(f"🧮 Matrix: {len(entries)} links on {len(groups)} sites, "
+                f"{sum(1 for r in results if r['success'])} succeeded")
+    return results
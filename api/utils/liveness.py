@@ -0,0 +1,113 @@
+"""
+Liveness checks for link targets
+HEAD requests (falling back to GET) run concurrently with a per-host limit,
+and results are cached so repeated checks across sites cost nothing
+Link targets are arbitrary hosts, so the checks use external_session: they are not
+throttled by (and do not spend) the WordPress rate limiter.
+"""
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+from urllib.parse import urlparse
+import logging
+
+import requests
+
+from .http_client import external_session
+
+logger = logging.getLogger(__name__)
+
+_HREF_PATTERN = re.compile(r'<a\s[^>]*href=["\']([^"\']+)["\']', re.IGNORECASE)
+
+
+def extract_links(content: str) -> List[str]:
+    """Absolute http(s) link targets in a page's HTML, in order, without duplicates"""
+    links = (match.strip() for match in _HREF_PATTERN.findall(content or ""))
+    return list(dict.fromkeys(link for link in links if link.startswith(("http://", "https://"))))
+
+
+class LivenessChecker:
+    """
+    Checks whether link targets resolve
+
+    A target is alive when HEAD, or GET if HEAD fails or returns >= 400,
+    ends in a status below 400 after redirects. Alive results are cached for
+    ttl_seconds, dead ones for dead_ttl_seconds so transient failures are retried sooner.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, dead_ttl_seconds: float = 300, per_host_limit: int = 2,
+                 max_workers: int = 16, timeout: float = 10):
+        self.ttl_seconds = ttl_seconds
+        self.dead_ttl_seconds = dead_ttl_seconds
+        self.per_host_limit = per_host_limit
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._expires: Dict[str, float] = {}
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            return self._host_limits.setdefault(host, threading.BoundedSemaphore(self.per_host_limit))
+
+    def _probe(self, url: str) -> Dict[str, Any]:
+        status_code = None
+        error = None
+        with self._host_limit(url):
+            try:
+                response = external_session.head(url, allow_redirects=True, timeout=self.timeout)
+                status_code = response.status_code
+            except requests.RequestException as e:
+                error = str(e)
+
+            if status_code is None or status_code >= 400:
+                # Plenty of servers reject HEAD; only the status line of a GET is read
+                try:
+                    response = external_session.get(url, allow_redirects=True, timeout=self.timeout, stream=True)
+                    response.close()
+                    status_code, error = response.status_code, None
+                except requests.RequestException as e:
+                    error = error or str(e)
+
+        return {
+            'url': url,
+            'alive': status_code is not None and status_code < 400,
+            'status_code': status_code,
+            'error': error,
+            'checked_at': datetime.now().isoformat()
+        }
+
+    def check(self, url: str) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached is not None and self._expires[url] > now:
+                return dict(cached, cached=True)
+
+        result = self._probe(url)
+        with self._lock:
+            self._cache[url] = result
+            self._expires[url] = now + (self.ttl_seconds if result['alive'] else self.dead_ttl_seconds)
+        if not result['alive']:
+            logger.warning("💀 Dead link target %s (%s)", url, result['error'] or f"HTTP {result['status_code']}")
+        return dict(result, cached=False)
+
+    def check_many(self, urls: Iterable[str]) -> List[Dict[str, Any]]:
+        """Check distinct URLs concurrently; results keep the input order"""
+        unique = list(dict.fromkeys(urls))
+        if not unique:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique))) as executor:
+            return list(executor.map(self.check, unique))
+
+
+# Shared checker so the cache is reused across endpoints and bulk runs
+link_checker = LivenessChecker(per_host_limit=int(os.environ.get("LINK_CHECK_PER_HOST", 2)),
+                               max_workers=int(os.environ.get("LINK_CHECK_WORKERS", 16)))
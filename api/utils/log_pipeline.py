@@ -0,0 +1,125 @@
+"""
+Non-blocking logging pipeline
+Request and worker threads only put records on a queue; a background listener
+formats them and writes to the console/file handlers
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+from typing import List, Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via extra= and ends up in JSON output
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Let through only 1 in every `rate` DEBUG records; INFO and above always pass"""
+
+    def __init__(self, rate: int = 1):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        return next(self._counter) % self.rate == 0
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: Optional[str] = None, handlers: Optional[List[logging.Handler]] = None,
+                  fmt: str = DEFAULT_FORMAT, json_format: Optional[bool] = None,
+                  debug_sample_rate: Optional[int] = None, use_queue: bool = True) -> None:
+    """
+    Configure the root logger
+
+    Defaults come from the environment:
+    - LOG_LEVEL (default INFO)
+    - LOG_FORMAT=json for structured JSON records
+    - LOG_DEBUG_SAMPLE_RATE=N to keep 1 in N debug records
+    With use_queue=False the handlers are attached directly (e.g. on serverless,
+    where a background thread may be frozen between invocations).
+    """
+    global _listener
+
+    level = level or os.getenv('LOG_LEVEL', 'INFO')
+    if json_format is None:
+        json_format = os.getenv('LOG_FORMAT', '').lower() == 'json'
+    if debug_sample_rate is None:
+        debug_sample_rate = int(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1'))
+    handlers = handlers or [logging.StreamHandler()]
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(fmt)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    sampling = DebugSamplingFilter(debug_sample_rate)
+    if not use_queue:
+        for handler in handlers:
+            handler.addFilter(sampling)
+            root.addHandler(handler)
+        return
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(sampling)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
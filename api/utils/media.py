@@ -0,0 +1,343 @@
+"""
+Media uploads for blog posts, deduplicated by content hash
+A featured or inline image is downloaded (or read) once into a local cache file named after its
+SHA-256, streamed from disk for every upload, and uploaded at most once per site: the
+hash -> media ID map per site is kept on disk, so re-publishing reuses the existing media item.
+Image URLs come from API callers, so they are fetched with external_session (not the WordPress
+rate limiter) and only from public http(s) addresses, also after redirects.
+"""
+
+import hashlib
+import ipaddress
+import json
+import mimetypes
+import os
+import re
+import socket
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote, urljoin, urlparse
+import logging
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+from .blogs import WordPressError, response_error
+from .http_client import external_session, http_session
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+MAX_REDIRECTS = 5
+
+_IMG_SRC_PATTERN = re.compile(r'(<img\s[^>]*src=["\'])([^"\']+)(["\'])', re.IGNORECASE)
+
+
+class MediaFile:
+    """A local copy of an image: path, content hash, upload filename and MIME type"""
+
+    __slots__ = ("path", "sha256", "filename", "mime_type")
+
+    def __init__(self, path: str, sha256: str, filename: str, mime_type: str):
+        self.path = path
+        self.sha256 = sha256
+        self.filename = filename
+        self.mime_type = mime_type
+
+
+def check_public_url(url: str):
+    """Raise WordPressError (400) unless url is http(s) and its host resolves only to public addresses"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise WordPressError(f"Image {url} is not an http(s) URL", 400)
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80),
+                                   proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise WordPressError(f"Image host {parsed.hostname} does not resolve", 400)
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise WordPressError(f"Image {url} points to a private or local address", 400)
+
+
+class MediaSources:
+    """
+    Fetches image sources (http(s) URLs or local paths) into cache_dir, once per source
+
+    Downloads are streamed to disk in chunks and hashed on the way, so large images never sit
+    in memory. Local files are hashed in place (again per (path, size, mtime)) and must be
+    inside local_root; without local_root only URLs are accepted. URLs (and every redirect)
+    must resolve to public addresses unless allow_private is set.
+    """
+
+    def __init__(self, cache_dir: str, local_root: Optional[str] = None, timeout: float = 60,
+                 allow_private: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.local_root = os.path.realpath(local_root) if local_root else None
+        self.timeout = timeout
+        self.allow_private = allow_private
+        self._files: Dict[Any, MediaFile] = {}
+        self._locks: Dict[Any, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, source: str) -> MediaFile:
+        remote = "://" in source
+        if remote:
+            if not self.allow_private:
+                check_public_url(source)
+            elif not source.startswith(("http://", "https://")):
+                raise WordPressError(f"Image {source} is not an http(s) URL", 400)
+            key: Any = source
+        else:
+            path = os.path.realpath(os.path.join(self.local_root or "", source))
+            if not self.local_root or os.path.commonpath([path, self.local_root]) != self.local_root:
+                raise WordPressError(f"Image {source} is not a URL or a file under the media directory", 400)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                raise WordPressError(f"Image {source} not found", 400)
+            source = path
+            key = (path, stat.st_size, stat.st_mtime)
+        with self._lock:
+            cached = self._files.get(key)
+            lock = self._locks.setdefault(key, threading.Lock())
+        # A cache file removed from disk (tmp cleanup, another cache_dir) is fetched again
+        if cached is not None and os.path.exists(cached.path):
+            return cached
+        with lock:
+            cached = self._files.get(key)
+            if cached is None or not os.path.exists(cached.path):
+                cached = self._files[key] = self._download(source) if remote else self._hash_local(source)
+            return cached
+
+    def _open(self, url: str) -> requests.Response:
+        """Streamed GET; redirects are followed by hand so every hop is checked"""
+        for _ in range(MAX_REDIRECTS + 1):
+            response = external_session.get(url, stream=True, timeout=self.timeout, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            response.close()
+            url = urljoin(url, response.headers["Location"])
+            if not self.allow_private:
+                check_public_url(url)
+            elif not url.startswith(("http://", "https://")):
+                raise WordPressError(f"Image redirect to {url} is not an http(s) URL", 400)
+        raise WordPressError(f"Too many redirects for image {url}", 400)
+
+    def _download(self, url: str) -> MediaFile:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        handle, partial = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(handle, "wb") as file, self._open(url) as response:
+                if response.status_code != 200:
+                    raise WordPressError(f"Failed to download {url}: {response.status_code}", 400)
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    file.write(chunk)
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        except requests.exceptions.RequestException as e:
+            os.unlink(partial)
+            raise WordPressError(f"Failed to download {url}: {e}", 400)
+        except BaseException:
+            os.unlink(partial)
+            raise
+
+        sha256 = digest.hexdigest()
+        filename = os.path.basename(urlparse(url).path) or sha256[:16]
+        mime_type = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if not os.path.splitext(filename)[1]:
+            filename += mimetypes.guess_extension(mime_type) or ""
+        path = self.cache_dir / sha256
+        os.replace(partial, path)
+        logger.info(f"🖼️ Downloaded {url} ({path.stat().st_size} bytes, {sha256[:12]})")
+        return MediaFile(str(path), sha256, filename, mime_type)
+
+    def _hash_local(self, path: str) -> MediaFile:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        filename = os.path.basename(path)
+        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return MediaFile(path, digest.hexdigest(), filename, mime_type)
+
+
+class MediaLibrary:
+    """
+    Per-site map of content hash -> {id, source_url}, persisted as JSON at path
+
+    A hash that is not in the map is first searched for on the site (uploads carry the hash
+    in their title, so media uploaded before the map was lost are found), then uploaded.
+    One upload per site and hash runs at a time.
+    """
+
+    def __init__(self, path: Optional[str], sources: MediaSources, timeout: float = 120):
+        self.path = path
+        self.sources = sources
+        self.timeout = timeout
+        self._media: Dict[str, Dict[str, Dict[str, Any]]] = self._load()
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not read media map {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._media, indent=2)
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            partial = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(partial, "w", encoding="utf-8") as file:
+                file.write(data)
+            os.replace(partial, self.path)
+        except OSError as e:
+            # The map is an optimization; without it the next publish finds the media by search
+            logger.warning(f"⚠️ Could not save media map {self.path}: {e}")
+
+    @staticmethod
+    def _site_key(config) -> str:
+        return config.website_url.rstrip("/").lower()
+
+    def ensure(self, config, source: str) -> Dict[str, Any]:
+        """{id, source_url} of source on the site, uploading it if the site does not have it yet"""
+        media = self.sources.get(source)
+        site = self._site_key(config)
+        with self._lock:
+            known = self._media.get(site, {}).get(media.sha256)
+            lock = self._locks.setdefault((site, media.sha256), threading.Lock())
+        if known is not None:
+            return known
+        with lock:
+            with self._lock:
+                known = self._media.get(site, {}).get(media.sha256)
+            if known is not None:
+                return known
+            item = _find_media(config, media, self.timeout) or _upload_media(config, media, self.timeout)
+            with self._lock:
+                self._media.setdefault(site, {})[media.sha256] = item
+            self._save()
+            return item
+
+    def replace_inline_images(self, config, content: str) -> str:
+        """Upload every <img src> in content that is not on the site yet and point it at the upload"""
+        site_host = urlparse(config.website_url).netloc.lower()
+
+        def replace(match):
+            source = match.group(2)
+            if source.startswith("data:") or urlparse(source).netloc.lower() == site_host:
+                return match.group(0)
+            item = self.ensure(config, source)
+            return f"{match.group(1)}{item.get('source_url') or source}{match.group(3)}"
+        return _IMG_SRC_PATTERN.sub(replace, content)
+
+    def forget(self, config, media_id: int):
+        """Drop a media item that no longer exists on the site"""
+        site = self._site_key(config)
+        with self._lock:
+            entries = self._media.get(site, {})
+            for sha256 in [sha256 for sha256, item in entries.items() if item["id"] == media_id]:
+                del entries[sha256]
+        self._save()
+
+
+def _media_title(media: MediaFile) -> str:
+    return f"{os.path.splitext(media.filename)[0]} [{media.sha256[:16]}]"
+
+
+def _find_media(config, media: MediaFile, timeout: float) -> Optional[Dict[str, Any]]:
+    """The site's media item for media, or None (also when the search itself fails: then it is uploaded)"""
+    try:
+        response = http_session.get(
+            f"{config.website_url.rstrip('/')}/wp-json/wp/v2/media",
+            params={"search": media.sha256[:16], "_fields": "id,title,source_url", "per_page": 10},
+            auth=HTTPBasicAuth(config.username, config.app_password),
+            timeout=timeout
+        )
+    except requests.exceptions.Timeout:
+        raise WordPressError(f"Failed to search media for {media.filename}: request timeout", 504)
+    except requests.exceptions.RequestException as e:
+        raise WordPressError(f"Failed to search media for {media.filename}: {e}")
+    if response.status_code != 200:
+        logger.warning(f"⚠️ Media search on {config.website_url} failed ({response.status_code}), uploading {media.filename}")
+        return None
+    try:
+        items = response.json()
+    except ValueError:
+        logger.warning(f"⚠️ Media search on {config.website_url} returned no JSON, uploading {media.filename}")
+        return None
+    for item in items if isinstance(items, list) else []:
+        if media.sha256[:16] in item.get("title", {}).get("rendered", ""):
+            return {"id": item["id"], "source_url": item.get("source_url")}
+    return None
+
+
+def content_disposition(filename: str) -> str:
+    """Content-Disposition for an upload: a plain ASCII fallback plus the RFC 5987 UTF-8 name"""
+    fallback = re.sub(r'[^A-Za-z0-9._-]+', "_", filename.encode("ascii", "ignore").decode()).strip("._") or "upload"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def _upload_media(config, media: MediaFile, timeout: float) -> Dict[str, Any]:
+    api_base = f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
+    auth = HTTPBasicAuth(config.username, config.app_password)
+    try:
+        # The file object is streamed as the request body
+        with open(media.path, "rb") as file:
+            response = http_session.post(
+                f"{api_base}/media",
+                data=file,
+                headers={
+                    "Content-Type": media.mime_type,
+                    "Content-Disposition": content_disposition(media.filename),
+                    "Content-Length": str(os.path.getsize(media.path)),
+                },
+                params={"_fields": "id,source_url"},
+                auth=auth,
+                timeout=timeout
+            )
+    except requests.exceptions.Timeout:
+        raise WordPressError(f"Failed to upload {media.filename}: request timeout", 504)
+    except requests.exceptions.RequestException as e:
+        raise WordPressError(f"Failed to upload {media.filename}: {e}")
+    if response.status_code not in (200, 201):
+        raise response_error(response, f"upload {media.filename}")
+    try:
+        item = response.json()
+    except ValueError:
+        item = None
+    if not isinstance(item, dict) or "id" not in item:
+        raise WordPressError(f"Failed to upload {media.filename}: no media ID in response")
+
+    # Tag the upload with its hash so it can be found again without the local map. Best effort:
+    # the upload exists either way, and the map still records it
+    try:
+        tagged = http_session.post(f"{api_base}/media/{item['id']}", json={"title": _media_title(media)},
+                                   params={"_fields": "id"}, auth=auth, timeout=timeout)
+        if tagged.status_code not in (200, 201):
+            logger.warning(f"⚠️ Could not tag media {item['id']} on {config.website_url}: {tagged.status_code}")
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"⚠️ Could not tag media {item['id']} on {config.website_url}: {e}")
+    logger.info(f"📤 Uploaded {media.filename} to {config.website_url} (media {item['id']})")
+    return {"id": item["id"], "source_url": item.get("source_url")}
+
+
+media_library = MediaLibrary(
+    os.environ.get("MEDIA_MAP_PATH", str(Path(__file__).parent.parent / "data" / "media_map.json")),
+    MediaSources(os.environ.get("MEDIA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "wp-media-cache")),
+                 local_root=os.environ.get("MEDIA_LOCAL_ROOT"),
+                 allow_private=os.environ.get("MEDIA_ALLOW_PRIVATE_URLS", "").lower() in ("1", "true", "yes"))
+)
@@ -0,0 +1,142 @@
+"""
+page_id discovery for sites whose link page is not configured
+Page listings are fetched with only id/slug/title/parent per page and cached per site,
+so repeated runs over the whole fleet mostly hit the cache
+"""
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Pattern, Sequence
+import html
+import logging
+
+from requests.auth import HTTPBasicAuth
+
+from .http_client import http_session
+
+logger = logging.getLogger(__name__)
+
+# Slugs link pages usually have, most likely first
+DEFAULT_SLUGS = ("links", "linkpartners", "partners", "handige-links", "nuttige-links", "interessante-links")
+
+PER_PAGE = 100  # WordPress maximum
+
+
+class PageListingCache:
+    """Per-site list of {id, slug, title, parent} dicts, kept for ttl_seconds"""
+
+    def __init__(self, ttl_seconds: float = 3600):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, config, refresh: bool = False, timeout: float = 15) -> List[Dict[str, Any]]:
+        key = (config.website_url.rstrip("/").lower(), config.username)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] > now and not refresh:
+            return entry[1]
+
+        pages = _fetch_listing(config, timeout)
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, pages)
+        return pages
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _fetch_listing(config, timeout: float) -> List[Dict[str, Any]]:
+    api_base = f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
+    pages: List[Dict[str, Any]] = []
+    page_number, total_pages = 1, 1
+    while page_number <= total_pages:
+        response = http_session.get(
+            f"{api_base}/pages",
+            params={"per_page": PER_PAGE, "page": page_number, "orderby": "id", "order": "asc",
+                    "_fields": "id,slug,title,parent"},
+            auth=HTTPBasicAuth(config.username, config.app_password),
+            timeout=timeout
+        )
+        response.raise_for_status()
+        total_pages = int(response.headers.get("X-WP-TotalPages", 1) or 1)
+        for page in response.json():
+            pages.append({
+                "id": page["id"],
+                "slug": page.get("slug", ""),
+                "title": html.unescape(page.get("title", {}).get("rendered", "")),
+                "parent": page.get("parent", 0),
+            })
+        page_number += 1
+    return pages
+
+
+page_listings = PageListingCache(ttl_seconds=float(os.environ.get("PAGE_LISTING_TTL", 3600)))
+
+
+def match_link_page(pages: Sequence[Dict[str, Any]], slugs: Sequence[str],
+                    title_pattern: Optional[Pattern] = None) -> List[Dict[str, Any]]:
+    """
+    Candidate link pages, best first
+    Slug matches rank by their position in slugs; title matches come after them.
+    Continuation pages (children of another candidate) are left out.
+    """
+    rank = {slug: i for i, slug in enumerate(slugs)}
+    by_slug = sorted((page for page in pages if page["slug"] in rank), key=lambda page: rank[page["slug"]])
+    by_title = [page for page in pages
+                if title_pattern is not None and page["slug"] not in rank and title_pattern.search(page["title"])]
+    candidates = by_slug + by_title
+    ids = {page["id"] for page in candidates}
+    return [page for page in candidates if page["parent"] not in ids]
+
+
+def discover_page_id(config, slugs: Sequence[str] = DEFAULT_SLUGS, title_pattern: Optional[Pattern] = None,
+                     refresh: bool = False, timeout: float = 15) -> Dict[str, Any]:
+    """
+    Look up the link page of one site
+    status is 'found' (page_id set), 'ambiguous' (several equally good candidates),
+    'not_found' or 'error'
+    """
+    result = {"website_url": config.website_url, "site_name": config.site_name,
+              "status": "not_found", "page_id": None, "candidates": [], "message": None}
+    try:
+        pages = page_listings.get(config, refresh=refresh, timeout=timeout)
+    except Exception as e:
+        result.update(status="error", message=str(e))
+        return result
+
+    candidates = match_link_page(pages, slugs, title_pattern)
+    result["candidates"] = candidates[:10]
+    if not candidates:
+        result["message"] = f"No matching page among {len(pages)} pages"
+        return result
+    
+    best = candidates[0]
+    # A slug match beats everything ranked after it; title-only matches must be unique
+    unique = len(candidates) == 1 or (best["slug"] in slugs and best["slug"] != candidates[1]["slug"])
+    if unique:
+        result.update(status="found", page_id=best["id"], message=f"Matched '{best['slug']}' ({best['title']})")
+    else:
+        result.update(status="ambiguous", message=f"{len(candidates)} candidate pages")
+    return result
+
+
+def discover_page_ids(configs: Sequence[Any], slugs: Sequence[str] = DEFAULT_SLUGS,
+                      title_pattern: Optional[str] = None, refresh: bool = False,
+                      max_workers: int = 8) -> List[Dict[str, Any]]:
+    """Discover page IDs for several sites concurrently; results keep the input order"""
+    if not configs:
+        return []
+    pattern = re.compile(title_pattern, re.IGNORECASE) if title_pattern else None
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(configs))) as executor:
+        results = list(executor.map(
+            lambda config: discover_page_id(config, slugs, pattern, refresh), configs
+        ))
+    found = sum(1 for result in results if result["status"] == "found")
+    logger.info(f"🔍 Discovered page IDs for {found}/{len(results)} sites")
+    return results
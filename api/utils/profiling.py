@@ -0,0 +1,256 @@
+"""
+On-demand profiling (opt-in)
+- sampling: the stacks of all threads, sampled every few milliseconds (wall clock), written in
+  the collapsed "folded" format read by flamegraph.pl, speedscope and inferno
+- cprofile: deterministic cProfile of the calling thread (optionally also of the threads started
+  while it runs), written as .pstats (snakeviz, flameprof, gprof2dot)
+- MemoryTracker: tracemalloc snapshots (Snapshot.dump) with the largest growth since the first
+One profile runs at a time; the API only profiles with the PROFILING_TOKEN.
+"""
+
+import cProfile
+import hmac
+import inspect
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sampling", "cprofile")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "wp-profiles"))
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")
+
+# cProfile only sees the thread it was enabled on; in a server that is the event loop
+CPROFILE_THREAD_NOTE = ("cprofile covers the event-loop thread only: sync endpoints and run_in_threadpool work "
+                        "run in worker threads and are missing, use sampling to see them")
+
+_active = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is running"""
+
+
+def token_valid(token: Optional[str]) -> bool:
+    """Profiling over HTTP is off without PROFILING_TOKEN"""
+    return bool(PROFILING_TOKEN) and bool(token) and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+def request_profile_mode(mode: str, endpoint: Optional[Callable]) -> str:
+    """
+    Profiler for one request: a sync endpoint runs in a threadpool worker that cProfile
+    cannot follow, so it gets the sampling profiler (which sees every thread) instead
+    """
+    if mode == "cprofile" and endpoint is not None and not inspect.iscoroutinefunction(endpoint):
+        return "sampling"
+    return mode
+
+
+def _output_path(output_dir: Optional[str], name: str, suffix: str) -> str:
+    directory = Path(output_dir or PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return str(directory / f"{name}-{datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}{suffix}")
+
+
+class SamplingProfiler:
+    """Counts the stack of every thread (but its own) every interval seconds"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str):
+        """Folded stacks: 'thread;outer;...;inner count' per line"""
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self._stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class ThreadedCProfile:
+    """
+    cProfile of the calling thread; with follow_threads also of every thread started while it
+    runs (merged on write). Such a thread stays profiled until it ends, so follow_threads is for
+    short-lived pools like the bulk CLI's, not for a server's worker threads.
+    """
+
+    def __init__(self, follow_threads: bool = False):
+        self.follow_threads = follow_threads
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _profile_new_thread(self, *_):
+        # Runs once per new thread: enabling cProfile replaces this hook for that thread
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def start(self):
+        if self.follow_threads:
+            threading.setprofile(self._profile_new_thread)
+        self._main = cProfile.Profile()
+        self._main.enable()
+
+    def stop(self):
+        self._main.disable()
+        if self.follow_threads:
+            threading.setprofile(None)
+
+    def write(self, path: str):
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            for profile in self._profiles:
+                try:
+                    stats.add(profile)
+                except TypeError:
+                    # A thread that never ran any Python code after enabling
+                    continue
+        stats.dump_stats(path)
+
+
+class ProfileSession:
+    """
+    Profile the with-block in mode (sampling or cprofile); path is set on exit
+    Raises ProfilerBusy when another session is running.
+    """
+
+    def __init__(self, mode: str, name: str, output_dir: Optional[str] = None, interval: float = 0.005,
+                 follow_threads: bool = False):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (expected one of {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.name = name
+        self.output_dir = output_dir
+        self.interval = interval
+        self.follow_threads = follow_threads
+        self.path: Optional[str] = None
+
+    def __enter__(self) -> "ProfileSession":
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusy("Another profile is running")
+        self._profiler = (SamplingProfiler(self.interval) if self.mode == "sampling"
+                          else ThreadedCProfile(self.follow_threads))
+        self._started = time.perf_counter()
+        self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._profiler.stop()
+            self.path = _output_path(self.output_dir, self.name, ".folded" if self.mode == "sampling" else ".pstats")
+            self._profiler.write(self.path)
+            logger.info(f"🔬 {self.mode} profile of {self.name} "
+                        f"({time.perf_counter() - self._started:.2f}s) written to {self.path}")
+        finally:
+            _active.release()
+        return False
+
+
+class MemoryTracker:
+    """
+    tracemalloc snapshots, dumped to output_dir; every snapshot is compared with the first
+    (tracing starts with the first snapshot unless it is already running)
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, name: str = "memory", nframes: int = 10, top: int = 10):
+        self.output_dir = output_dir
+        self.name = name
+        self.nframes = nframes
+        self.top = top
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.nframes)
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            path = _output_path(self.output_dir, self.name, ".tracemalloc")
+            snapshot.dump(path)
+            baseline = self._baseline
+            if baseline is None:
+                self._baseline = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        top = [{
+            "location": str(stat.traceback[0]),
+            "size_kb": round(stat.size / 1024, 1),
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count_diff": stat.count_diff,
+        } for stat in (snapshot.compare_to(baseline, "lineno")[:self.top] if baseline else [])]
+        if top:
+            logger.info(f"🧠 Traced memory {current / 1024 / 1024:.1f} MB (peak {peak / 1024 / 1024:.1f} MB), "
+                        f"largest growth: {top[0]['location']} {top[0]['size_diff_kb']:+.1f} KB")
+        return {"path": path, "traced_mb": round(current / 1024 / 1024, 2), "peak_mb": round(peak / 1024 / 1024, 2),
+                "growth": top}
+
+    def start_periodic(self, interval: float) -> threading.Thread:
+        """A snapshot now and every interval seconds until stop()"""
+        def run():
+            self.snapshot()
+            while not self._stop.wait(interval):
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    logger.error(f"❌ Memory snapshot failed: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="memory-snapshots", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> Dict[str, Any]:
+        """A last snapshot, then stop tracing (the next snapshot starts a new baseline)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        result = self.snapshot()
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+        return result
+
+
+memory_tracker = MemoryTracker(name="api-memory")
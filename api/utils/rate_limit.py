@@ -0,0 +1,254 @@
+"""
+Outbound rate limiting for WordPress traffic
+Every request takes a token from one global bucket and from its site's bucket (www. and the
+bare domain share one), so the aggregate rate can be pushed up without any single site seeing
+more than its own limit. A site answering 429/503 is paused for its Retry-After. The shared
+http_session applies the limiter to every call; other clients call wait()/wait_async() themselves.
+Timed calls take their token first (with rate_limiter.acquired(url)), so waiting for a token is
+not measured as site latency.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+import logging
+
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKOFF = 5.0  # Pause after a 429 without Retry-After
+MAX_BACKOFF = 300.0
+
+
+def site_key(website_url: str) -> str:
+    """www. and bare domain share a profile"""
+    host = urlparse(website_url if "://" in website_url else f"https://{website_url}").netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class TokenBucket:
+    """
+    rate tokens per second, at most burst at once (rate 0: unlimited)
+    Kept as the theoretical arrival time of the next token (GCRA), so a reservation is O(1)
+    and callers sleep outside any lock.
+    """
+
+    __slots__ = ("rate", "burst", "_tat")
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tat = 0.0
+
+    def earliest(self, now: float, not_before: float = 0.0) -> float:
+        """Monotonic time at which the next token is available (without taking it)"""
+        if self.rate <= 0:
+            return max(now, not_before, self._tat)
+        return max(now, not_before, self._tat - (self.burst - 1) / self.rate)
+
+    def reserve(self, now: float, not_before: float = 0.0) -> float:
+        """Take a token; returns the monotonic time at which it may be used"""
+        at = self.earliest(now, not_before)
+        if self.rate > 0:
+            self._tat = max(self._tat, at) + 1 / self.rate
+        return at
+
+    def pause_until(self, until: float):
+        """No token before until"""
+        self._tat = max(self._tat, until + ((self.burst - 1) / self.rate if self.rate > 0 else 0))
+
+
+def parse_site_limits(text: Optional[str]) -> Dict[str, Tuple[float, Optional[float]]]:
+    """'strict.nl=0.5:1, other.nl=5' -> {site: (rps, burst or None)}"""
+    limits: Dict[str, Tuple[float, Optional[float]]] = {}
+    for item in (text or "").split(","):
+        if not item.strip():
+            continue
+        site, sep, value = item.partition("=")
+        rps, _, burst = value.partition(":")
+        try:
+            if not sep or not site.strip():
+                raise ValueError
+            limits[site_key(site.strip())] = (float(rps), float(burst) if burst.strip() else None)
+        except ValueError:
+            raise ValueError(f"Invalid site rate limit '{item.strip()}' (expected site=rps[:burst])")
+    return limits
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After header (seconds or HTTP date) in seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Global and per-site token buckets
+
+    global_rps/global_burst cap all traffic of the process, site_rps/site_burst every site;
+    site_limits overrides the site settings for hosts with stricter (or looser) WAF rules.
+    A rate of 0 disables that limit, so a default RateLimiter never waits.
+    """
+
+    def __init__(self, global_rps: float = 0, global_burst: Optional[float] = None, site_rps: float = 0,
+                 site_burst: float = 1, site_limits: Optional[Dict[str, Tuple[float, Optional[float]]]] = None):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.configure(global_rps, global_burst, site_rps, site_burst, site_limits)
+
+    def configure(self, global_rps: float = 0, global_burst: Optional[float] = None, site_rps: float = 0,
+                  site_burst: float = 1, site_limits: Optional[Dict[str, Tuple[float, Optional[float]]]] = None):
+        """Replace the settings (and drop all buckets)"""
+        with self._lock:
+            self.global_rps = global_rps
+            self.global_burst = global_burst
+            self.site_rps = site_rps
+            self.site_burst = site_burst
+            self.site_limits = dict(site_limits or {})
+            # Default global burst: one second of traffic
+            self._global = TokenBucket(global_rps, global_burst or max(1.0, global_rps))
+            self._sites: Dict[str, TokenBucket] = {}
+            self._waited = 0.0
+            self._throttled = 0
+            self._paused = 0
+        if self.enabled:
+            logger.info(f"🚦 Rate limit: {global_rps or 'unlimited'} req/s in total, "
+                        f"{site_rps or 'unlimited'} req/s per site (burst {site_burst}), "
+                        f"{len(self.site_limits)} site overrides")
+
+    @property
+    def enabled(self) -> bool:
+        return self.global_rps > 0 or self.site_rps > 0 or bool(self.site_limits)
+
+    def _site_bucket(self, site: str) -> TokenBucket:
+        bucket = self._sites.get(site)
+        if bucket is None:
+            rps, burst = self.site_limits.get(site, (self.site_rps, None))
+            bucket = self._sites[site] = TokenBucket(rps, burst or self.site_burst)
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        """Take a token for url from its site and the global bucket; returns the seconds to wait"""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            site = self._site_bucket(site_key(url))
+            # Both tokens are taken for the same moment: when the site and the global bucket allow it
+            at = site.reserve(now, self._global.reserve(now, site.earliest(now)))
+            delay = at - now
+            if delay > 0:
+                self._waited += delay
+                self._throttled += 1
+        return delay
+
+    def wait(self, url: str) -> float:
+        """Wait for url's token; returns the seconds slept"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return max(0.0, delay)
+
+    def _prepaid(self) -> Counter:
+        if not hasattr(self._local, "prepaid"):
+            self._local.prepaid = Counter()
+        return self._local.prepaid
+
+    @contextmanager
+    def acquired(self, url: str) -> Iterator[float]:
+        """
+        Wait for url's token before the block (yields the seconds slept); the first request
+        this thread sends to url's site inside the block uses that token instead of waiting
+        """
+        waited = self.wait(url)
+        site = site_key(url)
+        prepaid = self._prepaid()
+        prepaid[site] += 1
+        try:
+            yield waited
+        finally:
+            if prepaid[site] > 0:
+                prepaid[site] -= 1
+
+    def take_prepaid(self, url: str) -> bool:
+        """Use a token acquired earlier by this thread for url's site, if there is one"""
+        prepaid = self._prepaid()
+        site = site_key(url)
+        if prepaid[site] > 0:
+            prepaid[site] -= 1
+            return True
+        return False
+
+    async def wait_async(self, url: str) -> float:
+        """Wait for url's token without blocking the event loop; returns the seconds slept"""
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return max(0.0, delay)
+
+    def observe(self, url: str, status_code: int, retry_after: Optional[str] = None):
+        """Pause the site when it answered 429 (or 503 with Retry-After)"""
+        if not self.enabled:
+            return
+        seconds = retry_after_seconds(retry_after)
+        if status_code != 429 and not (status_code == 503 and seconds is not None):
+            return
+        seconds = min(MAX_BACKOFF, DEFAULT_BACKOFF if seconds is None else seconds)
+        site = site_key(url)
+        with self._lock:
+            self._site_bucket(site).pause_until(time.monotonic() + seconds)
+            self._paused += 1
+        logger.warning(f"🚦 {site} answered {status_code}, pausing it for {seconds:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "global_rps": self.global_rps,
+                "global_burst": self._global.burst,
+                "site_rps": self.site_rps,
+                "site_burst": self.site_burst,
+                "site_limits": {site: {"rps": rps, "burst": burst} for site, (rps, burst) in self.site_limits.items()},
+                "throttled_requests": self._throttled,
+                "waited_seconds": round(self._waited, 1),
+                "site_pauses": self._paused,
+            }
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that waits for the rate limiter before every request (unless its token was acquired)"""
+
+    def __init__(self, limiter: RateLimiter, *args, **kwargs):
+        self.limiter = limiter
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        if not self.limiter.take_prepaid(request.url):
+            self.limiter.wait(request.url)
+        response = super().send(request, *args, **kwargs)
+        self.limiter.observe(request.url, response.status_code, response.headers.get("Retry-After"))
+        return response
+
+
+rate_limiter = RateLimiter(
+    global_rps=float(os.environ.get("WP_RATE_LIMIT_RPS", 0)),
+    global_burst=float(os.environ.get("WP_RATE_LIMIT_BURST", 0)) or None,
+    site_rps=float(os.environ.get("WP_RATE_LIMIT_SITE_RPS", 0)),
+    site_burst=float(os.environ.get("WP_RATE_LIMIT_SITE_BURST", 1)),
+    site_limits=parse_site_limits(os.environ.get("WP_RATE_LIMIT_SITES"))
+)
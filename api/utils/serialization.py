@@ -0,0 +1,33 @@
+"""
+Fast JSON responses for large list endpoints
+Content is serialized once with orjson (when installed) instead of being
+re-validated against the response_model and encoded with the stdlib encoder
+"""
+
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency, fall back to the stdlib encoder
+    orjson = None
+
+# Responses smaller than this are not worth compressing
+GZIP_MINIMUM_SIZE = 1000
+GZIP_COMPRESS_LEVEL = 5
+
+
+def dumps_json(content: Any) -> bytes:
+    """Serialize plain dicts/lists to compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for already-serializable content; return it directly to skip response_model validation"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
@@ -0,0 +1,112 @@
+"""
+Website config shared between worker processes on one host
+The full config is kept as one JSON document in a single-row SQLite table (WAL mode) with a
+version stamp; workers compare the stamp on each request and reload only when it moved
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS website_config (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    loaded_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    seed TEXT NOT NULL,
+    data TEXT NOT NULL
+)
+"""
+
+# version, loaded_at, source, configs
+SharedState = Tuple[int, str, str, List[Dict[str, Any]]]
+
+
+def config_to_dict(config: Any) -> Dict[str, Any]:
+    """Plain dict of a config object (pydantic model or class with to_dict)"""
+    return config.model_dump() if hasattr(config, "model_dump") else config.to_dict()
+
+
+def seed_fingerprint(configs: List[Any]) -> str:
+    """Identifies the configuration a deployment starts from"""
+    payload = json.dumps([config_to_dict(config) for config in configs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class SharedConfig:
+    """
+    SQLite-backed config document
+
+    One connection per process (opened lazily, so it is never inherited across fork),
+    serialized with a lock. Writes run in BEGIN IMMEDIATE transactions, which also
+    serializes writers across processes.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def version(self) -> int:
+        """Current version stamp (0 while empty); a primary-key read, cheap enough for every request"""
+        with self._lock:
+            row = self._connect().execute("SELECT version FROM website_config WHERE id = 1").fetchone()
+        return row[0] if row else 0
+
+    def read(self) -> Optional[SharedState]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT version, loaded_at, source, data FROM website_config WHERE id = 1"
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], row[2], json.loads(row[3])
+
+    def transaction(self, apply: Callable[[Optional[SharedState], Optional[str]], Optional[Tuple[str, str, str, List[Any]]]]
+                    ) -> Optional[SharedState]:
+        """
+        Read-modify-write under the database write lock
+        apply(current, seed) returns (loaded_at, source, seed, configs) to store as the next
+        version, or None to keep the current one. Returns the state after the transaction.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT version, loaded_at, source, data, seed FROM website_config WHERE id = 1"
+                ).fetchone()
+                current = (row[0], row[1], row[2], json.loads(row[3])) if row else None
+                change = apply(current, row[4] if row else None)
+                if change is None:
+                    connection.execute("COMMIT")
+                    return current
+                loaded_at, source, seed, configs = change
+                version = (row[0] if row else 0) + 1
+                data = [config_to_dict(config) for config in configs]
+                connection.execute(
+                    "INSERT OR REPLACE INTO website_config (id, version, loaded_at, source, seed, data) "
+                    "VALUES (1, ?, ?, ?, ?, ?)",
+                    (version, loaded_at, source, seed, json.dumps(data, ensure_ascii=False))
+                )
+                connection.execute("COMMIT")
+                return version, loaded_at, source, data
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
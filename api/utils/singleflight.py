@@ -0,0 +1,48 @@
+"""
+Single-flight deduplication
+Concurrent calls with the same key share one in-flight execution and its result
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Thread-safe single-flight group
+
+    Only calls that overlap in time are merged; nothing is cached once the
+    leader finishes. forget(key) detaches the current in-flight call so later
+    callers start a fresh one (used after a write to the same resource).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once for all concurrent callers of key; returns (result, shared)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+        return future.result(), False
+
+    def forget(self, key: Hashable):
+        with self._lock:
+            self._calls.pop(key, None)
@@ -0,0 +1,213 @@
+"""
+Bulk import of sites from the WordPress_websites_API-overzicht.csv export
+Rows are parsed as they are read and verified concurrently against the site's
+REST API; the caller writes the valid ones to the config in one go
+"""
+
+import csv
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List
+from urllib.parse import urlparse
+import logging
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+from .http_client import http_session
+from .website_index import root_domain
+
+logger = logging.getLogger(__name__)
+
+# Column names in the overview export; E-mail and wp-admin are not needed
+COLUMNS = {
+    "website url": "website_url",
+    "pagina id": "page_id",
+    "gebruikersnaam": "username",
+    "application password": "app_password",
+    "label": "site_name",
+}
+
+# Row outcomes; only VALID rows end up in the config
+VALID = "valid"
+INVALID_ROW = "invalid_row"
+DUPLICATE = "duplicate"
+EXISTS = "exists"
+MISSING_PAGE_ID = "missing_page_id"
+INVALID_CREDENTIALS = "invalid_credentials"
+NO_EDIT_PERMISSION = "no_edit_permission"
+PAGE_NOT_FOUND = "page_not_found"
+UNREACHABLE = "unreachable"
+
+
+# Admin and API paths pasted instead of the site URL; what precedes them is the WordPress root
+_WP_PATH_SUFFIX = re.compile(r"/(wp-admin|wp-json|wp-login\.php)(/.*)?$", re.IGNORECASE)
+
+
+def normalize_site_url(url: str) -> str:
+    """
+    `www.site.nl/`, `https://www.site.nl/wp-admin/` and `HTTPS://WWW.SITE.NL` all become `https://www.site.nl`
+    A path is kept (WordPress in a subdirectory: `Site.nl/Blog/` -> `https://site.nl/Blog`); only the host is lowercased
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = f"https://{url}"
+    parsed = urlparse(url)
+    if not parsed.netloc:
+        return ""
+    userinfo, at, host = parsed.netloc.rpartition("@")
+    path = _WP_PATH_SUFFIX.sub("", parsed.path).rstrip("/")
+    return f"{parsed.scheme.lower()}://{userinfo}{at}{host.lower()}{path}"
+
+
+def site_key(url: str) -> str:
+    """
+    Identity of a site for the import: the normalized URL without scheme and `www.`
+    `https://www.site.nl` and `site.nl/` are one site; `site.nl/blog` (a second install) is another
+    """
+    normalized = normalize_site_url(url)
+    return root_domain(normalized) + urlparse(normalized).path.lower() if normalized else ""
+
+
+def configured_sites(configs: Iterable[Any]) -> Dict[str, Any]:
+    """site_key -> config for the configured sites (the first config when a site is listed twice)"""
+    sites: Dict[str, Any] = {}
+    for config in configs:
+        sites.setdefault(site_key(config.website_url), config)
+    return sites
+
+
+def parse_overview_rows(lines: Iterable[str]):
+    """
+    Yield (line_number, row) for every non-empty data row, reading lines lazily
+    row has website_url (normalized), page_id (int, 0 when empty), username, app_password and site_name
+    A row that cannot be used carries an 'error' key instead
+    """
+    reader = csv.reader(lines, delimiter=";")
+    header = next(reader, None)
+    if header is None:
+        return
+    fields = [COLUMNS.get(name.strip().lower().lstrip("\ufeff")) for name in header]
+    missing = {"website_url", "page_id", "username", "app_password"} - set(fields)
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        raw = {field: value.strip() for field, value in zip(fields, values) if field}
+        website_url = normalize_site_url(raw.get("website_url", ""))
+        row = {
+            "website_url": website_url,
+            "page_id": 0,
+            "username": raw.get("username", ""),
+            "app_password": raw.get("app_password", ""),
+            "site_name": raw.get("site_name") or urlparse(website_url).netloc,
+        }
+        if not website_url:
+            row["error"] = "Missing or invalid website URL"
+        elif not row["username"] or not row["app_password"]:
+            row["error"] = "Missing username or application password"
+        else:
+            try:
+                row["page_id"] = int(raw.get("page_id") or 0)
+            except ValueError:
+                row["error"] = f"Invalid page ID: {raw.get('page_id')}"
+        yield reader.line_num, row
+
+
+def verify_site(row: Dict[str, Any], timeout: float = 15) -> Dict[str, str]:
+    """
+    Check credentials and page with one request: reading a page in edit context needs a
+    valid application password with edit rights, and fails with 404 for a wrong page_id
+    """
+    api_base = f"{row['website_url']}/wp-json/wp/v2"
+    url = f"{api_base}/pages/{row['page_id']}" if row["page_id"] else f"{api_base}/users/me"
+    try:
+        response = http_session.get(
+            url,
+            params={"context": "edit", "_fields": "id"},
+            auth=HTTPBasicAuth(row["username"], row["app_password"]),
+            timeout=timeout
+        )
+    except requests.exceptions.Timeout:
+        return {"status": UNREACHABLE, "message": f"Request timeout after {timeout} seconds"}
+    except requests.exceptions.RequestException as e:
+        return {"status": UNREACHABLE, "message": f"Connection error: {e}"}
+
+    if response.status_code == 401:
+        return {"status": INVALID_CREDENTIALS, "message": "Username or application password rejected"}
+    if response.status_code == 403:
+        return {"status": NO_EDIT_PERMISSION, "message": "User may not edit pages"}
+    if response.status_code == 404 and row["page_id"]:
+        return {"status": PAGE_NOT_FOUND, "message": f"Page {row['page_id']} not found"}
+    if response.status_code != 200:
+        return {"status": UNREACHABLE, "message": f"HTTP {response.status_code}"}
+    if not row["page_id"]:
+        return {"status": MISSING_PAGE_ID, "message": "Credentials valid, but no page ID given"}
+    return {"status": VALID, "message": "Credentials and page verified"}
+
+
+def import_overview(
+    lines: Iterable[str],
+    is_configured: Callable[[str], bool] = lambda url: False,
+    update_existing: bool = False,
+    max_workers: int = 8,
+    timeout: float = 15
+) -> Dict[str, Any]:
+    """
+    Parse and verify an overview export
+
+    Verification runs on at most max_workers rows at a time while the rest is still
+    being read. Returns {"valid": [config dicts], "report": [one entry per row, in file order],
+    "counts": {status: n}}; nothing is written here.
+    """
+    report: List[Dict[str, Any]] = []
+    valid_rows: Dict[int, Dict[str, Any]] = {}
+    seen_sites = set()
+    lock = threading.Lock()
+
+    def finish(entry: Dict[str, Any], row: Dict[str, Any], outcome: Dict[str, str]):
+        with lock:
+            entry.update(outcome)
+            if outcome["status"] == VALID:
+                valid_rows[entry["line"]] = {key: value for key, value in row.items() if key != "error"}
+
+    def verify(entry, row):
+        try:
+            outcome = verify_site(row, timeout)
+        except Exception as e:
+            outcome = {"status": UNREACHABLE, "message": f"Error: {e}"}
+        finish(entry, row, outcome)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        for line, row in parse_overview_rows(lines):
+            entry = {"line": line, "website_url": row["website_url"], "site_name": row["site_name"],
+                     "page_id": row["page_id"], "status": None, "message": None}
+            report.append(entry)
+            site = site_key(row["website_url"]) if row["website_url"] else None
+
+            if "error" in row:
+                finish(entry, row, {"status": INVALID_ROW, "message": row["error"]})
+            elif site in seen_sites:
+                finish(entry, row, {"status": DUPLICATE, "message": "Site appears earlier in this file"})
+            elif not update_existing and is_configured(row["website_url"]):
+                finish(entry, row, {"status": EXISTS, "message": "Site is already configured"})
+            else:
+                # Bound the number of rows held in memory waiting for verification
+                if len(in_flight) >= max_workers * 2:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(executor.submit(verify, entry, row))
+            if site:
+                seen_sites.add(site)
+        wait(in_flight)
+
+    counts: Dict[str, int] = {}
+    for entry in report:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    logger.info(f"📥 Import checked {len(report)} rows: {counts}")
+    return {"valid": [valid_rows[line] for line in sorted(valid_rows)], "report": report, "counts": counts}
@@ -0,0 +1,69 @@
+"""
+Batch add/update/delete of website configurations
+The whole batch is validated against a domain index of the config as it would be after
+each step; the caller swaps in the resulting list and saves once
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .website_index import root_domain
+
+
+def plan_website_batch(
+    configs: Sequence[Any],
+    add: Sequence[Dict[str, Any]] = (),
+    update: Sequence[Dict[str, Any]] = (),
+    delete: Sequence[str] = (),
+    build: Callable[[Dict[str, Any], Optional[Any]], Any] = None
+) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    Validate and apply a batch to a copy of configs
+
+    Deletes run first, then updates (matched on original_url), then adds, so a batch can
+    free a domain and reuse it. build(data, previous) creates the new config object
+    (previous is the config being updated, or None). Returns (new configs, one result per
+    item in delete/update/add order); the batch is valid when every result succeeded.
+    """
+    working: List[Optional[Any]] = list(configs)
+    by_domain: Dict[str, int] = {}
+    for i, config in enumerate(working):
+        # First config per domain, the one WebsiteIndex.lookup resolves to
+        by_domain.setdefault(root_domain(config.website_url), i)
+    results: List[Dict[str, Any]] = []
+
+    def result(action: str, website_url: str, success: bool, message: str):
+        results.append({"action": action, "website_url": website_url, "success": success, "message": message})
+
+    for website_url in delete:
+        position = by_domain.pop(root_domain(website_url), None)
+        if position is None:
+            result("delete", website_url, False, "Website not found")
+            continue
+        working[position] = None
+        result("delete", website_url, True, "Website deleted")
+
+    for data in update:
+        position = by_domain.get(root_domain(data["original_url"]))
+        if position is None:
+            result("update", data["original_url"], False, "Website not found")
+            continue
+        taken = by_domain.get(root_domain(data["website_url"]))
+        if taken is not None and taken != position:
+            result("update", data["original_url"], False, f"Website {data['website_url']} already exists")
+            continue
+        previous = working[position]
+        del by_domain[root_domain(previous.website_url)]
+        working[position] = build({key: value for key, value in data.items() if key != "original_url"}, previous)
+        by_domain[root_domain(data["website_url"])] = position
+        result("update", data["original_url"], True, "Website updated")
+
+    for data in add:
+        domain = root_domain(data["website_url"])
+        if domain in by_domain:
+            result("add", data["website_url"], False, "Website already exists")
+            continue
+        working.append(build(data, None))
+        by_domain[domain] = len(working) - 1
+        result("add", data["website_url"], True, "Website added")
+
+    return [config for config in working if config is not None], results
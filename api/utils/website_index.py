@@ -0,0 +1,142 @@
+"""
+In-memory index over website configurations
+Backs cursor pagination, prefix/substring search and URL lookups for /websites
+without scanning the whole config list on every request
+"""
+
+import base64
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlparse
+
+MIN_NGRAM_QUERY = 3
+
+
+def root_domain(website_url: str) -> str:
+    """Domain used for matching, e.g. https://www.example.nl/page -> example.nl"""
+    return urlparse(website_url.lower()).netloc.replace('www.', '')
+
+
+def _normalize_query(query: str) -> str:
+    query = query.strip().lower()
+    for prefix in ('https://', 'http://', 'www.'):
+        if query.startswith(prefix):
+            query = query[len(prefix):]
+    return query.rstrip('/')
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + MIN_NGRAM_QUERY] for i in range(len(text) - MIN_NGRAM_QUERY + 1)}
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        domain, url = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(domain), str(url)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from the config version and the request parameters"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+class WebsiteIndex:
+    """
+    Immutable index built from one version of the config
+
+    - entries are sorted by (root domain, website_url); cursors are the last key of a page
+    - queries shorter than 3 characters use a prefix index on domain and site_name
+    - longer queries use a trigram index, verified with a substring check
+    """
+
+    def __init__(self, configs: Sequence[Any], version: int = 0):
+        self.version = version
+        self.entries: List[Any] = sorted(configs, key=lambda c: (root_domain(c.website_url), c.website_url))
+        self.keys: List[Tuple[str, str]] = [(root_domain(c.website_url), c.website_url) for c in self.entries]
+
+        self.by_url: Dict[str, Any] = {}
+        self.by_domain: Dict[str, Any] = {}
+        for config in configs:  # original order decides which config wins a domain match
+            self.by_url.setdefault(config.website_url, config)
+            self.by_domain.setdefault(root_domain(config.website_url), config)
+
+        self._texts: List[Tuple[str, str]] = []
+        prefix_terms = []
+        self._ngrams: Dict[str, Set[int]] = {}
+        for pos, config in enumerate(self.entries):
+            domain = self.keys[pos][0]
+            name = (config.site_name or '').lower()
+            self._texts.append((domain, name))
+            prefix_terms.append((domain, pos))
+            prefix_terms.append((_normalize_query(name), pos))
+            for gram in _trigrams(domain) | _trigrams(name):
+                self._ngrams.setdefault(gram, set()).add(pos)
+        prefix_terms.sort()
+        self._prefix_terms = [term for term, _ in prefix_terms]
+        self._prefix_positions = [pos for _, pos in prefix_terms]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, website_url: str) -> Optional[Any]:
+        """Exact URL match first, then root domain match"""
+        if not website_url:
+            return None
+        config = self.by_url.get(website_url)
+        if config is None:
+            config = self.by_domain.get(root_domain(website_url))
+        return config
+
+    def search(self, query: str) -> List[int]:
+        """Sorted positions of entries whose domain or site_name matches the query"""
+        query = _normalize_query(query)
+        if not query:
+            return list(range(len(self.entries)))
+
+        if len(query) < MIN_NGRAM_QUERY:
+            start = bisect_left(self._prefix_terms, query)
+            end = bisect_right(self._prefix_terms, query + '\uffff')
+            return sorted(set(self._prefix_positions[start:end]))
+
+        posting_lists = []
+        for gram in _trigrams(query):
+            postings = self._ngrams.get(gram)
+            if not postings:
+                return []
+            posting_lists.append(postings)
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0]).intersection(*posting_lists[1:])
+        return sorted(pos for pos in candidates
+                      if query in self._texts[pos][0] or query in self._texts[pos][1])
+
+    def page(self, query: Optional[str] = None, cursor: Optional[str] = None,
+             limit: Optional[int] = None) -> Tuple[List[Any], Optional[str], int]:
+        """Return (entries, next_cursor, total matches) for one page"""
+        positions = self.search(query) if query else range(len(self.entries))
+        total = len(positions)
+
+        start = 0
+        if cursor:
+            after = bisect_right(self.keys, decode_cursor(cursor))
+            start = bisect_left(positions, after)
+
+        end = total if limit is None else min(total, start + limit)
+        page_positions = positions[start:end]
+        next_cursor = encode_cursor(self.keys[page_positions[-1]]) if end < total and page_positions else None
+        return [self.entries[pos] for pos in page_positions], next_cursor, total
@@ -3,21 +3,46 @@ WordPress API utility functions
 Handles communication with WordPress REST API
 """
 
+import os
+import html
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from requests.auth import HTTPBasicAuth
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import logging
 
+from .coalescing import PageWriteCoalescer
+from .singleflight import SingleFlight
+from .http_client import http_session
+from .liveness import extract_links
+from .latency import Timer
+from .rate_limit import rate_limiter
+
 logger = logging.getLogger(__name__)
 
+# LinkResponse.error values: why an operation failed, without parsing the message
+ERROR_TIMEOUT = "timeout"
+ERROR_CONNECTION = "connection"
+ERROR_HTTP = "http"
+ERROR_NOT_FOUND = "not_found"  # No configuration for the site
+ERROR_OTHER = "error"
+
 class LinkResponse:
-    """Response model for link operations"""
-    def __init__(self, success: bool, message: str, website_url: str, page_id: int, link_added: bool = False):
+    """
+    Response model for link operations
+    fetch_ms/update_ms: duration of the page GET and update (None when not done), without rate-limit waits
+    """
+    def __init__(self, success: bool, message: str, website_url: str, page_id: int, link_added: bool = False,
+                 error: Optional[str] = None, fetch_ms: Optional[float] = None, update_ms: Optional[float] = None):
         self.success = success
         self.message = message
         self.website_url = website_url
         self.page_id = page_id
         self.link_added = link_added
+        self.error = error
+        self.fetch_ms = fetch_ms
+        self.update_ms = update_ms
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -25,114 +50,363 @@ class LinkResponse:
             'message': self.message,
             'website_url': self.website_url,
             'page_id': self.page_id,
-            'link_added': self.link_added
+            'link_added': self.link_added,
+            'error': self.error,
+            'fetch_ms': self.fetch_ms,
+            'update_ms': self.update_ms
         }
 
-def add_link_to_wordpress(config, anchor_text: str, link_url: str, page_id: int = None, timeout: int = 60) -> LinkResponse:
+def _elapsed_ms(response: requests.Response) -> float:
+    # Time until the response headers arrived; a token taken with rate_limiter.acquired is not in it
+    return round(response.elapsed.total_seconds() * 1000, 1)
+
+# Concurrent GETs of the same page (e.g. /test-wordpress and /add-link, or www. and bare-domain
+# entries in one bulk request) share one request
+page_fetches = SingleFlight()
+
+def _page_key(config, page_id: int) -> Tuple[str, int, str]:
+    return (config.website_url.rstrip('/').lower(), page_id, config.username)
+
+def fetch_page(config, page_id: int, timeout: int = 60) -> requests.Response:
+    """GET /wp-json/wp/v2/pages/{page_id}, shared with identical fetches already in flight"""
+    api_base = f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
+    
+    def get() -> requests.Response:
+        # The token is taken before the timer starts: waiting for it is not site latency
+        with rate_limiter.acquired(config.website_url), Timer(config.website_url, "get") as timing:
+            response = http_session.get(
+                f"{api_base}/pages/{page_id}",
+                auth=HTTPBasicAuth(config.username, config.app_password),
+                timeout=timeout
+            )
+            timing.ok = response.status_code == 200
+        return response
+    
+    response, shared = page_fetches.do(_page_key(config, page_id), get)
+    if shared:
+        logger.debug("🤝 Shared in-flight fetch of %s page %s", config.website_url, page_id)
+    return response
+
+# Link pages are split over continuation pages once they grow past this size (per site: config.max_page_bytes)
+PAGE_SHARD_MAX_BYTES = int(os.environ.get("PAGE_SHARD_MAX_BYTES", 100_000))
+# Status of new continuation pages; empty: the status of the page the chain continues from
+PAGE_SHARD_STATUS = os.environ.get("PAGE_SHARD_STATUS", "")
+
+# Links on full continuation chain pages; those pages are no longer written, so they are read once per process
+_sealed_links: Dict[Tuple[str, int, str], frozenset] = {}
+# Continuation pages this process found or created, per site link page. Config objects are never
+# edited here (they belong to published snapshots), so a config from an older snapshot still
+# continues on the right page
+_tracked_shards: Dict[Tuple[str, int, str], Tuple[int, ...]] = {}
+_shard_lock = threading.Lock()
+_shard_listeners: List[Callable[[Any, List[int]], None]] = []
+
+def add_shard_listener(listener: Callable[[Any, List[int]], None]):
     """
-    Add a link to a WordPress page via REST API
+    Call listener(config, continuation_page_ids) whenever a continuation page is added to a site;
+    the listener publishes the new list (config itself is left as it is)
     """
+    _shard_listeners.append(listener)
+
+def shard_page_ids(config) -> List[int]:
+    """The site's link page followed by its continuation pages, oldest first; links are added to the last one"""
+    chain = [config.page_id] + list(config.continuation_page_ids or [])
+    with _shard_lock:
+        tracked = _tracked_shards.get(_page_key(config, config.page_id), ())
+    return chain + [page_id for page_id in tracked if page_id not in chain]
+
+def _page_content(page_data: Dict[str, Any]) -> str:
+    # Prefer raw over rendered content
+    content = page_data.get("content", {})
+    return content.get("raw") or content.get("rendered", "")
+
+def _seal_shard(config, page_id: int, content: str):
+    with _shard_lock:
+        _sealed_links[_page_key(config, page_id)] = frozenset(extract_links(content))
+
+def _sealed_shard_links(config, chain: List[int], timeout: int) -> frozenset:
+    """All links on the site's full shards (every page of chain but the last)"""
+    sealed = chain[:-1]
+    missing = [page_id for page_id in sealed if _page_key(config, page_id) not in _sealed_links]
+    
+    def read(page_id: int):
+        response = fetch_page(config, page_id, timeout)
+        response.raise_for_status()
+        _seal_shard(config, page_id, _page_content(response.json()))
+    
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+            list(executor.map(read, missing))
+    return frozenset().union(*(_sealed_links[_page_key(config, page_id)] for page_id in sealed))
+
+def _track_shard(config, chain: List[int], page_id: int):
+    """Append page_id to chain (the caller's list from shard_page_ids) and publish it through the listeners"""
+    if page_id in chain:
+        return
+    chain.append(page_id)
+    key = _page_key(config, config.page_id)
+    with _shard_lock:
+        tracked = _tracked_shards.get(key, ())
+        _tracked_shards[key] = tracked + tuple(item for item in chain[1:] if item not in tracked)
+    logger.info("📑 %s continues its links on page %s", config.site_name, page_id)
+    for listener in _shard_listeners:
+        try:
+            listener(config, list(chain[1:]))
+        except Exception as e:
+            logger.error("❌ Could not record continuation page %s for %s: %s", page_id, config.site_name, e)
+
+def _next_shard_names(page_data: Dict[str, Any], position: int) -> Tuple[str, str]:
+    """Slug and title of the chain page after `position` (0 = the site's own link page): `<slug>-2`, `<title> (2)`, ..."""
+    slug = page_data.get("slug", "")
+    title = html.unescape(page_data.get("title", {}).get("rendered", ""))
+    if position:
+        slug = slug[:-len(f"-{position + 1}")] if slug.endswith(f"-{position + 1}") else slug
+        title = title[:-len(f" ({position + 1})")] if title.endswith(f" ({position + 1})") else title
+    return f"{slug}-{position + 2}", f"{title} ({position + 2})"
+
+def _find_shard_page(config, api_base: str, slug: str, timeout: int) -> Optional[Dict[str, Any]]:
+    """A continuation page created earlier but missing from the config (e.g. config was not persisted)"""
+    response = http_session.get(
+        f"{api_base}/pages",
+        params={"slug": slug, "parent": config.page_id, "context": "edit", "_fields": "id,slug,title,content,status",
+                "status": "publish,future,draft,pending,private"},
+        auth=HTTPBasicAuth(config.username, config.app_password),
+        timeout=timeout
+    )
+    if response.status_code != 200:
+        return None
+    pages = response.json()
+    return pages[0] if pages else None
+
+def _create_shard_page(config, api_base: str, slug: str, title: str, content: str, status: str,
+                       timeout: int) -> requests.Response:
+    return http_session.post(
+        f"{api_base}/pages",
+        auth=HTTPBasicAuth(config.username, config.app_password),
+        headers={"Content-Type": "application/json"},
+        json={"slug": slug, "title": title, "content": content, "status": status, "parent": config.page_id},
+        timeout=timeout
+    )
+
+def _delete_shard_page(config, api_base: str, page_id: int, timeout: int):
+    """Remove a duplicate continuation page (best effort: a leftover duplicate only holds links that also exist elsewhere)"""
+    try:
+        response = http_session.delete(
+            f"{api_base}/pages/{page_id}",
+            params={"force": "true"},
+            auth=HTTPBasicAuth(config.username, config.app_password),
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            logger.warning("⚠️ Could not remove duplicate continuation page %s on %s: HTTP %s",
+                           page_id, config.website_url, response.status_code)
+    except requests.exceptions.RequestException as e:
+        logger.warning("⚠️ Could not remove duplicate continuation page %s on %s: %s", page_id, config.website_url, e)
+
+# Additions to the same (site, page) within this window share one GET+POST
+link_coalescer = PageWriteCoalescer(window_seconds=float(os.environ.get("LINK_COALESCE_WINDOW_MS", 20)) / 1000)
+
+def add_links_to_wordpress(config, links: List[Tuple[str, str]], page_id: int = None, timeout: int = 60) -> List[LinkResponse]:
+    """
+    Add several links to one WordPress page with a single read-modify-write
+    Returns one LinkResponse per (anchor_text, link_url), in order
+    
+    Links for the site's own link page go to the last page of its chain; when that page
+    would grow past the size limit a continuation page is used (found by slug or created).
+    Within a process the coalescer serializes this per page; when another process creates the
+    same continuation page at the same time, WordPress gives the later one a suffixed slug,
+    and that copy is removed again in favour of the first.
+    """
+    # Use provided page_id or default from config
+    target_page_id = page_id or config.page_id
+    sharded = target_page_id == config.page_id
+    chain = shard_page_ids(config)
+    if sharded:
+        target_page_id = chain[-1]
+    max_bytes = config.max_page_bytes or PAGE_SHARD_MAX_BYTES
+    
+    timings: Dict[str, Optional[float]] = {"fetch_ms": None, "update_ms": None}
+    
+    def failed(message: str, error: str = ERROR_HTTP) -> List[LinkResponse]:
+        return [LinkResponse(success=False, message=message, website_url=config.website_url, page_id=target_page_id,
+                             error=error, **timings)
+                for _ in links]
+    
+    def pending(existing_content: str, known: frozenset) -> Tuple[List[Optional[str]], List[str]]:
+        # Which links already exist (on the chain or earlier in this batch)
+        added, new_links = [], []
+        for anchor_text, link_url in links:
+            if str(link_url) in existing_content or str(link_url) in known or str(link_url) in added:
+                added.append(None)
+                continue
+            new_links.append(f'<a href="{link_url}">{anchor_text}</a><br>')
+            added.append(str(link_url))
+        return added, new_links
+    
+    def succeeded(added: List[Optional[str]]) -> List[LinkResponse]:
+        return [
+            LinkResponse(
+                success=True,
+                message="Link successfully added" if link_added else "Link already exists",
+                website_url=config.website_url,
+                page_id=target_page_id,
+                link_added=bool(link_added),
+                **timings
+            )
+            for link_added in added
+        ]
+    
     try:
-        # Use provided page_id or default from config
-        target_page_id = page_id or config.page_id
-        
         # Build API URL
         api_base = f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
         
-        logger.info(f"🔄 Adding link to {config.site_name} (Page ID: {target_page_id})")
+        logger.debug("🔄 Adding %d link(s) to %s (Page ID: %s)", len(links), config.site_name, target_page_id)
         
         # Step 1: Get existing page content
-        response = requests.get(
-            f"{api_base}/pages/{target_page_id}",
-            auth=HTTPBasicAuth(config.username, config.app_password),
-            timeout=timeout
-        )
+        response = fetch_page(config, target_page_id, timeout)
+        timings["fetch_ms"] = _elapsed_ms(response)
         
         if response.status_code != 200:
-            return LinkResponse(
-                success=False,
-                message=f"Failed to fetch page: HTTP {response.status_code}",
-                website_url=config.website_url,
-                page_id=target_page_id
-            )
+            logger.error("❌ Failed to fetch page from %s: HTTP %s", config.website_url, response.status_code)
+            return failed(f"Failed to fetch page: HTTP {response.status_code}")
         
         page_data = response.json()
+        existing_content = _page_content(page_data)
         
-        # Get existing content (prefer raw over rendered)
-        existing_content = page_data.get("content", {}).get("raw")
-        if not existing_content:
-            existing_content = page_data.get("content", {}).get("rendered", "")
+        # Step 2: Check which links already exist
+        known = _sealed_shard_links(config, chain, timeout) if sharded else frozenset()
+        added, new_links = pending(existing_content, known)
         
-        # Step 2: Check if link already exists
-        if str(link_url) in existing_content:
-            return LinkResponse(
-                success=True,
-                message="Link already exists",
-                website_url=config.website_url,
-                page_id=target_page_id,
-                link_added=False
-            )
+        if not new_links:
+            return [LinkResponse(success=True, message="Link already exists", website_url=config.website_url,
+                                 page_id=target_page_id, link_added=False, **timings) for _ in links]
         
-        # Step 3: Add the new link
-        new_link = f'<a href="{link_url}">{anchor_text}</a><br>'
-        new_content = existing_content + "\n" + new_link
+        # Step 3: Add the new links
+        new_content = existing_content + "".join("\n" + new_link for new_link in new_links)
+        
+        # Step 3b: Move on to a continuation page while the current one would grow too large
+        while sharded and existing_content and len(new_content.encode("utf-8")) > max_bytes:
+            position = len(chain) - 1
+            slug, title = _next_shard_names(page_data, position)
+            _seal_shard(config, target_page_id, existing_content)
+            known = known | _sealed_links[_page_key(config, target_page_id)]
+            
+            status = PAGE_SHARD_STATUS or page_data.get("status") or "publish"
+            page_data = _find_shard_page(config, api_base, slug, timeout)
+            if page_data is None:
+                content = "\n".join(new_links)
+                create_response = _create_shard_page(config, api_base, slug, title, content, status, timeout)
+                if create_response.status_code not in (200, 201):
+                    logger.error("❌ Failed to create continuation page on %s: HTTP %s",
+                                 config.website_url, create_response.status_code)
+                    return failed(f"Failed to create continuation page: HTTP {create_response.status_code}")
+                created = create_response.json()
+                # A suffixed slug means another process created this page first: use that one
+                page_data = _find_shard_page(config, api_base, slug, timeout) if created.get("slug", slug) != slug else None
+                if page_data is None or page_data["id"] == created["id"]:
+                    target_page_id = created["id"]
+                    _track_shard(config, chain, target_page_id)
+                    logger.info("✅ %d link(s) successfully added to %s", len(new_links), config.site_name)
+                    return succeeded(added)
+                logger.info("🔀 %s: continuation page %s was created concurrently, using page %s",
+                            config.site_name, slug, page_data["id"])
+                _delete_shard_page(config, api_base, created["id"], timeout)
+            
+            target_page_id = page_data["id"]
+            _track_shard(config, chain, target_page_id)
+            existing_content = _page_content(page_data)
+            added, new_links = pending(existing_content, known)
+            if not new_links:
+                return succeeded(added)
+            new_content = existing_content + "".join("\n" + new_link for new_link in new_links)
         
         # Step 4: Update the page
-        update_response = requests.post(
-            f"{api_base}/pages/{target_page_id}",
-            auth=HTTPBasicAuth(config.username, config.app_password),
-            headers={"Content-Type": "application/json"},
-            json={"content": new_content},
-            timeout=timeout
-        )
+        try:
+            with rate_limiter.acquired(config.website_url), Timer(config.website_url, "update") as timing:
+                update_response = http_session.post(
+                    f"{api_base}/pages/{target_page_id}",
+                    auth=HTTPBasicAuth(config.username, config.app_password),
+                    headers={"Content-Type": "application/json"},
+                    json={"content": new_content},
+                    timeout=timeout
+                )
+                timing.ok = update_response.status_code == 200
+            timings["update_ms"] = _elapsed_ms(update_response)
+        finally:
+            # A fetch that started before this write may return the old content; don't let later reads join it
+            page_fetches.forget(_page_key(config, target_page_id))
         
         if update_response.status_code == 200:
-            logger.info(f"✅ Link successfully added to {config.site_name}")
-            return LinkResponse(
-                success=True,
-                message="Link successfully added",
-                website_url=config.website_url,
-                page_id=target_page_id,
-                link_added=True
-            )
+            logger.info("✅ %d link(s) successfully added to %s", len(new_links), config.site_name)
+            return succeeded(added)
         else:
-            return LinkResponse(
-                success=False,
-                message=f"Failed to update page: HTTP {update_response.status_code}",
-                website_url=config.website_url,
-                page_id=target_page_id
-            )
+            logger.error("❌ Failed to update page on %s: HTTP %s", config.website_url, update_response.status_code)
+            return failed(f"Failed to update page: HTTP {update_response.status_code}")
             
     except requests.exceptions.Timeout:
-        logger.error(f"⏰ Timeout adding link to {config.site_name}")
-        return LinkResponse(
-            success=False,
-            message=f"Request timeout after {timeout} seconds",
-            website_url=config.website_url,
-            page_id=target_page_id
-        )
+        logger.error("⏰ Timeout adding link to %s", config.site_name)
+        return failed(f"Request timeout after {timeout} seconds", ERROR_TIMEOUT)
+    except requests.exceptions.ConnectionError:
+        logger.error("🔌 Connection error adding link to %s", config.site_name)
+        return failed("Connection error", ERROR_CONNECTION)
     except Exception as e:
-        logger.error(f"❌ Error adding link to {config.site_name}: {e}")
-        return LinkResponse(
-            success=False,
-            message=f"Error: {str(e)}",
-            website_url=config.website_url,
-            page_id=target_page_id
-        )
+        logger.error("❌ Error adding link to %s: %s", config.site_name, e)
+        return failed(f"Error: {str(e)}", ERROR_OTHER)
+
+def add_link_to_wordpress(config, anchor_text: str, link_url: str, page_id: int = None, timeout: int = 60) -> LinkResponse:
+    """
+    Add a link to a WordPress page via REST API
+    Concurrent calls for the same page are coalesced into one read-modify-write
+    """
+    return add_links_to_page(config, [(anchor_text, link_url)], page_id, timeout)[0]
+
+def add_links_to_page(config, links: List[Tuple[str, str]], page_id: int = None, timeout: int = 60) -> List[LinkResponse]:
+    """
+    Add several links to one page in a single read-modify-write, coalesced with concurrent
+    additions to that page; one LinkResponse per (anchor_text, link_url)
+    """
+    target_page_id = page_id or config.page_id
+    key = (config.website_url.rstrip('/').lower(), target_page_id)
+    return link_coalescer.submit_many(
+        key,
+        list(links),
+        lambda batch: add_links_to_wordpress(config, batch, target_page_id, timeout)
+    )
+
+def get_page_links(config, page_id: int = None, timeout: int = 60) -> List[str]:
+    """Link targets currently on the site's link page, including its continuation pages"""
+    links = []
+    for chain_page_id in ([page_id] if page_id else shard_page_ids(config)):
+        response = fetch_page(config, chain_page_id, timeout)
+        response.raise_for_status()
+        links.extend(extract_links(_page_content(response.json())))
+    return list(dict.fromkeys(links))
+
+def collect_site_links(configs, max_workers: int = 8, timeout: int = 60) -> Dict[str, List[str]]:
+    """Read the link pages of several sites concurrently; maps each link target to the sites it is on"""
+    def read(config) -> List[str]:
+        try:
+            return get_page_links(config, timeout=timeout)
+        except Exception as e:
+            logger.warning("⚠️ Could not read links from %s: %s", config.website_url, e)
+            return []
+    
+    found_on: Dict[str, List[str]] = {}
+    if not configs:
+        return found_on
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(configs))) as executor:
+        for config, links in zip(configs, executor.map(read, configs)):
+            for url in links:
+                found_on.setdefault(url, []).append(config.website_url)
+    return found_on
 
 def test_wordpress_connection(config, timeout: int = 60) -> Dict[str, Any]:
     """
     Test connection to WordPress site
     """
     try:
-        api_base = f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
-        
         # Try to get site info
-        response = requests.get(
-            f"{api_base}/pages/{config.page_id}",
-            auth=HTTPBasicAuth(config.username, config.app_password),
-            timeout=timeout
-        )
+        response = fetch_page(config, config.page_id, timeout)
         
         if response.status_code == 200:
             page_data = response.json()
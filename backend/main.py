@@ -1,20 +1,48 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, File, Header, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.routing import Match
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, HttpUrl
+from contextlib import ExitStack
 from typing import List, Optional, Dict, Any
 import requests
 from requests.auth import HTTPBasicAuth
 import csv
+import asyncio
+import codecs
 import json
 import logging
 from datetime import datetime
 import os
+import re
 import base64
+import sys
 from pathlib import Path
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Shared utilities live in api/utils so the local backend and the Vercel API use the same code
+sys.path.append(str(Path(__file__).resolve().parent.parent / "api"))
+from utils.idempotency import IdempotencyStore, IdempotencyKeyConflict, request_fingerprint, REPLAYED_HEADER
+from utils.log_pipeline import setup_logging
+from utils.serialization import FastJSONResponse, GZIP_MINIMUM_SIZE, GZIP_COMPRESS_LEVEL
+from utils.website_index import make_etag, etag_matches
+from utils.config_snapshot import ConfigSnapshot, ConfigStore, replace_config, with_continuation_pages
+from utils.shared_config import SharedConfig
+from utils import wordpress
+from utils.liveness import link_checker
+from utils.site_import import import_overview, configured_sites, site_key
+from utils.page_discovery import discover_page_ids, DEFAULT_SLUGS
+from utils.website_batch import plan_website_batch
+from utils.link_matrix import run_link_matrix
+from utils.latency import latency_profile, start_probe
+from utils.rate_limit import rate_limiter
+from utils.profiling import (PROFILING_TOKEN, CPROFILE_THREAD_NOTE, ProfileSession, ProfilerBusy, memory_tracker,
+                             request_profile_mode, token_valid)
+from utils.http_client import PREWARM_CONNECTIONS, prewarm_new_sites
+
+# Setup logging (records are written by a background thread, see utils/log_pipeline.py)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -32,6 +60,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (e.g. /websites, /add-bulk-links) for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+
 # Security
 security = HTTPBearer()
 
@@ -42,6 +73,8 @@ class WebsiteConfig(BaseModel):
     username: str
     app_password: str
     site_name: str
+    continuation_page_ids: List[int] = []  # Pages the link list continues on once page_id is full
+    max_page_bytes: Optional[int] = None  # Defaults to PAGE_SHARD_MAX_BYTES
 
 class LinkRequest(BaseModel):
     anchor_text: str
@@ -54,14 +87,29 @@ class BulkLinkRequest(BaseModel):
     link_url: HttpUrl
     website_urls: List[str]
     page_id: Optional[int] = None
+    check_link: bool = False  # Refuse the whole request if link_url does not resolve
 
-
-
-class BulkLinkRequest(BaseModel):
+class LinkMatrixEntry(BaseModel):
+    website_url: str
     anchor_text: str
     link_url: HttpUrl
-    website_urls: List[str]
+
+class LinkMatrixRequest(BaseModel):
+    entries: List[LinkMatrixEntry]  # (site, anchor, url) triples; one page write per site
     page_id: Optional[int] = None
+    max_workers: int = 8
+
+class PageDiscoveryRequest(BaseModel):
+    website_urls: Optional[List[str]] = None  # Defaults to every site without a page_id
+    slugs: Optional[List[str]] = None  # Link page slugs to look for, most likely first
+    title_pattern: Optional[str] = None  # Case-insensitive regex on page titles
+    apply: bool = False  # Store found page IDs in the config instead of only proposing them
+    refresh: bool = False  # Fetch page listings again instead of using the cache
+
+class LinkCheckRequest(BaseModel):
+    link_urls: List[str] = []
+    website_urls: Optional[List[str]] = None  # Also check the links already on these sites' pages
+    all_websites: bool = False  # Also check the links on every configured site
 
 class LinkResponse(BaseModel):
     success: bool
@@ -69,9 +117,14 @@ class LinkResponse(BaseModel):
     website_url: str
     page_id: int
     link_added: bool = False
+    error: Optional[str] = None  # timeout, connection, http, not_found or error when success is false
+    fetch_ms: Optional[float] = None
+    update_ms: Optional[float] = None
 
 class WebsiteListResponse(BaseModel):
     websites: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
 
 class ConfigInfoResponse(BaseModel):
     config_source: str
@@ -89,6 +142,7 @@ class WebsiteRequest(BaseModel):
     page_id: int
     username: str
     app_password: str
+    max_page_bytes: Optional[int] = None  # Link page size before continuing on a new page
 
 class UpdateWebsiteRequest(BaseModel):
     original_url: str
@@ -97,6 +151,13 @@ class UpdateWebsiteRequest(BaseModel):
     page_id: int
     username: str
     app_password: str
+    max_page_bytes: Optional[int] = None  # Link page size before continuing on a new page
+
+class WebsiteBatchRequest(BaseModel):
+    add: List[WebsiteRequest] = []
+    update: List[UpdateWebsiteRequest] = []
+    delete: List[str] = []  # Website URLs
+    atomic: bool = True  # Apply nothing when any item fails
 
 class WebsiteResponse(BaseModel):
     success: bool
@@ -104,16 +165,69 @@ class WebsiteResponse(BaseModel):
     website_url: str
     site_name: str
 
-# Global variable to store website configs
-websites_config: List[WebsiteConfig] = []
-config_source: str = "unknown"  # Track where config was loaded from
-config_loaded_at: str = ""  # Track when config was loaded
+# Outcomes of /add-link and /add-bulk-links per Idempotency-Key
+idempotency_store = IdempotencyStore(
+    ttl_seconds=float(os.getenv('IDEMPOTENCY_TTL_SECONDS', 24 * 3600)),
+    replay_exceptions=(HTTPException,)
+)
+
+# Website configs, published as immutable snapshots (version + load time are used for ETags).
+# With CONFIG_SHARED_DB set (e.g. uvicorn --workers N), the config lives in that SQLite file
+# and every worker follows its version, so an edit made through one worker is seen by all.
+config_store = ConfigStore(
+    shared=SharedConfig(os.environ['CONFIG_SHARED_DB']) if os.getenv('CONFIG_SHARED_DB') else None,
+    factory=lambda data: WebsiteConfig(**data)
+)
+if PREWARM_CONNECTIONS:
+    # Open DNS + keep-alive connections to the sites of every new snapshot (startup, reloads, edits
+    # and other workers' changes) so the first bulk run after it is not slower
+    config_store.add_listener(prewarm_new_sites)
+
+@app.middleware("http")
+async def follow_shared_config(request: Request, call_next):
+    """Pick up config changes made by other workers (one version read per request)"""
+    if config_store.shared is not None:
+        await run_in_threadpool(config_store.refresh)
+    return await call_next(request)
+
+def route_endpoint(request: Request):
+    """Endpoint function of the route that will handle request (None when no route matches)"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "endpoint", None)
+    return None
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    With X-Profile: sampling|cprofile and a valid X-Profile-Token, run the request under that
+    profiler; the profile file is returned in X-Profile-File (X-Profile-Skipped says why not).
+    cprofile requests to sync endpoints are sampled instead; X-Profile-Mode and X-Profile-Note say so
+    """
+    requested = request.headers.get("x-profile")
+    if not requested or not token_valid(request.headers.get("x-profile-token")):
+        return await call_next(request)
+    mode = request_profile_mode(requested, route_endpoint(request))
+    with ExitStack() as stack:
+        try:
+            session = stack.enter_context(ProfileSession(mode, "request" + request.url.path.replace("/", "-")))
+        except (ProfilerBusy, ValueError) as e:
+            response = await call_next(request)
+            response.headers["X-Profile-Skipped"] = str(e)
+            return response
+        response = await call_next(request)
+    response.headers["X-Profile-File"] = session.path
+    response.headers["X-Profile-Mode"] = mode
+    if mode != requested:
+        response.headers["X-Profile-Note"] = "sync endpoint runs in a worker thread; sampled instead of cprofile"
+    elif mode == "cprofile":
+        response.headers["X-Profile-Note"] = CPROFILE_THREAD_NOTE
+    return response
 
 def load_websites_config():
     """Load website configuration - hardcoded for reliable Vercel deployment"""
-    global websites_config, config_source, config_loaded_at
-    websites_config = []
-    config_loaded_at = datetime.now().isoformat()
+    configs = []
     
     # Detect environment (production if running on Vercel, development otherwise)
     is_production = (
@@ -171,7 +285,7 @@ def load_websites_config():
             missing_page_ids += 1
             logger.warning(f"⚠️ Missing page_id for {website_data['website_url']}")
         
-        websites_config.append(WebsiteConfig(
+        configs.append(WebsiteConfig(
             website_url=website_data['website_url'],
             page_id=website_data['page_id'],
             username=website_data['username'],
@@ -179,38 +293,36 @@ def load_websites_config():
             site_name=website_data['site_name']
         ))
     
-    config_source = f"hardcoded_{environment}"
-    logger.info(f"✅ {len(websites_config)} websites loaded from hardcoded configuration")
+    snapshot = config_store.seed(configs, loaded_at=datetime.now().isoformat(), source=f"hardcoded_{environment}")
+    logger.info(f"✅ {len(snapshot)} websites loaded from hardcoded configuration")
     if missing_page_ids > 0:
         logger.warning(f"⚠️ {missing_page_ids} websites have missing or invalid page_ids")
     return True
 
-def get_website_config(website_url: str) -> Optional[WebsiteConfig]:
-    """Get website configuration by URL with intelligent matching"""
+def record_continuation_page(config: WebsiteConfig, page_ids: List[int]):
+    """Publish (and persist) the continuation pages used once a site's link page was full"""
+    config_store.update(lambda snapshot: with_continuation_pages(snapshot, config, page_ids))
+    save_websites_config()
+
+wordpress.add_shard_listener(record_continuation_page)
+
+def get_website_config(website_url: str, snapshot: Optional[ConfigSnapshot] = None) -> Optional[WebsiteConfig]:
+    """Get website configuration by URL with intelligent matching (in snapshot, default the current one)"""
     if not website_url:
         return None
     
-    # First try exact match
-    for config in websites_config:
-        if config.website_url == website_url:
-            return config
-    
-    # Then try root domain matching
+    # Exact match first, then root domain matching (www. and paths ignored)
     try:
-        from urllib.parse import urlparse
-        input_domain = urlparse(website_url.lower()).netloc.replace('www.', '')
-        
-        for config in websites_config:
-            config_domain = urlparse(config.website_url.lower()).netloc.replace('www.', '')
-            if input_domain == config_domain:
-                logger.info(f"🔗 URL matched via domain: {website_url} -> {config.website_url}")
-                return config
+        config = (snapshot or config_store.current).lookup(website_url)
+        if config is not None:
+            if config.website_url != website_url:
+                logger.debug("🔗 URL matched via domain: %s -> %s", website_url, config.website_url)
+            return config
     except Exception as e:
         logger.warning(f"⚠️ Error in URL matching for {website_url}: {e}")
     
     logger.warning(f"❌ No website configuration found for: {website_url}")
     return None
-    return None
 
 def save_websites_config():
     """Save website configurations to JSON file"""
@@ -224,22 +336,25 @@ def save_websites_config():
         config_dir.mkdir(exist_ok=True)  # Create config directory if it doesn't exist
         json_path = config_dir / f"websites_{environment}.json"
         
-        # Convert websites_config to JSON-serializable format
+        # Convert the current snapshot to JSON-serializable format
+        snapshot = config_store.current
         websites_data = []
-        for config in websites_config:
+        for config in snapshot:
             websites_data.append({
                 'website_url': config.website_url,
                 'page_id': config.page_id,
                 'username': config.username,
                 'app_password': config.app_password,
-                'site_name': config.site_name
+                'site_name': config.site_name,
+                'continuation_page_ids': config.continuation_page_ids,
+                'max_page_bytes': config.max_page_bytes
             })
         
         # Write to JSON file with proper formatting
         with open(json_path, 'w', encoding='utf-8') as jsonfile:
             json.dump(websites_data, jsonfile, indent=2, ensure_ascii=False)
         
-        logger.info(f"✅ Saved {len(websites_config)} website configurations to {json_path}")
+        logger.info(f"✅ Saved {len(snapshot)} website configurations to {json_path}")
         
         # Also save CSV backup for compatibility
         csv_path = Path(__file__).parent.parent / "websites_config.csv"
@@ -248,7 +363,7 @@ def save_websites_config():
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
             
-            for config in websites_config:
+            for config in snapshot:
                 writer.writerow({
                     'website_url': config.website_url,
                     'page_id': config.page_id,
@@ -264,22 +379,23 @@ def save_websites_config():
 
 def add_website_config(request: WebsiteRequest) -> WebsiteConfig:
     """Add a new website configuration"""
-    # Check if website already exists
-    existing = get_website_config(request.website_url)
-    if existing:
-        raise HTTPException(status_code=400, detail=f"Website {request.website_url} already exists")
-    
     # Create new config
     new_config = WebsiteConfig(
         website_url=request.website_url,
         site_name=request.site_name,
         page_id=request.page_id,
         username=request.username,
-        app_password=request.app_password
+        app_password=request.app_password,
+        max_page_bytes=request.max_page_bytes
     )
     
-    # Add to global list
-    websites_config.append(new_config)
+    def add(snapshot: ConfigSnapshot):
+        # Check if website already exists
+        if snapshot.lookup(request.website_url):
+            raise HTTPException(status_code=400, detail=f"Website {request.website_url} already exists")
+        return snapshot.configs + (new_config,)
+    
+    config_store.update(add)
     
     # Save to CSV
     save_websites_config()
@@ -289,53 +405,51 @@ def add_website_config(request: WebsiteRequest) -> WebsiteConfig:
 
 def update_website_config(request: UpdateWebsiteRequest) -> WebsiteConfig:
     """Update an existing website configuration"""
-    # Find existing config
-    config_index = None
-    for i, config in enumerate(websites_config):
-        if config.website_url == request.original_url:
-            config_index = i
-            break
-    
-    if config_index is None:
-        raise HTTPException(status_code=404, detail=f"Website {request.original_url} not found")
-    
-    # Check if new URL conflicts with existing (unless it's the same)
-    if request.website_url != request.original_url:
-        existing = get_website_config(request.website_url)
-        if existing:
-            raise HTTPException(status_code=400, detail=f"Website {request.website_url} already exists")
+    updated = []
     
-    # Update config
-    updated_config = WebsiteConfig(
-        website_url=request.website_url,
-        site_name=request.site_name,
-        page_id=request.page_id,
-        username=request.username,
-        app_password=request.app_password
-    )
+    def update(snapshot: ConfigSnapshot):
+        # Find existing config
+        current = next((config for config in snapshot if config.website_url == request.original_url), None)
+        if current is None:
+            raise HTTPException(status_code=404, detail=f"Website {request.original_url} not found")
+        
+        # Check if new URL conflicts with existing (unless it's the same)
+        if request.website_url != request.original_url:
+            existing = snapshot.lookup(request.website_url)
+            if existing is not None and existing is not current:
+                raise HTTPException(status_code=400, detail=f"Website {request.website_url} already exists")
+        
+        # Update config (continuation pages belong to the old link page, so they are kept only if it stays)
+        updated_config = WebsiteConfig(
+            website_url=request.website_url,
+            site_name=request.site_name,
+            page_id=request.page_id,
+            username=request.username,
+            app_password=request.app_password,
+            continuation_page_ids=current.continuation_page_ids if current.page_id == request.page_id else [],
+            max_page_bytes=request.max_page_bytes
+        )
+        updated.append(updated_config)
+        return tuple(updated_config if config is current else config for config in snapshot)
     
-    websites_config[config_index] = updated_config
+    config_store.update(update)
     
     # Save to CSV
     save_websites_config()
     
     logger.info(f"Updated website configuration: {request.original_url} -> {request.website_url}")
-    return updated_config
+    return updated[0]
 
 def delete_website_config(website_url: str) -> bool:
     """Delete a website configuration"""
-    # Find and remove config
-    config_index = None
-    for i, config in enumerate(websites_config):
-        if config.website_url == website_url:
-            config_index = i
-            break
-    
-    if config_index is None:
-        raise HTTPException(status_code=404, detail=f"Website {website_url} not found")
+    def delete(snapshot: ConfigSnapshot):
+        # Find and remove config
+        remaining = tuple(config for config in snapshot if config.website_url != website_url)
+        if len(remaining) == len(snapshot):
+            raise HTTPException(status_code=404, detail=f"Website {website_url} not found")
+        return remaining
     
-    # Remove from list
-    removed_config = websites_config.pop(config_index)
+    config_store.update(delete)
     
     # Save to CSV
     save_websites_config()
@@ -344,125 +458,22 @@ def delete_website_config(website_url: str) -> bool:
     return True
 
 def add_link_to_wordpress(config: WebsiteConfig, anchor_text: str, link_url: str, page_id: Optional[int] = None) -> LinkResponse:
-    """Add a link to a WordPress page with detailed logging"""
-    try:
-        # Use provided page_id or default from config
-        target_page_id = page_id or config.page_id
-        
-        logger.info(f"🔍 Attempting to add link to {config.website_url} (page {target_page_id})")
-        logger.info(f"🔗 Link: '{anchor_text}' -> {link_url}")
-        
-        # Build API URL
-        api_base = f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
-        
-        # Step 1: Get existing page content
-        logger.info(f"📥 Fetching page content from {api_base}/pages/{target_page_id}")
-        response = requests.get(
-            f"{api_base}/pages/{target_page_id}",
-            auth=HTTPBasicAuth(config.username, config.app_password),
-            timeout=60
-        )
-        
-        if response.status_code != 200:
-            error_msg = f"Failed to fetch page: HTTP {response.status_code}"
-            logger.error(f"❌ {error_msg} from {config.website_url}")
-            return LinkResponse(
-                success=False,
-                message=error_msg,
-                website_url=config.website_url,
-                page_id=target_page_id
-            )
-        
-        page_data = response.json()
-        logger.info(f"✅ Successfully fetched page data from {config.website_url}")
-        
-        # Get existing content (prefer raw over rendered)
-        existing_content = page_data.get("content", {}).get("raw")
-        if not existing_content:
-            existing_content = page_data.get("content", {}).get("rendered", "")
-        
-        # Step 2: Check if link already exists
-        if str(link_url) in existing_content:
-            logger.info(f"🔄 Link already exists on {config.website_url}")
-            return LinkResponse(
-                success=True,
-                message="Link already exists",
-                website_url=config.website_url,
-                page_id=target_page_id,
-                link_added=False
-            )
-        
-        # Step 3: Add the new link
-        new_link = f'<a href="{link_url}">{anchor_text}</a><br>'
-        new_content = existing_content + "\n" + new_link
-        
-        logger.info(f"📤 Updating page content on {config.website_url}")
-        
-        # Step 4: Update the page
-        update_response = requests.post(
-            f"{api_base}/pages/{target_page_id}",
-            auth=HTTPBasicAuth(config.username, config.app_password),
-            headers={"Content-Type": "application/json"},
-            json={"content": new_content},
-            timeout=60
-        )
-        
-        if update_response.status_code == 200:
-            logger.info(f"✅ Successfully updated page on {config.website_url}")
-            return LinkResponse(
-                success=True,
-                message="Link successfully added",
-                website_url=config.website_url,
-                page_id=target_page_id,
-                link_added=True
-            )
-        else:
-            error_msg = f"Failed to update page: HTTP {update_response.status_code}"
-            logger.error(f"❌ {error_msg} on {config.website_url}")
-            try:
-                error_detail = update_response.json()
-                logger.error(f"❌ Error details: {error_detail}")
-            except:
-                pass
-            return LinkResponse(
-                success=False,
-                message=error_msg,
-                website_url=config.website_url,
-                page_id=target_page_id
-            )
-            
-    except requests.exceptions.Timeout:
-        error_msg = "Request timeout"
-        logger.error(f"⏰ {error_msg} for {config.website_url}")
-        return LinkResponse(
-            success=False,
-            message=error_msg,
-            website_url=config.website_url,
-            page_id=target_page_id
-        )
-    except requests.exceptions.ConnectionError:
-        error_msg = "Connection error"
-        logger.error(f"🔌 {error_msg} for {config.website_url}")
-        return LinkResponse(
-            success=False,
-            message=error_msg,
-            website_url=config.website_url,
-            page_id=target_page_id
-        )
-    except Exception as e:
-        error_msg = f"Unexpected error: {str(e)}"
-        logger.error(f"💥 {error_msg} for {config.website_url}")
-        return LinkResponse(
-            success=False,
-            message=error_msg,
-            website_url=config.website_url,
-            page_id=target_page_id
-        )
+    """
+    Add a link to a WordPress page
+    Uses the shared WordPress client, which coalesces concurrent additions to the same page
+    """
+    result = wordpress.add_link_to_wordpress(config, anchor_text, link_url, page_id=page_id, timeout=60)
+    return LinkResponse(**result.to_dict())
 
 # Load config on startup
 @app.on_event("startup")
 async def startup_event():
     load_websites_config()
+    
+    # Optionally keep measuring every site's latency, also between bulk runs
+    probe_interval = float(os.getenv('LATENCY_PROBE_INTERVAL', 0))
+    if probe_interval > 0:
+        start_probe(lambda: config_store.current, probe_interval)
 
 # API Endpoints
 @app.get("/")
@@ -470,17 +481,38 @@ async def root():
     return {"message": "WordPress Link Manager API", "version": "1.0.0"}
 
 @app.get("/websites", response_model=WebsiteListResponse)
-async def get_websites():
-    """Get list of available websites"""
+async def get_websites(
+    request: Request,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """
+    Get list of available websites, sorted by domain
+    - q: prefix/substring search over domain and site_name
+    - cursor/limit: pagination, pass next_cursor from the previous page
+    Unchanged lists return 304 when If-None-Match carries the previous ETag
+    """
+    snapshot = config_store.current
+    etag = make_etag(snapshot.loaded_at, snapshot.version, q, cursor, limit)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        configs, next_cursor, total = snapshot.index.page(q, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     websites = [
         {
             "website_url": config.website_url,
             "site_name": config.site_name,
             "page_id": config.page_id
         }
-        for config in websites_config
+        for config in configs
     ]
-    return WebsiteListResponse(websites=websites)
+    return FastJSONResponse({"websites": websites, "next_cursor": next_cursor, "total": total}, headers=headers)
 
 @app.get("/config-info", response_model=ConfigInfoResponse)
 async def get_config_info():
@@ -494,7 +526,8 @@ async def get_config_info():
     csv_available = config_file.exists()
     
     # Collect information about missing page_ids
-    websites_with_missing_ids = [config.website_url for config in websites_config if config.page_id == 0]
+    snapshot = config_store.current
+    websites_with_missing_ids = [config.website_url for config in snapshot if config.page_id == 0]
     missing_page_ids = len(websites_with_missing_ids)
     
     # If there are too many websites with missing IDs, limit the list to avoid response size issues
@@ -502,20 +535,19 @@ async def get_config_info():
         websites_with_missing_ids = websites_with_missing_ids[:50] + [f"... and {len(websites_with_missing_ids) - 50} more"]
     
     return ConfigInfoResponse(
-        config_source=config_source,
-        total_websites=len(websites_config),
+        config_source=snapshot.source,
+        total_websites=len(snapshot),
         environment_available=env_available,
         environment_base64_available=env_base64_available,
         csv_file_available=csv_available,
-        loaded_at=config_loaded_at,
+        loaded_at=snapshot.loaded_at,
         missing_page_ids=missing_page_ids,
         websites_with_missing_ids=websites_with_missing_ids if missing_page_ids > 0 else None
     )
 
-@app.post("/add-link", response_model=LinkResponse)
-async def add_link(request: LinkRequest):
+def process_link_request(request: LinkRequest) -> LinkResponse:
     """Add a single link to a WordPress website with logging"""
-    logger.info(f"🔗 Single link request: '{request.anchor_text}' -> {request.link_url} on {request.website_url}")
+    logger.info("🔗 Single link request: '%s' -> %s on %s", request.anchor_text, request.link_url, request.website_url)
     
     config = get_website_config(request.website_url)
     if not config:
@@ -532,29 +564,33 @@ async def add_link(request: LinkRequest):
     
     if result.success:
         if result.link_added:
-            logger.info(f"✅ Successfully added single link to {request.website_url}")
+            logger.info("✅ Successfully added single link to %s", request.website_url)
         else:
-            logger.info(f"🔄 Link already exists on {request.website_url}")
+            logger.info("🔄 Link already exists on %s", request.website_url)
     else:
-        logger.error(f"❌ Failed to add single link to {request.website_url}: {result.message}")
+        logger.error("❌ Failed to add single link to %s: %s", request.website_url, result.message)
         raise HTTPException(status_code=400, detail=result.message)
     
     return result
 
-@app.post("/add-bulk-links", response_model=List[LinkResponse])
-async def add_bulk_links(request: BulkLinkRequest):
+def process_bulk_link_request(request: BulkLinkRequest) -> List[Dict[str, Any]]:
     """Add the same link to multiple WordPress websites with comprehensive logging"""
     results = []
     successful_count = 0
     failed_count = 0
     
-    logger.info(f"🚀 Starting bulk link operation for {len(request.website_urls)} websites")
+    if request.check_link:
+        ensure_link_target_alive(str(request.link_url))
+    
+    # The whole run uses the config as it was when it started, even if sites are edited meanwhile
+    snapshot = config_store.current
+    logger.info(f"🚀 Starting bulk link operation for {len(request.website_urls)} websites (config v{snapshot.version})")
     logger.info(f"🔗 Link details: '{request.anchor_text}' -> {request.link_url}")
     
     for i, website_url in enumerate(request.website_urls, 1):
-        logger.info(f"📝 Processing website {i}/{len(request.website_urls)}: {website_url}")
+        logger.debug("📝 Processing website %d/%d: %s", i, len(request.website_urls), website_url)
         
-        config = get_website_config(website_url)
+        config = get_website_config(website_url, snapshot)
         if not config:
             error_msg = f"Website configuration not found for {website_url}"
             logger.error(f"❌ {error_msg}")
@@ -562,7 +598,8 @@ async def add_bulk_links(request: BulkLinkRequest):
                 success=False,
                 message=error_msg,
                 website_url=website_url,
-                page_id=request.page_id or 0
+                page_id=request.page_id or 0,
+                error=wordpress.ERROR_NOT_FOUND
             ))
             failed_count += 1
             continue
@@ -577,13 +614,13 @@ async def add_bulk_links(request: BulkLinkRequest):
             
             if result.success:
                 if result.link_added:
-                    logger.info(f"✅ Successfully added link to {website_url} (page {result.page_id})")
+                    logger.info("✅ Successfully added link to %s (page %s)", website_url, result.page_id)
                     successful_count += 1
                 else:
-                    logger.info(f"🔄 Link already exists on {website_url} (page {result.page_id})")
+                    logger.info("🔄 Link already exists on %s (page %s)", website_url, result.page_id)
                     successful_count += 1
             else:
-                logger.error(f"❌ Failed to add link to {website_url}: {result.message}")
+                logger.error("❌ Failed to add link to %s: %s", website_url, result.message)
                 failed_count += 1
             
             results.append(result)
@@ -595,7 +632,8 @@ async def add_bulk_links(request: BulkLinkRequest):
                 success=False,
                 message=error_msg,
                 website_url=website_url,
-                page_id=request.page_id or config.page_id
+                page_id=request.page_id or config.page_id,
+                error=wordpress.ERROR_OTHER
             ))
             failed_count += 1
     
@@ -608,7 +646,236 @@ async def add_bulk_links(request: BulkLinkRequest):
         failed_sites = [r.website_url for r in results if not r.success]
         logger.warning(f"⚠️ Failed websites: {', '.join(failed_sites)}")
     
-    return results
+    return [result.model_dump() for result in results]
+
+async def run_idempotent(endpoint: str, idempotency_key: Optional[str], request: BaseModel, func):
+    """
+    Run a blocking link operation, answering repeats of the same Idempotency-Key from the store
+    Returns (result, replayed)
+    """
+    if not idempotency_key:
+        return await run_in_threadpool(func, request), False
+    
+    try:
+        return await idempotency_store.execute(
+            f"{endpoint}:{idempotency_key}",
+            request_fingerprint(request.model_dump_json()),
+            lambda: run_in_threadpool(func, request)
+        )
+    except IdempotencyKeyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/add-link", response_model=LinkResponse)
+async def add_link(request: LinkRequest, response: Response, idempotency_key: Optional[str] = Header(None)):
+    """Add a single link to a WordPress website (retries with the same Idempotency-Key are not repeated)"""
+    result, replayed = await run_idempotent("add-link", idempotency_key, request, process_link_request)
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
+
+@app.post("/add-bulk-links", responses={200: {"model": List[LinkResponse]}})
+async def add_bulk_links(request: BulkLinkRequest, idempotency_key: Optional[str] = Header(None)):
+    """Add the same link to multiple WordPress websites (retries with the same Idempotency-Key are not repeated)"""
+    results, replayed = await run_idempotent("add-bulk-links", idempotency_key, request, process_bulk_link_request)
+    # Every row is a LinkResponse.model_dump(); it is documented, not re-validated
+    return FastJSONResponse(results, headers={REPLAYED_HEADER: "true"} if replayed else None)
+
+def process_link_matrix_request(request: LinkMatrixRequest) -> List[Dict[str, Any]]:
+    """Add (site, anchor, url) triples with one read-modify-write per site page"""
+    snapshot = config_store.current
+    entries = [
+        {"website_url": entry.website_url, "anchor_text": entry.anchor_text, "link_url": str(entry.link_url)}
+        for entry in request.entries
+    ]
+    return run_link_matrix(
+        entries,
+        lambda website_url: get_website_config(website_url, snapshot),
+        page_id=request.page_id,
+        max_workers=max(1, min(request.max_workers, 32))
+    )
+
+@app.post("/add-link-matrix")
+async def add_link_matrix(request: LinkMatrixRequest, idempotency_key: Optional[str] = Header(None)):
+    """Add several links across overlapping sets of sites; one result per (site, anchor, url)"""
+    results, replayed = await run_idempotent("add-link-matrix", idempotency_key, request, process_link_matrix_request)
+    return FastJSONResponse(results, headers={REPLAYED_HEADER: "true"} if replayed else None)
+
+def ensure_link_target_alive(link_url: str):
+    """Pre-flight check for bulk requests: refuse dead targets before touching any site"""
+    status = link_checker.check(link_url)
+    if not status["alive"]:
+        reason = status["error"] or f"HTTP {status['status_code']}"
+        raise HTTPException(status_code=422, detail=f"Link target {link_url} is not reachable ({reason})")
+
+def process_link_check_request(request: LinkCheckRequest) -> Dict[str, Any]:
+    """Check requested link targets plus the ones already inserted on the selected sites"""
+    found_on: Dict[str, List[str]] = {url: [] for url in request.link_urls}
+    
+    snapshot = config_store.current
+    if request.all_websites:
+        scan = list(snapshot)
+    else:
+        scan = [config for config in (get_website_config(url, snapshot) for url in request.website_urls or []) if config]
+    for url, sites in wordpress.collect_site_links(scan).items():
+        found_on.setdefault(url, []).extend(sites)
+    
+    results = link_checker.check_many(found_on)
+    for result in results:
+        result["found_on"] = found_on[result["url"]]
+    dead = sum(1 for result in results if not result["alive"])
+    logger.info(f"🔎 Checked {len(results)} link targets, {dead} dead")
+    return {"checked": len(results), "dead": dead, "results": results}
+
+@app.post("/check-links")
+async def check_links(request: LinkCheckRequest):
+    """Check link targets concurrently (HEAD with GET fallback, results cached with TTL)"""
+    return FastJSONResponse(await run_in_threadpool(process_link_check_request, request))
+
+def apply_imported_websites(imported: List[Dict[str, Any]]) -> int:
+    """Add imported sites (replacing the configured entry for the same site) and save once"""
+    def merge(snapshot: ConfigSnapshot):
+        configs = list(snapshot)
+        configured = configured_sites(snapshot)
+        for data in imported:
+            existing = configured.get(site_key(data["website_url"]))
+            config = WebsiteConfig(**data)
+            if existing is None:
+                configs.append(config)
+                continue
+            if existing.page_id == config.page_id:
+                config.continuation_page_ids = existing.continuation_page_ids
+                config.max_page_bytes = existing.max_page_bytes
+            configs[configs.index(existing)] = config
+        return configs
+    
+    config_store.update(merge)
+    save_websites_config()
+    logger.info(f"📥 Imported {len(imported)} website configurations")
+    return len(imported)
+
+def apply_discovered_page_ids(results: List[Dict[str, Any]]) -> int:
+    """Store the page IDs of 'found' results in the config, saving once"""
+    def store(snapshot: ConfigSnapshot):
+        replacements = {}
+        for result in results:
+            config = snapshot.lookup(result["website_url"])
+            if result["status"] != "found" or config is None or config.page_id == result["page_id"]:
+                continue
+            replacements[id(config)] = replace_config(config, page_id=result["page_id"], continuation_page_ids=[])
+            result["applied"] = True
+        if not replacements:
+            return None
+        return tuple(replacements.get(id(config), config) for config in snapshot)
+    
+    config_store.update(store)
+    applied = sum(1 for result in results if result.get("applied"))
+    if applied:
+        save_websites_config()
+    return applied
+
+@app.post("/discover-page-ids")
+async def discover_page_ids_endpoint(request: PageDiscoveryRequest):
+    """
+    Find the link page of sites with a missing page_id by slug or title pattern
+    Listings are fetched concurrently and cached; IDs are only stored when apply is set
+    """
+    configs = config_store.current
+    if request.website_urls:
+        targets = [config for config in (get_website_config(url, configs) for url in request.website_urls) if config]
+    else:
+        targets = [config for config in configs if not config.page_id]
+    if request.title_pattern:
+        try:
+            re.compile(request.title_pattern)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid title_pattern: {e}")
+    
+    results = await run_in_threadpool(
+        discover_page_ids,
+        targets,
+        slugs=request.slugs or DEFAULT_SLUGS,
+        title_pattern=request.title_pattern,
+        refresh=request.refresh
+    )
+    applied = apply_discovered_page_ids(results) if request.apply else 0
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return FastJSONResponse({"checked": len(results), "applied": applied, "counts": counts, "results": results})
+
+@app.post("/websites/import")
+async def import_websites(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    update_existing: bool = False,
+    max_workers: int = Query(8, ge=1, le=32)
+):
+    """
+    Import sites from a WordPress_websites_API-overzicht.csv export (semicolon separated)
+    Every row is checked against its site (credentials and page_id, max_workers at a time);
+    valid rows are written in a single config save. Returns a report entry per row.
+    """
+    configured = configured_sites(config_store.current)
+    try:
+        result = await run_in_threadpool(
+            import_overview,
+            codecs.iterdecode(file.file, "utf-8-sig"),
+            is_configured=lambda url: site_key(url) in configured,
+            update_existing=update_existing,
+            max_workers=max_workers
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+    
+    imported = 0 if dry_run or not result["valid"] else apply_imported_websites(result["valid"])
+    return FastJSONResponse({
+        "imported": imported,
+        "dry_run": dry_run,
+        "counts": result["counts"],
+        "report": result["report"]
+    })
+
+def build_website_config(data: Dict[str, Any], previous: Optional[WebsiteConfig]) -> WebsiteConfig:
+    config = WebsiteConfig(**data)
+    # Continuation pages belong to the old link page, so they are kept only if it stays
+    if previous is not None and previous.page_id == config.page_id:
+        config.continuation_page_ids = previous.continuation_page_ids
+    return config
+
+@app.post("/websites/batch")
+async def batch_websites(request: WebsiteBatchRequest):
+    """
+    Add, update and delete many websites in one request
+    The batch is validated as a whole and saved once; returns a result per item.
+    With atomic (default) nothing is applied if any item fails (HTTP 422).
+    """
+    outcome = {}
+    
+    def apply(snapshot: ConfigSnapshot):
+        new_configs, results = plan_website_batch(
+            snapshot,
+            add=[website.model_dump() for website in request.add],
+            update=[website.model_dump() for website in request.update],
+            delete=request.delete,
+            build=build_website_config
+        )
+        failed = sum(1 for result in results if not result["success"])
+        outcome.update(results=results, failed=failed,
+                       applied=len(results) > failed and (failed == 0 or not request.atomic))
+        return new_configs if outcome["applied"] else None
+    
+    config_store.update(apply)
+    results, failed, applied = outcome["results"], outcome["failed"], outcome["applied"]
+    if applied:
+        save_websites_config()
+        logger.info(f"📦 Applied website batch: {len(results) - failed} changes, {failed} failed")
+    
+    return FastJSONResponse({
+        "applied": applied,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results
+    }, status_code=422 if failed and not applied else 200)
 
 @app.post("/websites", response_model=WebsiteResponse)
 async def add_website(request: WebsiteRequest):
@@ -679,12 +946,8 @@ async def test_wordpress_connection(website_url: str):
         api_base = f"{config.website_url.rstrip('/')}/wp-json/wp/v2"
         logger.info(f"🧪 Testing WordPress connection to {api_base}")
         
-        # Test basic API connectivity
-        response = requests.get(
-            f"{api_base}/pages/{config.page_id}",
-            auth=HTTPBasicAuth(config.username, config.app_password),
-            timeout=10
-        )
+        # Test basic API connectivity (shares an in-flight fetch of the same page)
+        response = await run_in_threadpool(wordpress.fetch_page, config, config.page_id, 10)
         
         if response.status_code == 200:
             page_data = response.json()
@@ -720,13 +983,58 @@ async def test_wordpress_connection(website_url: str):
             "page_id": config.page_id
         }
 
+@app.get("/latency-profile")
+async def get_latency_profile(limit: Optional[int] = Query(None, ge=1, le=1000)):
+    """Per-site GET/update latency (EWMA and p95), slowest sites first"""
+    sites = latency_profile.report(limit)
+    return {"sites": sites, "total": len(sites)}
+
+@app.get("/rate-limit")
+async def get_rate_limit():
+    """Outbound rate limits (WP_RATE_LIMIT_*) and how often they throttled requests"""
+    return rate_limiter.stats()
+
+def require_profiling_token(token: Optional[str]):
+    """Profiling is only available with PROFILING_TOKEN set and sent as X-Profile-Token"""
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not token_valid(token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@app.post("/debug/profile")
+async def profile_process(seconds: float = Query(10, gt=0, le=300), mode: str = "sampling",
+                          x_profile_token: Optional[str] = Header(None)):
+    """
+    Profile the whole process for a number of seconds; returns the profile file
+    Only sampling sees every thread; cprofile profiles the event loop (see note in the response)
+    """
+    require_profiling_token(x_profile_token)
+    try:
+        with ProfileSession(mode, "process") as session:
+            await asyncio.sleep(seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"mode": mode, "seconds": seconds, "path": session.path,
+            "note": CPROFILE_THREAD_NOTE if mode == "cprofile" else None}
+
+@app.post("/debug/memory-snapshot")
+async def memory_snapshot(stop: bool = False, x_profile_token: Optional[str] = Header(None)):
+    """
+    tracemalloc snapshot with the largest growth since the first snapshot
+    Tracing starts with the first call and costs memory and CPU until a call with stop=true
+    """
+    require_profiling_token(x_profile_token)
+    return await run_in_threadpool(memory_tracker.stop if stop else memory_tracker.snapshot)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "websites_loaded": len(websites_config)
+        "websites_loaded": len(config_store.current)
     }
 
 if __name__ == "__main__":
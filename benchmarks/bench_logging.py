@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: logging overhead per processed site, before and after the queue-based pipeline
+
+Before: 6 eager f-string logger.info calls per site, written synchronously to a
+FileHandler and a StreamHandler from the worker threads (old bulk_links_manager.py setup).
+After: per-step chatter at DEBUG with lazy %-formatting, one INFO outcome line,
+handlers run on the background listener (utils/log_pipeline.py).
+
+Usage: python benchmarks/bench_logging.py [sites] [workers]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+from utils.log_pipeline import setup_logging, shutdown_logging
+
+logger = logging.getLogger("bench")
+
+
+def site_before(i: int):
+    url = f"https://www.site{i}.nl"
+    logger.info(f"🔍 Attempting to add link to {url} (page {i})")
+    logger.info(f"🔗 Link: 'Anchor' -> https://target.nl/")
+    logger.info(f"📥 Fetching page content from {url}/wp-json/wp/v2/pages/{i}")
+    logger.info(f"✅ Successfully fetched page data from {url}")
+    logger.info(f"📤 Updating page content on {url}")
+    logger.info(f"✅ Successfully updated page on {url}")
+
+
+def site_after(i: int):
+    url = "https://www.site%d.nl" % i
+    logger.debug("🔍 Attempting to add link to %s (page %s): '%s' -> %s", url, i, "Anchor", "https://target.nl/")
+    logger.debug("📥 Fetching page content from %s/wp-json/wp/v2/pages/%s", url, i)
+    logger.debug("✅ Successfully fetched page data from %s", url)
+    logger.debug("📤 Updating page content on %s", url)
+    logger.debug("✅ Successfully updated page on %s", url)
+    logger.info("✅ Successfully added link to %s (page %s)", url, i)
+
+
+def make_handlers(log_dir: str, name: str):
+    console = open(os.devnull, 'w', encoding='utf-8')
+    return [logging.FileHandler(os.path.join(log_dir, f"{name}.log"), encoding='utf-8'),
+            logging.StreamHandler(console)]
+
+
+def run(site_func, sites: int, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(site_func, range(sites)))
+    return time.perf_counter() - start
+
+
+def main():
+    sites = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        setup_logging(level='INFO', handlers=make_handlers(log_dir, 'before'), use_queue=False)
+        before = run(site_before, sites, workers)
+
+        setup_logging(level='INFO', handlers=make_handlers(log_dir, 'after'))
+        after = run(site_after, sites, workers)
+        drain_start = time.perf_counter()
+        shutdown_logging()
+        drain = time.perf_counter() - drain_start
+
+    print(f"📊 Logging overhead per site ({sites} sites, {workers} worker threads)")
+    print(f"   before (sync handlers, eager f-strings): {before / sites * 1e6:8.1f} µs/site")
+    print(f"   after  (queue + lazy debug):             {after / sites * 1e6:8.1f} µs/site on the worker threads")
+    print(f"          background writer drain after run: {drain * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serializing /add-bulk-links and /websites responses at 1k and 10k items
+
+Before: LinkResponse(**result.to_dict()) per site, then FastAPI validates the list
+against response_model and encodes it with the stdlib JSON encoder.
+After: plain dicts rendered once by FastJSONResponse (orjson when installed).
+
+Usage: python benchmarks/bench_serialization.py
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+from typing import List
+
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import JSONResponse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+from utils.serialization import FastJSONResponse, GZIP_COMPRESS_LEVEL, orjson
+from utils.wordpress import LinkResponse as WordPressResult
+
+
+class LinkResponse(BaseModel):
+    success: bool
+    message: str
+    website_url: str
+    page_id: int
+    link_added: bool = False
+
+
+link_list_adapter = TypeAdapter(List[LinkResponse])
+
+
+def make_results(count: int) -> List[WordPressResult]:
+    return [WordPressResult(True, "Link successfully added", f"https://www.site{i}.nl", i, True) for i in range(count)]
+
+
+def before(results: List[WordPressResult]) -> bytes:
+    models = [LinkResponse(**result.to_dict()) for result in results]
+    validated = link_list_adapter.validate_python(models)
+    return JSONResponse(link_list_adapter.dump_python(validated, mode="json")).body
+
+
+def after(results: List[WordPressResult]) -> bytes:
+    return FastJSONResponse([result.to_dict() for result in results]).body
+
+
+def timed(func, arg, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"📊 Response serialization (encoder: {'orjson' if orjson else 'json (stdlib)'})")
+    for count in (1000, 10000):
+        results = make_results(count)
+        assert json.loads(before(results)) == json.loads(after(results))
+        body = after(results)
+        compressed = gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL)
+        print(f"   {count:>6} items: before {timed(before, results) * 1000:7.2f} ms, "
+              f"after {timed(after, results) * 1000:7.2f} ms, "
+              f"body {len(body) / 1024:7.1f} KiB -> gzip {len(compressed) / 1024:6.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
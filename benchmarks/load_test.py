@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent /add-link, /websites and /add-bulk-links traffic against an API app
+
+The app (backend/main.py or api/index.py) runs in-process under uvicorn, seeded with
+simulated sites; the simulated WordPress (one listener per site, so every site gets its own
+keep-alive pool as in production) runs in a child process with configurable latency and error
+rate. Each client is a closed loop: it sends its next request when the previous one returned.
+The clients share the process with the app, so the numbers are for comparing versions on the
+same machine, not absolute capacity.
+
+Usage: python benchmarks/load_test.py [--app backend|api] [--clients 32] [--duration 20]
+           [--mix add-link=6,websites=3,add-bulk-links=1] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / 'api'))
+
+APPS = {"backend": ROOT / "backend" / "main.py", "api": ROOT / "api" / "index.py"}
+ENDPOINTS = ("add-link", "websites", "add-bulk-links")
+PAGE_ID = 10
+
+
+# Simulated WordPress (child process)
+
+def _serve_wordpress(sites: int, latency_ms: float, jitter_ms: float, error_rate: float, ready):
+    pages: Dict[int, str] = {}
+
+    async def handle(port: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers["content-length"])) if headers.get("content-length") else b""
+
+                await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+                path = target.split("?", 1)[0]
+                if random.random() < error_rate:
+                    status, payload = 500, {"code": "internal_server_error", "message": "Simulated failure"}
+                elif path != f"/wp-json/wp/v2/pages/{PAGE_ID}":
+                    status, payload = 404, {"code": "rest_no_route", "message": "No route"}
+                else:
+                    if method == "POST":
+                        pages[port] = json.loads(body).get("content", "")
+                    content = pages.get(port, "")
+                    status, payload = 200, {"id": PAGE_ID, "slug": "links", "title": {"rendered": "Links"},
+                                            "content": {"raw": content, "rendered": content}}
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        writer.close()
+
+    async def main():
+        servers = []
+        for _ in range(sites):
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+            servers.append(await asyncio.start_server(lambda r, w, port=port: handle(port, r, w), sock=sock, backlog=1024))
+        ready.send([server.sockets[0].getsockname()[1] for server in servers])
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def start_wordpress(sites: int, latency_ms: float, jitter_ms: float, error_rate: float
+                    ) -> Tuple[multiprocessing.Process, List[int]]:
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_serve_wordpress, args=(sites, latency_ms, jitter_ms, error_rate, sender),
+                                      name="simulated-wordpress", daemon=True)
+    process.start()
+    return process, receiver.recv()
+
+
+# App under test (in-process)
+
+def load_app(name: str):
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(f"load_test_{name}", APPS[name])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_app(module, log_level: str):
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(module.app, log_level=log_level.lower(), access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="app-under-test", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("App failed to start")
+        time.sleep(0.05)
+    return server, thread, sock.getsockname()[1]
+
+
+def seed_sites(module, ports: List[int]) -> List[str]:
+    """Replace the app's websites with the simulated ones (page sharding is kept out of the way)"""
+    urls = [f"http://127.0.0.1:{port}" for port in ports]
+    configs = [module.WebsiteConfig(website_url=url, page_id=PAGE_ID, username="load", app_password="test test",
+                                    site_name=f"site{i}.test", max_page_bytes=1 << 30)
+               for i, url in enumerate(urls)]
+    module.config_store.replace(configs, loaded_at=datetime.now().isoformat(), source="load_test")
+    return urls
+
+
+# Clients
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name.strip()}' (expected one of {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def build_request(endpoint: str, urls: List[str], rng: random.Random, bulk_size: int, sequence: str
+                  ) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    # A new link target per request, so no request stops at "link already exists"
+    link_url = f"https://target.test/{sequence}"
+    if endpoint == "add-link":
+        return "POST", "/add-link", {"anchor_text": f"Link {sequence}", "link_url": link_url,
+                                     "website_url": rng.choice(urls)}
+    if endpoint == "add-bulk-links":
+        return "POST", "/add-bulk-links", {"anchor_text": f"Link {sequence}", "link_url": link_url,
+                                           "website_urls": rng.sample(urls, min(bulk_size, len(urls)))}
+    return "GET", "/websites", None
+
+
+async def run_clients(base_url: str, urls: List[str], mix: Dict[str, float], clients: int, duration: float,
+                      warmup: float, bulk_size: int, timeout: float, seed: int) -> Dict[str, List[Tuple[float, Any, int, int]]]:
+    """
+    (latency seconds, status code or exception name, links, failed links) per request, per
+    endpoint, after the warm-up; /add-bulk-links answers 200 even when some sites failed
+    """
+    import httpx
+
+    samples: Dict[str, List[Tuple[float, Any, int, int]]] = defaultdict(list)
+    started = time.monotonic()
+    measure_from, stop_at = started + warmup, started + warmup + duration
+    names, weights = list(mix), list(mix.values())
+
+    async def client(number: int):
+        rng = random.Random(seed + number)
+        # One connection per client; a shared pool with hundreds of connections distorts the latencies
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout,
+                                     limits=httpx.Limits(max_connections=1)) as http:
+            count = 0
+            while time.monotonic() < stop_at:
+                endpoint = rng.choices(names, weights)[0]
+                method, path, body = build_request(endpoint, urls, rng, bulk_size, f"{number}-{count}")
+                count += 1
+                request_start = time.monotonic()
+                links = len(body.get("website_urls", [body.get("website_url")])) if body else 0
+                failed = links
+                try:
+                    response = await http.request(method, path, json=body)
+                    latency = time.monotonic() - request_start
+                    outcome: Any = response.status_code
+                    if links and response.status_code == 200:
+                        results = response.json()
+                        results = results if isinstance(results, list) else [results]
+                        failed = links - sum(1 for result in results if result.get("success"))
+                except httpx.HTTPError as e:
+                    latency = time.monotonic() - request_start
+                    outcome = type(e).__name__
+                if request_start >= measure_from:
+                    samples[endpoint].append((latency, outcome, links, failed))
+
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    return samples
+
+
+# Report
+
+def percentile(ordered: List[float], fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples: List[Tuple[float, Any, int, int]], duration: float) -> Dict[str, Any]:
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    outcomes = Counter(str(sample[1]) for sample in samples)
+    errors = sum(1 for sample in samples if not isinstance(sample[1], int) or sample[1] >= 400)
+    links = sum(sample[2] for sample in samples)
+    failed_links = sum(sample[3] for sample in samples)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / duration, 1),
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "outcomes": dict(sorted(outcomes.items())),
+        "links": links,
+        "link_failure_rate": round(failed_links / links, 4) if links else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    settings = result["settings"]
+    print(f"📊 Load test {settings['app']} @ {result['commit'] or '?'}: {settings['clients']} clients, "
+          f"{settings['duration']:.0f}s, {settings['sites']} sites, WordPress latency {settings['wp_latency_ms']:.0f} ms")
+    rows = list(result["endpoints"].items()) + [("total", result["total"])]
+    for name, stats in rows:
+        line = (f"   {name:<15} {stats['requests']:>7} req {stats['throughput_rps']:>8.1f} req/s  "
+                f"p50 {stats['p50_ms'] or 0:>8.1f}  p95 {stats['p95_ms'] or 0:>8.1f}  p99 {stats['p99_ms'] or 0:>8.1f} ms  "
+                f"errors {stats['error_rate'] * 100:5.1f}%  failed links {stats['link_failure_rate'] * 100:5.1f}%")
+        old = (baseline or {}).get("endpoints", {}).get(name) if name != "total" else (baseline or {}).get("total")
+        if old and old.get("throughput_rps") and old.get("p95_ms"):
+            line += (f"  (vs {baseline.get('commit') or 'baseline'}: throughput "
+                     f"{(stats['throughput_rps'] / old['throughput_rps'] - 1) * 100:+.0f}%, p95 "
+                     f"{((stats['p95_ms'] or 0) / old['p95_ms'] - 1) * 100:+.0f}%)")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", choices=sorted(APPS), default="backend")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent closed-loop clients")
+    parser.add_argument("--duration", type=float, default=20, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of traffic before measuring")
+    parser.add_argument("--mix", default="add-link=6,websites=3,add-bulk-links=1", help="Relative weight per endpoint")
+    parser.add_argument("--sites", type=int, default=100, help="Simulated WordPress sites")
+    parser.add_argument("--bulk-size", type=int, default=20, help="Sites per /add-bulk-links request")
+    parser.add_argument("--wp-latency-ms", type=float, default=50)
+    parser.add_argument("--wp-jitter-ms", type=float, default=10)
+    parser.add_argument("--wp-error-rate", type=float, default=0.0, help="Fraction of WordPress calls answered with 500")
+    parser.add_argument("--timeout", type=float, default=120, help="Client timeout per request (seconds)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the app under test")
+    parser.add_argument("--output", help="JSON file for the results (default: benchmarks/results/<app>-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare with")
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    wordpress, ports = start_wordpress(args.sites, args.wp_latency_ms, args.wp_jitter_ms, args.wp_error_rate)
+    state_dir = tempfile.mkdtemp(prefix="load-test-")
+    # Keep the app's runtime state out of the working tree
+    os.environ.setdefault("LATENCY_PROFILE_PATH", os.path.join(state_dir, "latency_profile.json"))
+    os.environ.setdefault("MEDIA_MAP_PATH", os.path.join(state_dir, "media_map.json"))
+    try:
+        module = load_app(args.app)
+        logging.getLogger().setLevel(args.log_level.upper())
+        server, thread, port = start_app(module, args.log_level)
+        urls = seed_sites(module, ports)
+        samples = asyncio.run(run_clients(f"http://127.0.0.1:{port}", urls, mix, args.clients, args.duration,
+                                          args.warmup, args.bulk_size, args.timeout, args.seed))
+        server.should_exit = True
+        thread.join(timeout=10)
+    finally:
+        wordpress.terminate()
+
+    result = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "endpoints": {endpoint: summarize(samples.get(endpoint, []), args.duration) for endpoint in mix},
+        "total": summarize([sample for endpoint in mix for sample in samples.get(endpoint, [])], args.duration),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    print_report(result, baseline)
+
+    output = Path(args.output) if args.output else (
+        ROOT / "benchmarks" / "results" / f"{args.app}-{result['commit'] or 'unknown'}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+    print(f"💾 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,29 +5,217 @@ import json
 import time
 from datetime import datetime
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import os
+import sys
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import zlib
 
-# 📊 LOGGING SETUP
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bulk_links.log'),
-        logging.StreamHandler()
-    ]
-)
+# Gedeelde utilities staan in api/utils
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+from utils.log_pipeline import setup_logging
+from utils.liveness import extract_links, link_checker
+from utils.latency import latency_profile, Timer
+from utils.link_matrix import parse_matrix, run_link_matrix
+from utils.http_client import http_session
+from utils.wordpress import ERROR_TIMEOUT
+from utils.rate_limit import parse_site_limits, rate_limiter
+from utils.profiling import PROFILE_MODES, MemoryTracker, ProfileSession
+from utils.config import WebsiteConfig
+from utils.website_index import WebsiteIndex
+
+# 📊 LOGGING SETUP (bestand en console worden vanuit een achtergrond thread geschreven)
+setup_logging(handlers=[
+    logging.FileHandler('bulk_links.log'),
+    logging.StreamHandler()
+])
 logger = logging.getLogger(__name__)
 
+STATUS_EMOJI = {
+    'SUCCES': '✅',
+    'BESTAAT_AL': 'ℹ️',
+    'FOUT': '❌',
+    'TIMEOUT': '⏰',
+    'OK': '🟢',
+    'DOOD': '💀'
+}
+
+REPORT_FIELDS = ['site_name', 'website_url', 'status', 'message', 'timestamp', 'fetch_ms', 'update_ms', 'duration_ms']
+
+class ReportStats:
+    """Statistieken die tijdens de run worden bijgewerkt (geen tweede pass nodig)"""
+    
+    def __init__(self):
+        self.total = 0
+        self.status_counts = {}
+        self.timed = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+    
+    def add(self, result):
+        self.total += 1
+        status = result['status']
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        
+        duration = result.get('duration_ms')
+        if duration is not None:
+            self.timed += 1
+            self.total_ms += duration
+            self.min_ms = duration if self.min_ms is None else min(self.min_ms, duration)
+            self.max_ms = duration if self.max_ms is None else max(self.max_ms, duration)
+    
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.timed if self.timed else None
+    
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'status_counts': dict(self.status_counts),
+            'mean_ms': self.mean_ms,
+            'min_ms': self.min_ms,
+            'max_ms': self.max_ms
+        }
+
+class StreamingReportWriter:
+    """
+    Schrijft resultaten per site direct weg naar CSV, JSONL en optioneel Parquet
+    Elke run krijgt eigen bestanden, zodat een vorige run niet overschreven wordt
+    """
+    
+    def __init__(self, prefix='bulk_results', formats=('csv', 'jsonl'), parquet_batch_size=1000):
+        run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.base_path = f"{prefix}_{run_id}"
+        self.formats = formats
+        self.parquet_batch_size = parquet_batch_size
+        self.paths = []
+        self._files = []
+        self._csv_writer = None
+        self._jsonl_file = None
+        self._parquet_writer = None
+        self._parquet_path = None
+        self._parquet_rows = []
+    
+    def __enter__(self):
+        if 'csv' in self.formats:
+            csv_file = self._open(f"{self.base_path}.csv")
+            self._csv_writer = csv.DictWriter(csv_file, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+            self._csv_writer.writeheader()
+        if 'jsonl' in self.formats:
+            self._jsonl_file = self._open(f"{self.base_path}.jsonl")
+        if 'parquet' in self.formats:
+            try:
+                import pyarrow  # noqa: F401  (optionele dependency)
+                self._parquet_path = f"{self.base_path}.parquet"
+                self.paths.append(self._parquet_path)
+            except ImportError:
+                logger.warning("⚠️ pyarrow niet geïnstalleerd, Parquet rapport wordt overgeslagen")
+        return self
+    
+    def _open(self, path):
+        file = open(path, 'w', newline='', encoding='utf-8')
+        self._files.append(file)
+        self.paths.append(path)
+        return file
+    
+    def write(self, result):
+        if self._csv_writer:
+            self._csv_writer.writerow(result)
+        if self._jsonl_file:
+            self._jsonl_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        if self._parquet_path:
+            self._parquet_rows.append({field: result.get(field) for field in REPORT_FIELDS})
+            if len(self._parquet_rows) >= self.parquet_batch_size:
+                self._flush_parquet()
+    
+    def _flush_parquet(self):
+        """Schrijf de gebufferde rijen als één row group"""
+        if not self._parquet_rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        schema = pa.schema([
+            ('site_name', pa.string()), ('website_url', pa.string()), ('status', pa.string()),
+            ('message', pa.string()), ('timestamp', pa.string()),
+            ('fetch_ms', pa.float64()), ('update_ms', pa.float64()), ('duration_ms', pa.float64())
+        ])
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self._parquet_path, schema)
+        self._parquet_writer.write_table(pa.Table.from_pylist(self._parquet_rows, schema=schema))
+        self._parquet_rows = []
+    
+    def __exit__(self, *exc_info):
+        if self._parquet_path:
+            self._flush_parquet()
+            if self._parquet_writer:
+                self._parquet_writer.close()
+        for file in self._files:
+            file.close()
+        return False
+
+class AsyncClientPool:
+    """
+    Gedeelde async HTTP clients voor de asyncio modus
+    De verbindingen worden over clients met elk per_client keep-alive verbindingen verdeeld;
+    een website gebruikt altijd dezelfde client, zodat keep-alive verbindingen hergebruikt worden.
+    Het totaal aantal verbindingen begrenst de aanroeper (vast aantal workers), niet de clients zelf.
+    DNS wordt in deze modus niet gecachet: de DNS cache van utils.http_client geldt alleen voor de
+    requests sessie, httpx zoekt de host bij elke nieuwe verbinding opnieuw op.
+    """
+    
+    def __init__(self, max_connections, per_client=16):
+        import httpx
+        
+        count = max(1, -(-max_connections // per_client))
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=per_client)
+        self.clients = [httpx.AsyncClient(limits=limits) for _ in range(count)]
+    
+    def client_for(self, website_url):
+        return self.clients[zlib.crc32(website_url.encode('utf-8')) % len(self.clients)]
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await asyncio.gather(*(client.aclose() for client in self.clients))
+
+
+def begrensd_uitvoeren(executor, functie, items, max_in_flight):
+    """
+    Voer functie(item) uit voor alle items, met hooguit max_in_flight taken tegelijk bij de executor
+    Levert (item, future) op zodra een taak klaar is; zo staan er bij duizenden sites geen
+    duizenden futures (en wachtende resultaten) tegelijk in het geheugen
+    """
+    in_flight = {}
+    for item in items:
+        if len(in_flight) >= max_in_flight:
+            klaar, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in klaar:
+                yield in_flight.pop(future), future
+        in_flight[executor.submit(functie, item)] = item
+    while in_flight:
+        klaar, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in klaar:
+            yield in_flight.pop(future), future
+
+
 class BulkLinksManager:
     """
     Professionele bulk links manager voor meerdere WordPress websites
     """
     
-    def __init__(self, config_file='websites_config.csv'):
+    def __init__(self, config_file='websites_config.csv', report_prefix='bulk_results', report_formats=('csv', 'jsonl')):
         self.config_file = config_file
         self.websites = []
-        self.results = []
+        self.report_prefix = report_prefix
+        self.report_formats = report_formats
+        self.report = None
+        self.stats = ReportStats()
         
     def load_websites_config(self):
         """
@@ -77,8 +265,34 @@ class BulkLinksManager:
     
     def add_link_to_website(self, website_config, link_data, timeout=30):
         """
-        Voeg link toe aan een specifieke website
+        Voeg link toe aan een specifieke website, inclusief timings per stap
+        """
+        # wacht_ms: tijd op de rate limiter gewacht, geen latency van de site
+        timings = {'fetch_ms': None, 'update_ms': None, 'wacht_ms': 0.0}
+        start = time.perf_counter()
+        result = self._add_link_to_website(website_config, link_data, timeout, timings)
+        wacht_ms = timings.pop('wacht_ms')
+        result.update(timings)
+        result['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self._registreer_latency(website_config, result, timings, wacht_ms)
+        return result
+    
+    def _registreer_latency(self, website_config, result, timings, wacht_ms=0.0):
         """
+        Latency profiel bijwerken (ook de API gebruikt het voor de volgorde van bulk runs)
+        Wachten op de rate limiter telt niet mee
+        """
+        ok = result['status'] in ('SUCCES', 'BESTAAT_AL')
+        if timings['fetch_ms'] is not None:
+            latency_profile.record(website_config['website_url'], 'get', timings['fetch_ms'] / 1000,
+                                   ok=ok or timings['update_ms'] is not None)
+        elif result['status'] == 'TIMEOUT':
+            latency_profile.record(website_config['website_url'], 'get',
+                                   max(0.0, result['duration_ms'] - wacht_ms) / 1000, ok=False)
+        if timings['update_ms'] is not None:
+            latency_profile.record(website_config['website_url'], 'update', timings['update_ms'] / 1000, ok=ok)
+    
+    def _add_link_to_website(self, website_config, link_data, timeout, timings):
         site_name = website_config.get('site_name', 'Onbekend')
         website_url = website_config['website_url']
         
@@ -89,14 +303,18 @@ class BulkLinksManager:
             username = website_config['username']
             app_password = website_config['app_password'].replace(' ', '')  # Spaties verwijderen
             
-            logger.info(f"🔄 Bezig met {site_name} ({website_url})...")
+            logger.debug("🔄 Bezig met %s (%s)...", site_name, website_url)
             
-            # Stap 1: Pagina ophalen
-            response = requests.get(
-                f"{api_base}/pages/{page_id}",
-                auth=HTTPBasicAuth(username, app_password),
-                timeout=timeout
-            )
+            # Stap 1: Pagina ophalen (eerst op de rate limiter wachten, dat telt niet mee in de timing)
+            with rate_limiter.acquired(website_url) as gewacht:
+                timings['wacht_ms'] += gewacht * 1000
+                step_start = time.perf_counter()
+                response = http_session.get(
+                    f"{api_base}/pages/{page_id}",
+                    auth=HTTPBasicAuth(username, app_password),
+                    timeout=timeout
+                )
+                timings['fetch_ms'] = round((time.perf_counter() - step_start) * 1000, 1)
             
             if response.status_code != 200:
                 return {
@@ -129,13 +347,17 @@ class BulkLinksManager:
             nieuwe_content = bestaande_content + "\n" + nieuwe_link
             
             # Stap 4: Update
-            update_response = requests.post(
-                f"{api_base}/pages/{page_id}",
-                auth=HTTPBasicAuth(username, app_password),
-                headers={"Content-Type": "application/json"},
-                json={"content": nieuwe_content},
-                timeout=timeout
-            )
+            with rate_limiter.acquired(website_url) as gewacht:
+                timings['wacht_ms'] += gewacht * 1000
+                step_start = time.perf_counter()
+                update_response = http_session.post(
+                    f"{api_base}/pages/{page_id}",
+                    auth=HTTPBasicAuth(username, app_password),
+                    headers={"Content-Type": "application/json"},
+                    json={"content": nieuwe_content},
+                    timeout=timeout
+                )
+                timings['update_ms'] = round((time.perf_counter() - step_start) * 1000, 1)
             
             if update_response.status_code == 200:
                 return {
@@ -171,103 +393,401 @@ class BulkLinksManager:
                 'timestamp': datetime.now().isoformat()
             }
     
-    def bulk_add_links(self, link_data, max_workers=5, delay_between_batches=2):
+    def bulk_add_links(self, link_data, max_workers=5, check_link=False):
         """
         Voeg links toe aan alle websites (parallel processing)
+        Met check_link=True wordt eerst gecontroleerd of de link zelf bereikbaar is
+        Het tempo per site en in totaal bewaakt de rate limiter (--rps, --site-rps)
         """
         if not self.websites:
             logger.error("❌ Geen websites geladen!")
             return False
         
+        if check_link:
+            check = link_checker.check(link_data['url'])
+            if not check['alive']:
+                logger.error("💀 Link %s is niet bereikbaar (%s), bulk operatie afgebroken",
+                             link_data['url'], check['error'] or f"HTTP {check['status_code']}")
+                return False
+        
         logger.info(f"🚀 Start bulk toevoegen van link: {link_data['anchor']}")
         logger.info(f"📊 Aantal websites: {len(self.websites)}")
         logger.info(f"⚡ Max workers: {max_workers}")
         
-        # Parallel processing met ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit alle taken
-            future_to_website = {
-                executor.submit(self.add_link_to_website, website, link_data): website 
-                for website in self.websites
-            }
+        # Resultaten worden direct weggeschreven, niet in het geheugen verzameld
+        self.stats = ReportStats()
+        self.report = StreamingReportWriter(self.report_prefix, self.report_formats)
+        
+        # Traagste sites eerst (volgens het latency profiel), zodat die niet aan het eind de run ophouden
+        websites = latency_profile.slowest_first(self.websites, lambda website: website['website_url'])
+        
+        # Parallel processing met ThreadPoolExecutor (hooguit 2x max_workers taken tegelijk ingediend)
+        with self.report, ThreadPoolExecutor(max_workers=max_workers) as executor:
+            taken = begrensd_uitvoeren(executor, lambda website: self.add_link_to_website(website, link_data),
+                                       websites, 2 * max_workers)
             
             # Verzamel resultaten
-            for future in as_completed(future_to_website):
-                website = future_to_website[future]
+            for website, future in taken:
                 try:
                     result = future.result()
-                    self.results.append(result)
+                    self.report.write(result)
+                    self.stats.add(result)
                     
                     # Log resultaat
-                    status_emoji = {
-                        'SUCCES': '✅',
-                        'BESTAAT_AL': 'ℹ️',
-                        'FOUT': '❌',
-                        'TIMEOUT': '⏰'
-                    }
-                    emoji = status_emoji.get(result['status'], '❓')
-                    logger.info(f"{emoji} {result['site_name']}: {result['message']}")
+                    emoji = STATUS_EMOJI.get(result['status'], '❓')
+                    logger.info("%s %s: %s", emoji, result['site_name'], result['message'])
                     
                 except Exception as e:
-                    logger.error(f"❌ Onverwachte fout bij {website.get('site_name', 'Onbekend')}: {e}")
+                    logger.error("❌ Onverwachte fout bij %s: %s", website.get('site_name', 'Onbekend'), e)
+        
+        latency_profile.flush()
+        return True
+    
+    async def add_link_to_website_async(self, client, website_config, link_data, timeout=30):
+        """
+        Async variant van add_link_to_website (zelfde resultaat, statussen en timings)
+        client is een httpx.AsyncClient uit de gedeelde AsyncClientPool
+        """
+        # wacht_ms: tijd op de rate limiter gewacht, geen latency van de site
+        timings = {'fetch_ms': None, 'update_ms': None, 'wacht_ms': 0.0}
+        start = time.perf_counter()
+        result = await self._add_link_to_website_async(client, website_config, link_data, timeout, timings)
+        wacht_ms = timings.pop('wacht_ms')
+        result.update(timings)
+        result['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self._registreer_latency(website_config, result, timings, wacht_ms)
+        return result
+    
+    async def _add_link_to_website_async(self, client, website_config, link_data, timeout, timings):
+        import httpx
+        
+        site_name = website_config.get('site_name', 'Onbekend')
+        website_url = website_config['website_url']
+        
+        def resultaat(status, message):
+            return {
+                'site_name': site_name,
+                'website_url': website_url,
+                'status': status,
+                'message': message,
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        try:
+            api_base = f"{website_url}/wp-json/wp/v2"
+            page_url = f"{api_base}/pages/{website_config['page_id']}"
+            auth = (website_config['username'], website_config['app_password'].replace(' ', ''))
+            
+            # Stap 1: Pagina ophalen (de rate limiter geldt ook hier; wachten telt niet mee in de timing)
+            timings['wacht_ms'] += await rate_limiter.wait_async(page_url) * 1000
+            step_start = time.perf_counter()
+            response = await client.get(page_url, auth=auth, timeout=timeout)
+            timings['fetch_ms'] = round((time.perf_counter() - step_start) * 1000, 1)
+            rate_limiter.observe(page_url, response.status_code, response.headers.get('Retry-After'))
+            if response.status_code != 200:
+                return resultaat('FOUT', f"Kan pagina niet ophalen: {response.status_code}")
+            
+            content = response.json().get("content", {})
+            bestaande_content = content.get("raw") or content.get("rendered", "")
             
-            # Kleine pauze tussen batches
-            if delay_between_batches > 0:
-                time.sleep(delay_between_batches)
+            # Stap 2: Check duplicaat
+            if link_data['url'] in bestaande_content:
+                return resultaat('BESTAAT_AL', 'Link bestaat al')
+            
+            # Stap 3 + 4: Link toevoegen en updaten
+            nieuwe_link = f'<a href="{link_data["url"]}">{link_data["anchor"]}</a><br>'
+            timings['wacht_ms'] += await rate_limiter.wait_async(page_url) * 1000
+            step_start = time.perf_counter()
+            update_response = await client.post(
+                page_url,
+                auth=auth,
+                json={"content": bestaande_content + "\n" + nieuwe_link},
+                timeout=timeout
+            )
+            timings['update_ms'] = round((time.perf_counter() - step_start) * 1000, 1)
+            rate_limiter.observe(page_url, update_response.status_code, update_response.headers.get('Retry-After'))
+            
+            if update_response.status_code == 200:
+                return resultaat('SUCCES', 'Link succesvol toegevoegd')
+            return resultaat('FOUT', f"Update gefaald: {update_response.status_code}")
+        
+        except httpx.TimeoutException:
+            return resultaat('TIMEOUT', f'Timeout na {timeout} seconden')
+        except Exception as e:
+            return resultaat('FOUT', str(e))
+    
+    async def bulk_add_links_async(self, link_data, max_concurrency=100, check_link=False):
+        """
+        Voeg links toe aan alle websites vanuit één thread met asyncio
+        Gedeelde async HTTP clients (AsyncClientPool) bedienen max_concurrency sites tegelijk,
+        zonder een OS thread per site; rapport en statussen zijn gelijk aan bulk_add_links
+        """
+        try:
+            import httpx
+        except ImportError:
+            logger.error("❌ httpx niet geïnstalleerd (pip install httpx), nodig voor --async")
+            return False
+        
+        if not self.websites:
+            logger.error("❌ Geen websites geladen!")
+            return False
         
+        if check_link:
+            check = await asyncio.to_thread(link_checker.check, link_data['url'])
+            if not check['alive']:
+                logger.error("💀 Link %s is niet bereikbaar (%s), bulk operatie afgebroken",
+                             link_data['url'], check['error'] or f"HTTP {check['status_code']}")
+                return False
+        
+        logger.info(f"🚀 Start bulk toevoegen van link (asyncio): {link_data['anchor']}")
+        logger.info(f"📊 Aantal websites: {len(self.websites)}")
+        logger.info(f"⚡ Max gelijktijdig: {max_concurrency}")
+        
+        self.stats = ReportStats()
+        self.report = StreamingReportWriter(self.report_prefix, self.report_formats)
+        websites = latency_profile.slowest_first(self.websites, lambda website: website['website_url'])
+        
+        # Een vast aantal workers haalt sites uit de wachtrij, in plaats van een coroutine per site
+        wachtrij = asyncio.Queue()
+        for website in websites:
+            wachtrij.put_nowait(website)
+        
+        async with AsyncClientPool(max_concurrency) as pool:
+            async def worker():
+                while True:
+                    try:
+                        website = wachtrij.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    try:
+                        client = pool.client_for(website['website_url'])
+                        result = await self.add_link_to_website_async(client, website, link_data)
+                        self.report.write(result)
+                        self.stats.add(result)
+                        emoji = STATUS_EMOJI.get(result['status'], '❓')
+                        logger.info("%s %s: %s", emoji, result['site_name'], result['message'])
+                    except Exception as e:
+                        logger.error("❌ Onverwachte fout bij %s: %s", website.get('site_name', 'Onbekend'), e)
+            
+            with self.report:
+                await asyncio.gather(*(worker() for _ in range(max(1, min(max_concurrency, len(websites))))))
+        
+        latency_profile.flush()
         return True
     
-    def generate_report(self, output_file='bulk_results.csv'):
-        """Genereer rapport van resultaten"""
-        if not self.results:
-            logger.warning("⚠️ Geen resultaten om te rapporteren")
-            return
+    def bulk_add_matrix(self, matrix_file, max_workers=5):
+        """
+        Voeg verschillende links toe aan (deels overlappende) sets websites
+        matrix_file is CSV of JSON met site, anchor en url per regel; per website wordt de
+        linkpagina één keer opgehaald en bijgewerkt, ook als www. en kaal domein beide voorkomen
+        """
+        if not self.websites:
+            logger.error("❌ Geen websites geladen!")
+            return False
         
-        # Statistieken
-        stats = {}
-        for result in self.results:
-            status = result['status']
-            stats[status] = stats.get(status, 0) + 1
+        try:
+            with open(matrix_file, 'r', encoding='utf-8') as file:
+                entries = parse_matrix(file.read())
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Kan matrix {matrix_file} niet lezen: {e}")
+            return False
         
-        # Rapport naar CSV
-        with open(output_file, 'w', newline='', encoding='utf-8') as file:
-            fieldnames = ['site_name', 'website_url', 'status', 'message', 'timestamp']
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(self.results)
+        configs = [
+            WebsiteConfig(
+                website_url=website['website_url'],
+                page_id=int(website['page_id']),
+                username=website['username'],
+                app_password=website['app_password'].replace(' ', ''),
+                site_name=website.get('site_name') or website['website_url']
+            )
+            for website in self.websites
+        ]
+        index = WebsiteIndex(configs)
+        logger.info(f"🧮 Start matrix: {len(entries)} links uit {matrix_file}")
+        
+        self.stats = ReportStats()
+        self.report = StreamingReportWriter(self.report_prefix, self.report_formats)
+        with self.report:
+            # De GET en update zelf zijn al in het latency profiel gemeten (utils.wordpress)
+            for result in run_link_matrix(entries, index.lookup, max_workers=max_workers):
+                config = index.lookup(result['website_url'])
+                if not result['success']:
+                    status = 'TIMEOUT' if result['error'] == ERROR_TIMEOUT else 'FOUT'
+                else:
+                    status = 'SUCCES' if result['link_added'] else 'BESTAAT_AL'
+                row = {
+                    'site_name': config.site_name if config else 'Onbekend',
+                    'website_url': result['website_url'],
+                    'status': status,
+                    'message': f"{result['anchor_text']} -> {result['link_url']}: {result['message']}",
+                    'timestamp': datetime.now().isoformat(),
+                    'fetch_ms': result['fetch_ms'],
+                    'update_ms': result['update_ms'],
+                    'duration_ms': result['duration_ms']
+                }
+                self.report.write(row)
+                self.stats.add(row)
+                logger.info("%s %s: %s", STATUS_EMOJI.get(status, '❓'), row['site_name'], row['message'])
+        
+        latency_profile.flush()
+        return True
+    
+    def get_website_links(self, website_config, timeout=30):
+        """Haal alle links op die op de linkpagina van een website staan"""
+        app_password = website_config['app_password'].replace(' ', '')
+        with rate_limiter.acquired(website_config['website_url']), Timer(website_config['website_url'], 'get') as timing:
+            response = http_session.get(
+                f"{website_config['website_url']}/wp-json/wp/v2/pages/{website_config['page_id']}",
+                auth=HTTPBasicAuth(website_config['username'], app_password),
+                timeout=timeout
+            )
+            timing.ok = response.status_code == 200
+        response.raise_for_status()
+        content = response.json().get("content", {})
+        return extract_links(content.get("raw") or content.get("rendered", ""))
+    
+    def check_links(self, max_workers=5):
+        """
+        Controleer of de links op alle websites nog bereikbaar zijn
+        Elke unieke link wordt maar één keer gecontroleerd, ook als hij op meerdere sites staat
+        """
+        if not self.websites:
+            logger.error("❌ Geen websites geladen!")
+            return False
+        
+        logger.info(f"🔎 Start controle van links op {len(self.websites)} websites")
+        self.stats = ReportStats()
+        self.report = StreamingReportWriter(self.report_prefix, self.report_formats)
+        
+        with self.report, ThreadPoolExecutor(max_workers=max_workers) as executor:
+            websites = latency_profile.slowest_first(self.websites, lambda website: website['website_url'])
+            links_per_website = []
+            for website, future in begrensd_uitvoeren(executor, self.get_website_links, websites, 2 * max_workers):
+                try:
+                    links_per_website.append((website, future.result()))
+                except Exception as e:
+                    result = {
+                        'site_name': website.get('site_name', 'Onbekend'),
+                        'website_url': website['website_url'],
+                        'status': 'FOUT',
+                        'message': f"Kan pagina niet ophalen: {e}",
+                        'timestamp': datetime.now().isoformat()
+                    }
+                    self.report.write(result)
+                    self.stats.add(result)
+                    logger.error("❌ %s: %s", result['site_name'], result['message'])
+            
+            all_links = [link for _, links in links_per_website for link in links]
+            checks = {check['url']: check for check in link_checker.check_many(all_links)}
+            
+            for website, links in links_per_website:
+                for link in links:
+                    check = checks[link]
+                    result = {
+                        'site_name': website.get('site_name', 'Onbekend'),
+                        'website_url': website['website_url'],
+                        'status': 'OK' if check['alive'] else 'DOOD',
+                        'message': f"{link} -> {check['error'] or 'HTTP ' + str(check['status_code'])}",
+                        'timestamp': check['checked_at']
+                    }
+                    self.report.write(result)
+                    self.stats.add(result)
+                    if not check['alive']:
+                        logger.warning("💀 %s: %s", result['site_name'], result['message'])
+        
+        latency_profile.flush()
+        logger.info(f"🔎 {len(checks)} unieke links gecontroleerd")
+        return True
+    
+    def generate_report(self):
+        """Log de samenvatting van de laatste run (resultaten staan al op schijf)"""
+        if not self.stats.total:
+            logger.warning("⚠️ Geen resultaten om te rapporteren")
+            return
         
         # Console rapport
         logger.info(f"\n📊 BULK OPERATIE VOLTOOID")
         logger.info(f"=" * 40)
-        logger.info(f"📁 Rapport opgeslagen: {output_file}")
+        for path in self.report.paths:
+            logger.info(f"📁 Rapport opgeslagen: {path}")
         logger.info(f"📈 Statistieken:")
-        for status, count in stats.items():
-            percentage = (count / len(self.results)) * 100
+        for status, count in self.stats.status_counts.items():
+            percentage = (count / self.stats.total) * 100
             logger.info(f"   {status}: {count} ({percentage:.1f}%)")
+        if self.stats.timed:
+            logger.info(f"⏱️ Duur per site: gem. {self.stats.mean_ms:.0f} ms, "
+                        f"min {self.stats.min_ms:.0f} ms, max {self.stats.max_ms:.0f} ms")
+        return self.stats.to_dict()
 
 def main():
     """Hoofdfunctie voor bulk links beheer"""
+    parser = argparse.ArgumentParser(description="Bulk links beheer voor WordPress websites")
+    parser.add_argument('--mode', choices=['add', 'check-links', 'matrix'], default='add',
+                        help="add: link toevoegen, check-links: bestaande links controleren, "
+                             "matrix: links uit --matrix toevoegen")
+    parser.add_argument('--config', default='websites_config.csv', help="CSV met website configuratie")
+    parser.add_argument('--url', default='https://bulk-test-link.nl', help="Link URL om toe te voegen")
+    parser.add_argument('--anchor', default='Bulk Test Link', help="Ankertekst van de link")
+    parser.add_argument('--workers', type=int, default=3, help="Aantal parallelle workers")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Voeg toe met asyncio en een gedeelde async HTTP client (vereist httpx); "
+                             "--workers is dan het aantal sites tegelijk, bijv. 200")
+    parser.add_argument('--matrix', help="CSV of JSON met site, anchor en url per link (voor --mode matrix)")
+    parser.add_argument('--check-link', action='store_true',
+                        help="Controleer eerst of de link bereikbaar is voordat hij wordt toegevoegd")
+    parser.add_argument('--rps', type=float, help="Max requests per seconde naar alle sites samen (0: onbeperkt)")
+    parser.add_argument('--site-rps', type=float, help="Max requests per seconde per site (0: onbeperkt)")
+    parser.add_argument('--site-burst', type=float, help="Aantal requests dat een site direct na elkaar mag krijgen")
+    parser.add_argument('--site-limits', help="Afwijkende limieten per site, bijv. 'streng.nl=0.5:1,snel.nl=10'")
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help="Profileer de run: sampling (folded stacks voor flame graphs) of cprofile (.pstats)")
+    parser.add_argument('--profile-memory', type=float, metavar='SECONDEN',
+                        help="Maak elke SECONDEN een tracemalloc snapshot (groei t.o.v. de eerste wordt gelogd)")
+    parser.add_argument('--profile-dir', help="Map voor profielen en snapshots (standaard PROFILE_DIR of de tmp map)")
+    args = parser.parse_args()
+    if args.use_async and importlib.util.find_spec('httpx') is None:
+        parser.error("--async vereist httpx (pip install httpx)")
+    
+    # Rate limits uit de omgeving (WP_RATE_LIMIT_*), per optie te overschrijven
+    if any(value is not None for value in (args.rps, args.site_rps, args.site_burst, args.site_limits)):
+        try:
+            site_limits = parse_site_limits(args.site_limits) if args.site_limits is not None else rate_limiter.site_limits
+        except ValueError as e:
+            parser.error(str(e))
+        rate_limiter.configure(
+            global_rps=args.rps if args.rps is not None else rate_limiter.global_rps,
+            global_burst=rate_limiter.global_burst,
+            site_rps=args.site_rps if args.site_rps is not None else rate_limiter.site_rps,
+            site_burst=args.site_burst if args.site_burst is not None else rate_limiter.site_burst,
+            site_limits=site_limits
+        )
     
     # Initialiseer manager
-    manager = BulkLinksManager('websites_config.csv')
+    manager = BulkLinksManager(args.config)
     
     # Laad configuratie
     if not manager.load_websites_config():
         logger.error("❌ Kan niet verder zonder geldige configuratie")
         return
     
-    # Link data
-    link_data = {
-        'url': 'https://bulk-test-link.nl',
-        'anchor': 'Bulk Test Link'
-    }
+    if args.mode == 'matrix' and not args.matrix:
+        parser.error("--mode matrix vereist --matrix")
     
-    # Voer bulk operatie uit
-    success = manager.bulk_add_links(
-        link_data=link_data,
-        max_workers=3,  # Niet te veel om servers niet te overbelasten
-        delay_between_batches=1
-    )
+    # Optioneel profileren (ook de worker threads) en geheugengroei volgen
+    profiel = (ProfileSession(args.profile, f"bulk-{args.mode}", args.profile_dir, follow_threads=True)
+               if args.profile else contextlib.nullcontext())
+    geheugen = MemoryTracker(args.profile_dir, name=f"bulk-{args.mode}-memory") if args.profile_memory else None
+    if geheugen:
+        geheugen.start_periodic(args.profile_memory)
+    try:
+        with profiel:
+            success = voer_uit(manager, args)
+    finally:
+        if geheugen:
+            laatste = geheugen.stop()
+            logger.info(f"🧠 Geheugen snapshots opgeslagen, laatste: {laatste['path']}")
+    if args.profile:
+        logger.info(f"🔬 Profiel opgeslagen: {profiel.path}")
     
     if success:
         # Genereer rapport
@@ -276,5 +796,31 @@ def main():
     else:
         logger.error("❌ Bulk operatie gefaald")
 
+def voer_uit(manager, args):
+    """Voer de gekozen modus uit; geeft True bij succes"""
+    if args.mode == 'check-links':
+        return manager.check_links(max_workers=args.workers)
+    elif args.mode == 'matrix':
+        return manager.bulk_add_matrix(args.matrix, max_workers=args.workers)
+    else:
+        # Link data
+        link_data = {
+            'url': args.url,
+            'anchor': args.anchor
+        }
+        
+        # Voer bulk operatie uit
+        if args.use_async:
+            return asyncio.run(manager.bulk_add_links_async(
+                link_data=link_data,
+                max_concurrency=args.workers,
+                check_link=args.check_link
+            ))
+        return manager.bulk_add_links(
+            link_data=link_data,
+            max_workers=args.workers,
+            check_link=args.check_link
+        )
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Script om WordPress_websites_API-overzicht.csv in te lezen en om te zetten naar websites_config.json
+Elke rij wordt eerst gecontroleerd (inloggegevens en page_id) voordat hij wordt opgenomen;
+alle geldige rijen worden in één keer weggeschreven, met een rapport per rij
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Gedeelde utilities staan in api/utils
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+from utils.site_import import import_overview, site_key, VALID
+
+STATUS_EMOJI = {
+    VALID: '✅',
+    'exists': 'ℹ️',
+    'duplicate': '🔁',
+    'missing_page_id': '⚠️',
+}
+
+
+def import_websites(csv_file, config_file, max_workers=8, update_existing=False, dry_run=False):
+    """Lees het overzicht, controleer alle rijen en voeg de geldige toe aan config_file"""
+    config_path = Path(config_file)
+    websites = []
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            websites = json.load(f)
+        print(f"✅ {len(websites)} bestaande websites geladen uit {config_path}")
+    configured = {}
+    for i, website in enumerate(websites):
+        configured.setdefault(site_key(website['website_url']), i)
+
+    print(f"🔎 Controleren van {csv_file} met {max_workers} parallelle workers...")
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        result = import_overview(
+            f,
+            is_configured=lambda url: site_key(url) in configured,
+            update_existing=update_existing,
+            max_workers=max_workers
+        )
+
+    for entry in result['report']:
+        emoji = STATUS_EMOJI.get(entry['status'], '❌')
+        print(f"   {emoji} regel {entry['line']}: {entry['website_url'] or '-'} - {entry['message']}")
+
+    # Rapport per rij
+    report_file = f"import_rapport_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    with open(report_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['line', 'website_url', 'site_name', 'page_id', 'status', 'message'])
+        writer.writeheader()
+        writer.writerows(result['report'])
+
+    print(f"\n📊 Statistieken:")
+    for status, count in sorted(result['counts'].items()):
+        print(f"   - {status}: {count}")
+    print(f"📁 Rapport opgeslagen: {report_file}")
+
+    if dry_run or not result['valid']:
+        print("ℹ️ Config niet aangepast" + (" (dry run)" if dry_run else " (geen geldige rijen)"))
+        return result
+
+    for website in result['valid']:
+        existing = configured.get(site_key(website['website_url']))
+        if existing is None:
+            websites.append(website)
+        else:
+            websites[existing] = {**websites[existing], **website}
+
+    # Eén schrijfactie; via een tijdelijk bestand zodat een halve config nooit op schijf staat
+    tmp_path = config_path.with_name(config_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(websites, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, config_path)
+    print(f"✅ {len(result['valid'])} websites toegevoegd of bijgewerkt in {config_path} ({len(websites)} totaal)")
+    print("💡 Draai create_base64_env.py om de Vercel environment variables bij te werken")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importeer WordPress_websites_API-overzicht.csv")
+    parser.add_argument('csv_file', nargs='?', default='WordPress_websites_API-overzicht.csv',
+                        help="Overzicht CSV (puntkomma gescheiden)")
+    parser.add_argument('--config', default='websites_config.json', help="JSON config om bij te werken")
+    parser.add_argument('--workers', type=int, default=8, help="Aantal parallelle controles")
+    parser.add_argument('--update-existing', action='store_true',
+                        help="Bestaande websites overschrijven met de gegevens uit de CSV")
+    parser.add_argument('--dry-run', action='store_true', help="Alleen controleren, config niet aanpassen")
+    args = parser.parse_args()
+
+    import_websites(args.csv_file, args.config, args.workers, args.update_existing, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Tests voor blog publicatie: categorieën/tags per site, publiceren op meerdere sites en verwijderen
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+import main  # noqa: E402
+from utils.blogs import TaxonomyCache, WordPressError, publish_to_sites  # noqa: E402
+
+
+class NepSite:
+    """Termen en posts van één WordPress site; sites onderscheiden zich op het pad"""
+
+    def __init__(self):
+        self.terms = {'categories': {1: 'Nieuws'}, 'tags': {5: 'Tips &amp; Tricks'}}
+        self.posts = {}
+        self.aangemaakt = []
+        self.verwijderd = []
+        self.race = False  # Een ander proces maakt de term net voor ons aan
+
+
+@pytest.fixture
+def wp_server():
+    sites = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, data, status=200, headers=None):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _route(self):
+            url = urlparse(self.path)
+            site_path, _, route = url.path.partition('/wp-json/wp/v2/')
+            return sites.setdefault(site_path, NepSite()), route, parse_qs(url.query)
+
+        def do_GET(self):
+            site, route, query = self._route()
+            if route in site.terms:
+                if 'include' in query:
+                    ids = [int(term_id) for term_id in query['include'][0].split(',')]
+                    return self._json([{'id': i, 'name': site.terms[route][i]} for i in ids if i in site.terms[route]])
+                zoek = query['search'][0].lower()
+                return self._json([{'id': i, 'name': name} for i, name in site.terms[route].items()
+                                   if zoek.replace('&', '&amp;') in name.lower()])
+            if route == 'posts':
+                return self._json(list(site.posts.values()), headers={'X-WP-TotalPages': '1'})
+            self._json({}, 404)
+
+        def do_POST(self):
+            site, route, _ = self._route()
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            if route in site.terms:
+                time.sleep(0.02)
+                with lock:
+                    if site.race:
+                        term_id = max(site.terms[route]) + 1
+                        site.terms[route][term_id] = body['name']
+                        return self._json({'code': 'term_exists', 'data': {'status': 400, 'term_id': term_id}}, 400)
+                    term_id = max(site.terms[route]) + 1
+                    site.terms[route][term_id] = body['name']
+                    site.aangemaakt.append(body['name'])
+                return self._json({'id': term_id, 'name': body['name']}, 201)
+            if route == 'posts':
+                post_id = 100 + len(site.posts)
+                site.posts[post_id] = {'id': post_id, 'title': {'rendered': body['title']}, 'slug': 'post',
+                                       'status': body['status'], 'date': '2026-01-01T00:00:00',
+                                       'modified': '2026-01-01T00:00:00', 'link': f'/p/{post_id}'}
+                return self._json(site.posts[post_id], 201)
+            self._json({}, 404)
+
+        def do_DELETE(self):
+            site, route, _ = self._route()
+            post_id = int(route.split('/')[1])
+            site.verwijderd.append(post_id)
+            self._json(site.posts.pop(post_id, {'id': post_id}))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", sites
+    server.shutdown()
+    server.server_close()
+
+
+def site(url):
+    return SimpleNamespace(website_url=url, username='admin', app_password='geheim', site_name=url)
+
+
+def test_bestaande_termen_worden_gevonden(wp_server):
+    base, sites = wp_server
+    cache = TaxonomyCache()
+    config = site(f"{base}/a")
+    assert cache.resolve(config, 'categories', ['nieuws', 'Nieuws ', '']) == [1]
+    assert cache.resolve(config, 'tags', ['Tips & Tricks']) == [5]
+    assert sites['/a'].aangemaakt == []
+    assert cache.names(config, 'tags', [5, 99]) == ['Tips & Tricks']
+
+
+def test_ontbrekende_term_een_keer_aangemaakt(wp_server):
+    base, sites = wp_server
+    cache = TaxonomyCache()
+    config = site(f"{base}/a")
+    resultaten = []
+    threads = [threading.Thread(target=lambda: resultaten.append(cache.resolve(config, 'categories', ['Reizen'])))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert sites['/a'].aangemaakt == ['Reizen']
+    assert len({tuple(result) for result in resultaten}) == 1
+    # Een andere site heeft zijn eigen IDs
+    cache.resolve(site(f"{base}/b"), 'categories', ['Reizen'])
+    assert sites['/b'].aangemaakt == ['Reizen']
+
+
+def test_term_tegelijk_elders_aangemaakt(wp_server):
+    base, sites = wp_server
+    cache = TaxonomyCache()
+    config = site(f"{base}/a")
+    cache.resolve(config, 'tags', ['Tips & Tricks'])
+    sites['/a'].race = True
+    assert cache.resolve(config, 'tags', ['Nieuw']) == [6]
+
+
+def test_publish_to_sites_volgorde_en_fouten():
+    configs = [site(f"https://site{i}.nl") for i in range(6)]
+    bezig = {'nu': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def publish(config):
+        with lock:
+            bezig['nu'] += 1
+            bezig['max'] = max(bezig['max'], bezig['nu'])
+        time.sleep(0.05)
+        with lock:
+            bezig['nu'] -= 1
+        if config.website_url.endswith('1.nl'):
+            raise WordPressError("Failed to create post: 403 Forbidden", 403)
+        if config.website_url.endswith('2.nl'):
+            raise KeyError('id')
+        return {'id': 1}
+
+    resultaten = publish_to_sites(configs, publish, max_workers=3)
+    assert [result['config'] for result in resultaten] == configs
+    assert [result['error'].status_code if result['error'] else None for result in resultaten] == [
+        None, 403, 500, None, None, None]
+    assert resultaten[0]['post'] == {'id': 1} and resultaten[1]['post'] is None
+    assert bezig['max'] == 3
+    assert publish_to_sites([], publish) == []
+
+
+@pytest.fixture
+def api(wp_server, monkeypatch):
+    base, sites = wp_server
+    # Twee sites op verschillende hosts (dezelfde server); /blogs/multi ziet één domein als één site
+    urls = {'a': f"{base}/a", 'b': f"{base.replace('127.0.0.1', 'localhost')}/b"}
+    configs = [main.WebsiteConfig(website_url=url, page_id=1, username='admin', app_password='x', site_name=naam)
+               for naam, url in urls.items()]
+    monkeypatch.setattr(main, 'websites_config', configs)
+    monkeypatch.setattr(main, 'blog_listing', main.BlogListing())
+    return TestClient(main.app), urls, sites
+
+
+def test_multi_een_post_per_site(api):
+    client, urls, sites = api
+    response = client.post('/blogs/multi', json={
+        'title': 'Hallo', 'content': '<p>x</p>', 'categories': ['Nieuws'],
+        'website_urls': [urls['a'], urls['b'], urls['a'], 'https://onbekend.nl']})
+    assert [(result['website_url'], result['success']) for result in response.json()] == [
+        (urls['a'], True), (urls['b'], True), ('https://onbekend.nl', False)]
+    assert len(sites['/a'].posts) == len(sites['/b'].posts) == 1
+
+
+def test_verwijderen_zonder_website_url(api):
+    """Oude clients sturen alleen het ID: de site komt uit de blog listing"""
+    client, urls, sites = api
+    client.post('/blogs', json={'title': 'Een', 'content': 'x', 'website_url': urls['a']})
+    client.post('/blogs', json={'title': 'Twee', 'content': 'x', 'website_url': urls['a']})
+    client.post('/blogs', json={'title': 'Drie', 'content': 'x', 'website_url': urls['b']})
+    # /a heeft posts 100 en 101, /b heeft 100
+
+    assert client.delete('/blogs/101').status_code == 200
+    assert sites['/a'].verwijderd == [101]
+    assert client.delete('/blogs/100').status_code == 409
+    assert client.delete('/blogs/555').status_code == 404
+    assert client.delete('/blogs/100', params={'website_url': urls['b']}).status_code == 200
+    assert sites['/b'].verwijderd == [100] and sites['/a'].verwijderd == [101]
+
+
+def test_verwijderen_van_een_post_nieuwer_dan_de_listing(api):
+    client, urls, sites = api
+    client.get('/blogs')
+    client.post('/blogs', json={'title': 'Nieuw', 'content': 'x', 'website_url': urls['b']})
+    assert client.delete('/blogs/100').status_code == 200
+    assert sites['/b'].verwijderd == [100]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests voor /add-bulk-links van de Vercel API (api/index.py)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+import index  # noqa: E402
+from utils.config import WebsiteConfig  # noqa: E402
+
+
+@pytest.fixture
+def wp_server():
+    """Eén link pagina per site; geschreven content wordt bewaard, elke GET duurt 0,3s"""
+    pages = {}
+    writes = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, data):
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _page(self):
+            return pages.setdefault(self.path.split('/wp-json')[0], {'content': {'raw': ''}, 'slug': 'links'})
+
+        def do_GET(self):
+            time.sleep(0.3)
+            self._json(self._page())
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            writes.append(self.path.split('/wp-json')[0])
+            self._page()['content'] = {'raw': body['content']}
+            self._json({'id': 1})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", pages, writes
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(wp_server):
+    base, _, _ = wp_server
+    vorige = index.config_store.current
+    index.config_store.replace([WebsiteConfig(f"{base}/site{i}", 1, 'admin', 'geheim', f"Site {i}") for i in range(3)])
+    yield TestClient(index.app)
+    index.config_store.replace(vorige.configs)
+
+
+def bulk(base, *sites, **extra):
+    return {'anchor_text': 'Anker', 'link_url': 'https://doel.nl/', **extra,
+            'website_urls': [site if '://' in site else f"{base}/{site}" for site in sites]}
+
+
+def test_alle_rijen_hebben_dezelfde_velden(client, wp_server):
+    base, pages, _ = wp_server
+    response = client.post('/add-bulk-links', json=bulk(base, 'site0', 'https://onbekend.nl', 'site1'))
+    assert response.status_code == 200
+    rows = response.json()
+    assert [(row['success'], row['error']) for row in rows] == [(True, None), (False, 'not_found'), (True, None)]
+    assert {frozenset(row) for row in rows} == {frozenset(index.LinkResponse.model_fields)}
+    assert rows[0]['fetch_ms'] is not None and rows[1]['fetch_ms'] is None
+    assert 'https://doel.nl/' in pages['/site0']['content']['raw']
+
+
+def test_vervolgaanroepen_met_dezelfde_idempotency_key(client, wp_server):
+    """De token bepaalt welke stap van de run herhaald wordt; een herhaling schrijft niets opnieuw"""
+    base, _, writes = wp_server
+    body = bulk(base, 'site0', 'site1', 'site2', time_budget_seconds=0.5)
+    headers = {'Idempotency-Key': 'run-1'}
+
+    eerste = client.post('/add-bulk-links', json=body, headers=headers)
+    token = eerste.headers['X-Continuation-Token']
+    assert [row['website_url'] for row in eerste.json()] == [f"{base}/site0"]
+    assert eerste.headers['X-Remaining-Sites'] == '2'
+
+    tweede = client.post('/add-bulk-links', json={**body, 'continuation_token': token}, headers=headers)
+    assert tweede.status_code == 200
+    assert [row['website_url'] for row in tweede.json()] == [f"{base}/site1"]
+
+    # Herhaling van de tweede aanroep (bijv. na een timeout bij de client)
+    herhaling = client.post('/add-bulk-links', json={**body, 'continuation_token': token}, headers=headers)
+    assert herhaling.headers['Idempotent-Replayed'] == 'true'
+    assert herhaling.json() == tweede.json()
+    assert herhaling.headers['X-Continuation-Token'] == tweede.headers['X-Continuation-Token']
+
+    derde = client.post('/add-bulk-links', json={**body, 'continuation_token': tweede.headers['X-Continuation-Token']},
+                        headers=headers)
+    assert [row['website_url'] for row in derde.json()] == [f"{base}/site2"]
+    assert 'X-Continuation-Token' not in derde.headers
+    assert sorted(writes) == ['/site0', '/site1', '/site2']
+
+
+def test_idempotency_key_met_ander_verzoek(client, wp_server):
+    base, _, writes = wp_server
+    headers = {'Idempotency-Key': 'run-2'}
+    assert client.post('/add-bulk-links', json=bulk(base, 'site0'), headers=headers).status_code == 200
+    anders = client.post('/add-bulk-links', json=bulk(base, 'site1'), headers=headers)
+    assert anders.status_code == 422
+    assert writes == ['/site0']
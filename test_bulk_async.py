@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests voor de asyncio modus van de bulk CLI (bulk_links_manager.py --async)
+"""
+
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def blm(tmp_path, monkeypatch):
+    # Het logbestand van de CLI komt in de map waar hij gestart wordt
+    monkeypatch.chdir(tmp_path)
+    import bulk_links_manager
+    monkeypatch.setattr(bulk_links_manager.latency_profile, 'path', str(tmp_path / 'latency.json'))
+    return bulk_links_manager
+
+
+@pytest.fixture
+def wp_server():
+    """Link pagina per site (op het pad); /kapot geeft 404, gebeurtenissen komen in volgorde in events"""
+    pages = {'/bestaat': '<a href="https://doel.nl">Doel</a>'}
+    events = []
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _json(self, data, status=200):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _site(self, methode):
+            site = self.path.split('/wp-json')[0]
+            with lock:
+                events.append((methode, site))
+            return site
+
+        def do_GET(self):
+            site = self._site('GET')
+            if site == '/kapot':
+                return self._json({}, 404)
+            self._json({'content': {'raw': pages.get(site, '')}})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            pages[self._site('POST')] = body['content']
+            self._json({'id': 1})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", pages, events
+    server.shutdown()
+    server.server_close()
+
+
+def manager_voor(blm, tmp_path, base, *paden):
+    manager = blm.BulkLinksManager(report_prefix=str(tmp_path / 'rapport'), report_formats=('jsonl',))
+    manager.websites = [{'website_url': f"{base}{pad}", 'page_id': '1', 'username': 'admin',
+                         'app_password': 'ab cd', 'site_name': pad.strip('/')} for pad in paden]
+    return manager
+
+
+def test_async_run_zelfde_statussen_als_threads(blm, wp_server, tmp_path):
+    base, pages, _ = wp_server
+    manager = manager_voor(blm, tmp_path, base, '/een', '/twee', '/bestaat', '/kapot')
+    link = {'url': 'https://doel.nl', 'anchor': 'Doel'}
+    assert asyncio.run(manager.bulk_add_links_async(link, max_concurrency=2)) is True
+
+    with open(manager.report.paths[0], encoding='utf-8') as file:
+        rijen = {rij['site_name']: rij for rij in map(json.loads, file)}
+    assert {naam: rij['status'] for naam, rij in rijen.items()} == {
+        'een': 'SUCCES', 'twee': 'SUCCES', 'bestaat': 'BESTAAT_AL', 'kapot': 'FOUT'}
+    assert rijen['een']['fetch_ms'] is not None and rijen['een']['update_ms'] is not None
+    assert 'https://doel.nl' in pages['/een']
+    assert manager.stats.status_counts['SUCCES'] == 2
+
+
+def test_rate_limiter_voor_elke_aanroep(blm, wp_server, tmp_path, monkeypatch):
+    """Elke GET en POST naar een site wacht eerst op wait_async voor die site"""
+    base, _, events = wp_server
+
+    async def wait_async(url):
+        events.append(('WACHT', url.split('/wp-json')[0][len(base):]))
+        return 0.0
+    monkeypatch.setattr(blm.rate_limiter, 'wait_async', wait_async)
+
+    manager = manager_voor(blm, tmp_path, base, '/een', '/twee', '/bestaat')
+    asyncio.run(manager.bulk_add_links_async({'url': 'https://doel.nl', 'anchor': 'Doel'}, max_concurrency=3))
+    per_site = {}
+    for soort, site in events:
+        per_site.setdefault(site, []).append(soort)
+    assert per_site == {'/een': ['WACHT', 'GET', 'WACHT', 'POST'], '/twee': ['WACHT', 'GET', 'WACHT', 'POST'],
+                        '/bestaat': ['WACHT', 'GET']}
+
+
+def test_async_zonder_httpx_stopt_de_cli(blm, monkeypatch, capsys):
+    monkeypatch.setitem(sys.modules, 'httpx', None)
+    monkeypatch.setattr(sys, 'argv', ['bulk_links_manager.py', '--async'])
+    with pytest.raises(SystemExit) as exit_info:
+        blm.main()
+    assert exit_info.value.code == 2
+    assert 'httpx' in capsys.readouterr().err
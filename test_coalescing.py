@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests voor het samenvoegen van link-toevoegingen per pagina (PageWriteCoalescer)
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils.coalescing import PageWriteCoalescer  # noqa: E402
+
+
+def test_sequentiele_aanroepen_wachten_niet():
+    """Zonder andere aanroep voor dezelfde pagina wordt direct geschreven, zonder venster"""
+    coalescer = PageWriteCoalescer(window_seconds=0.5)
+    flushes = []
+
+    def flush(items):
+        flushes.append(list(items))
+        return [item * 2 for item in items]
+
+    start = time.perf_counter()
+    assert [coalescer.submit('pagina', i, flush) for i in range(3)] == [0, 2, 4]
+    assert time.perf_counter() - start < 0.3
+    assert flushes == [[0], [1], [2]]
+
+
+def test_gelijktijdige_aanroepen_worden_een_flush():
+    """Aanroepen die binnenkomen terwijl een flush loopt, gaan samen in de volgende flush"""
+    coalescer = PageWriteCoalescer(window_seconds=0.05)
+    flushes = []
+    eerste_flush_bezig = threading.Event()
+    doorgaan = threading.Event()
+
+    def flush(items):
+        flushes.append(list(items))
+        if len(flushes) == 1:
+            eerste_flush_bezig.set()
+            doorgaan.wait(5)
+        return [f"ok-{item}" for item in items]
+
+    results = {}
+
+    def submit(item):
+        results[item] = coalescer.submit('pagina', item, flush)
+
+    eerste = threading.Thread(target=submit, args=(0,))
+    eerste.start()
+    assert eerste_flush_bezig.wait(5)
+    volgers = [threading.Thread(target=submit, args=(i,)) for i in range(1, 6)]
+    for thread in volgers:
+        thread.start()
+    time.sleep(0.1)
+    doorgaan.set()
+    for thread in [eerste] + volgers:
+        thread.join(5)
+
+    assert flushes[0] == [0]
+    assert len(flushes) == 2
+    assert sorted(flushes[1]) == [1, 2, 3, 4, 5]
+    assert results == {i: f"ok-{i}" for i in range(6)}
+
+
+def test_submit_many_en_fouten():
+    """Elke aanroeper krijgt zijn eigen deel van de resultaten; een fout gaat naar de hele batch"""
+    coalescer = PageWriteCoalescer(window_seconds=0)
+    assert coalescer.submit_many('a', [1, 2, 3], lambda items: [-item for item in items]) == [-1, -2, -3]
+
+    def kapot(items):
+        raise RuntimeError("WordPress onbereikbaar")
+
+    with pytest.raises(RuntimeError):
+        coalescer.submit('a', 1, kapot)
+    with pytest.raises(RuntimeError, match="results"):
+        coalescer.submit('a', 1, lambda items: [])
+    # Niets blijft hangen voor de key
+    assert coalescer.submit('a', 4, lambda items: items) == 4
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests voor de copy-on-write config (ConfigStore en ConfigSnapshot)
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils.config import WebsiteConfig  # noqa: E402
+from utils.config_snapshot import ConfigStore, replace_config, with_continuation_pages  # noqa: E402
+
+
+def website(url, page_id=1, **extra):
+    return WebsiteConfig(url, page_id, 'admin', 'geheim', url.split('//')[1], **extra)
+
+
+@pytest.fixture
+def store():
+    store = ConfigStore()
+    store.replace([website('https://a.nl'), website('https://b.nl')], loaded_at='start', source='test')
+    return store
+
+
+def test_replace_publiceert_een_nieuwe_versie(store):
+    eerste = store.current
+    assert (eerste.version, eerste.loaded_at, eerste.source, len(eerste)) == (1, 'start', 'test', 2)
+    tweede = store.replace([website('https://c.nl')])
+    assert store.current is tweede
+    assert (tweede.version, tweede.loaded_at, tweede.source) == (2, 'start', 'test')
+    # De oude snapshot blijft ongewijzigd voor wie hem nog gebruikt
+    assert [config.website_url for config in eerste] == ['https://a.nl', 'https://b.nl']
+    assert tweede.lookup('https://c.nl').website_url == 'https://c.nl'
+    assert tweede.lookup('https://a.nl') is None
+
+
+def test_update_none_laat_alles_staan(store):
+    huidige = store.current
+    assert store.update(lambda snapshot: None) is huidige
+
+
+def test_update_fout_breekt_af(store):
+    huidige = store.current
+
+    def kapot(snapshot):
+        raise ValueError('ongeldige wijziging')
+
+    with pytest.raises(ValueError):
+        store.update(kapot)
+    assert store.current is huidige
+
+
+def test_gelijktijdige_updates_gaan_niet_verloren(store):
+    def voeg_toe(i):
+        store.update(lambda snapshot: tuple(snapshot) + (website(f'https://site{i}.nl'),))
+
+    threads = [threading.Thread(target=voeg_toe, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(store.current) == 22
+    assert store.current.version == 21
+
+
+def test_refresh_zonder_gedeelde_config(store):
+    assert store.refresh() is store.current
+
+
+def test_replace_config_maakt_een_kopie():
+    origineel = website('https://a.nl')
+    kopie = replace_config(origineel, page_id=9)
+    assert (origineel.page_id, kopie.page_id) == (1, 9)
+    assert kopie.website_url == 'https://a.nl'
+
+
+def test_continuation_pages_copy_on_write(store):
+    snapshot = store.current
+    config = snapshot.lookup('https://a.nl')
+    nieuw = store.update(lambda current: with_continuation_pages(current, config, [11, 12]))
+    assert nieuw.lookup('https://a.nl').continuation_page_ids == [11, 12]
+    assert config.continuation_page_ids == []
+    assert nieuw.lookup('https://b.nl') is snapshot.lookup('https://b.nl')
+
+    # Pagina's die er al zijn: geen nieuwe versie
+    assert store.update(lambda current: with_continuation_pages(current, config, [12])) is nieuw
+    # Een ander proces voegde al 11 en 12 toe; 13 komt erachter
+    assert with_continuation_pages(nieuw, config, [12, 13])[0].continuation_page_ids == [11, 12, 13]
+
+
+def test_listeners_zien_elke_nieuwe_snapshot(store, monkeypatch):
+    from utils import http_client
+    gestart = []
+    monkeypatch.setattr(http_client, 'start_prewarm', lambda urls: gestart.append(list(urls)))
+    gezien = []
+    store.add_listener(lambda vorige, snapshot: gezien.append((vorige.version, snapshot.version)))
+    store.add_listener(http_client.prewarm_new_sites)
+    store.add_listener(lambda vorige, snapshot: 1 / 0)  # Een kapotte listener houdt niets tegen
+
+    store.replace([website('https://a.nl'), website('https://www.c.nl/blog')])
+    store.update(lambda snapshot: list(snapshot) + [website('https://c.nl/blog')])
+    store.update(lambda snapshot: None)
+    assert gezien == [(1, 2), (2, 3)]
+    # Alleen nieuwe origins worden opgewarmd
+    assert gestart == [['https://www.c.nl'], ['https://c.nl']]
+    assert len(store.current) == 3
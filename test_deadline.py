@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests voor de tijdsbudgetten en continuation tokens van bulk runs
+"""
+
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils import deadline  # noqa: E402
+from utils.deadline import (Deadline, InvalidContinuationToken, decode_continuation,  # noqa: E402
+                            encode_continuation, request_digest)
+
+
+def test_token_heen_en_terug():
+    digest = request_digest("https://a.nl", "Anker", ["site1", "site2"])
+    token = encode_continuation(42, digest)
+    assert decode_continuation(token, digest) == 42
+    # Veilig in een header en een URL
+    assert all(char.isalnum() or char in "-_." for char in token)
+
+
+def test_token_voor_ander_request_geweigerd():
+    token = encode_continuation(5, request_digest("a"))
+    with pytest.raises(InvalidContinuationToken, match="does not belong"):
+        decode_continuation(token, request_digest("b"))
+
+
+def test_aangepaste_offset_geweigerd():
+    """Een token met een zelf opgehoogde offset wordt niet geaccepteerd"""
+    digest = request_digest("a")
+    payload, signature = encode_continuation(5, digest).split(".")
+    data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    data["offset"] = 500
+    vervalst = base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    with pytest.raises(InvalidContinuationToken):
+        decode_continuation(f"{vervalst}.{signature}", digest)
+
+
+@pytest.mark.parametrize("token", ["", "onzin", "a.b.c", "e30.", "!!!.???"])
+def test_kapotte_tokens_geweigerd(token):
+    with pytest.raises(InvalidContinuationToken):
+        decode_continuation(token, request_digest("a"))
+
+
+def test_token_met_ander_geheim_geweigerd(monkeypatch):
+    digest = request_digest("a")
+    token = encode_continuation(3, digest)
+    monkeypatch.setattr(deadline, "CONTINUATION_SECRET", "ander-geheim")
+    with pytest.raises(InvalidContinuationToken):
+        decode_continuation(token, digest)
+
+
+def test_deadline_start_alleen_als_de_traagste_nog_past(monkeypatch):
+    nu = [100.0]
+    monkeypatch.setattr(deadline.time, "monotonic", lambda: nu[0])
+    budget = Deadline(10, initial_estimate=2)
+    assert budget.can_start()
+    nu[0] += 5
+    budget.record(4)
+    assert budget.remaining() == pytest.approx(5)
+    assert budget.can_start()
+    nu[0] += 1.5
+    assert not budget.can_start()
+    assert Deadline(None).can_start()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests voor de gedeelde HTTP sessies: de DNS cache geldt alleen voor WordPress verkeer
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+import urllib3.util.connection
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils import http_client  # noqa: E402
+from utils.http_client import dns_cache, external_session, http_session  # noqa: E402
+
+NEP_HOST = 'nep-wordpress.invalid'
+
+
+@pytest.fixture
+def server():
+    hosts = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hosts.append(self.headers['Host'])
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1], hosts
+    server.shutdown()
+    server.server_close()
+
+
+def test_dns_cache_alleen_voor_de_wordpress_sessie(server):
+    port, hosts = server
+    # Een naam die niet bestaat, maar wel in de cache staat
+    dns_cache._entries[(NEP_HOST, port)] = (float('inf'), ['127.0.0.1'])
+    try:
+        response = http_session.get(f"http://{NEP_HOST}:{port}/wp-json/", timeout=5)
+        assert response.text == 'ok'
+        assert hosts == [f"{NEP_HOST}:{port}"]
+        with pytest.raises(requests.exceptions.ConnectionError):
+            external_session.get(f"http://{NEP_HOST}:{port}/", timeout=5)
+    finally:
+        dns_cache.invalidate(NEP_HOST, port)
+    # urllib3 zelf is niet aangepast
+    assert urllib3.util.connection.create_connection.__module__ == 'urllib3.util.connection'
+
+
+def _alleen_127_0_0_1(new_conn):
+    def wrapper(self):
+        if self._dns_host != '127.0.0.1':
+            raise urllib3.exceptions.NewConnectionError(self, 'geweigerd')
+        return new_conn(self)
+    return wrapper
+
+
+def test_volgend_adres_als_het_eerste_faalt(server, monkeypatch):
+    port, hosts = server
+    opgezocht = []
+    monkeypatch.setattr(dns_cache, 'resolve', lambda host, p: opgezocht.append(host) or ['127.0.0.2', '127.0.0.1'])
+    monkeypatch.setattr(http_client.HTTPConnection, '_new_conn', _alleen_127_0_0_1(http_client.HTTPConnection._new_conn))
+    assert http_session.get(f"http://{NEP_HOST}:{port}/", timeout=5).text == 'ok'
+    assert opgezocht == [NEP_HOST]
+
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests voor de Idempotency-Key store achter /add-link en /add-bulk-links
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils import idempotency  # noqa: E402
+from utils.idempotency import IdempotencyKeyConflict, IdempotencyStore, request_fingerprint  # noqa: E402
+
+
+class Afgewezen(Exception):
+    """Staat voor een HTTPException: hoort bij de uitkomst en wordt herhaald"""
+
+
+def test_herhaling_krijgt_dezelfde_uitkomst():
+    store = IdempotencyStore()
+    aanroepen = []
+
+    async def operatie():
+        aanroepen.append(1)
+        return {'success': True, 'post': len(aanroepen)}
+
+    async def scenario():
+        eerste = await store.execute('k', 'f', operatie)
+        tweede = await store.execute('k', 'f', operatie)
+        return eerste, tweede
+
+    eerste, tweede = asyncio.run(scenario())
+    assert eerste == ({'success': True, 'post': 1}, False)
+    assert tweede == ({'success': True, 'post': 1}, True)
+    assert len(aanroepen) == 1
+
+
+def test_gelijktijdige_herhalingen_wachten_op_de_eerste_poging():
+    store = IdempotencyStore()
+    aanroepen = []
+
+    async def operatie():
+        aanroepen.append(1)
+        await asyncio.sleep(0.05)
+        return 'klaar'
+
+    async def scenario():
+        return await asyncio.gather(*(store.execute('k', 'f', operatie) for _ in range(5)))
+
+    uitkomsten = asyncio.run(scenario())
+    assert [result for result, _ in uitkomsten] == ['klaar'] * 5
+    assert sorted(replayed for _, replayed in uitkomsten) == [False, True, True, True, True]
+    assert len(aanroepen) == 1
+
+
+def test_andere_payload_met_dezelfde_key():
+    store = IdempotencyStore()
+
+    async def operatie():
+        return 1
+
+    async def scenario():
+        await store.execute('k', request_fingerprint('{"a": 1}'), operatie)
+        await store.execute('k', request_fingerprint('{"a": 2}'), operatie)
+
+    with pytest.raises(IdempotencyKeyConflict):
+        asyncio.run(scenario())
+
+
+def test_fouten_wel_of_niet_herhaald():
+    """replay_exceptions horen bij de uitkomst; andere fouten geven de key vrij voor een nieuwe poging"""
+    store = IdempotencyStore(replay_exceptions=(Afgewezen,))
+    pogingen = []
+
+    async def afgewezen():
+        pogingen.append('afgewezen')
+        raise Afgewezen('404')
+
+    async def onderbroken():
+        pogingen.append('onderbroken')
+        raise ConnectionError('weg')
+
+    async def gelukt():
+        pogingen.append('gelukt')
+        return 'ok'
+
+    async def scenario():
+        with pytest.raises(Afgewezen):
+            await store.execute('a', 'f', afgewezen)
+        with pytest.raises(Afgewezen):
+            await store.execute('a', 'f', gelukt)
+        with pytest.raises(ConnectionError):
+            await store.execute('b', 'f', onderbroken)
+        return await store.execute('b', 'f', gelukt)
+
+    assert asyncio.run(scenario()) == ('ok', False)
+    assert pogingen == ['afgewezen', 'onderbroken', 'gelukt']
+
+
+def test_ttl_en_maximum(monkeypatch):
+    nu = [100.0]
+    monkeypatch.setattr(idempotency.time, 'monotonic', lambda: nu[0])
+    store = IdempotencyStore(ttl_seconds=10, max_entries=2)
+
+    async def operatie():
+        return nu[0]
+
+    async def scenario():
+        await store.execute('a', 'f', operatie)
+        nu[0] += 11
+        # Verlopen: opnieuw uitgevoerd
+        assert await store.execute('a', 'f', operatie) == (111.0, False)
+        await store.execute('b', 'f', operatie)
+        await store.execute('c', 'f', operatie)
+        # Boven het maximum valt de oudste af
+        assert await store.execute('a', 'f', operatie) == (111.0, False)
+        assert await store.execute('c', 'f', operatie) == (111.0, True)
+
+    asyncio.run(scenario())
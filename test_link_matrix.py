@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests voor de links x sites matrix: inlezen, groeperen per site en uitvoeren
+"""
+
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils import link_matrix  # noqa: E402
+from utils.link_matrix import parse_matrix, plan_link_matrix, run_link_matrix  # noqa: E402
+from utils.wordpress import ERROR_NOT_FOUND, ERROR_OTHER, LinkResponse  # noqa: E402
+
+
+def test_parse_json_en_csv():
+    verwacht = [{'website_url': 'https://a.nl', 'anchor_text': 'A', 'link_url': 'https://x.nl'}]
+    assert parse_matrix('[{"site": "https://a.nl", "anchor": "A", "url": "https://x.nl"}]') == verwacht
+    assert parse_matrix('{"entries": [{"website_url": "https://a.nl", "anchor_text": "A", '
+                        '"link_url": "https://x.nl"}]}') == verwacht
+    assert parse_matrix('\ufeffWebsite;Anchor;Link\nhttps://a.nl; A ;https://x.nl\n;;\n') == verwacht
+    assert parse_matrix('site\tanchor\turl\nhttps://a.nl\tA\thttps://x.nl\n') == verwacht
+
+
+def test_parse_noemt_de_foute_rij():
+    with pytest.raises(ValueError, match="Row 3: missing link_url"):
+        parse_matrix('site,anchor,url\nhttps://a.nl,A,https://x.nl\nhttps://b.nl,B,\n')
+    with pytest.raises(ValueError, match="Entry 1: missing anchor_text"):
+        parse_matrix('[{"site": "https://a.nl", "url": "https://x.nl"}]')
+
+
+def site(url):
+    return SimpleNamespace(website_url=url, page_id=1)
+
+
+SITES = {'a.nl': site('https://a.nl'), 'b.nl': site('https://b.nl')}
+
+
+def resolve(url):
+    return SITES.get(url.split('//')[-1].replace('www.', '').rstrip('/'))
+
+
+def triple(url, link):
+    return {'website_url': url, 'anchor_text': f"Anker {link}", 'link_url': link}
+
+
+def test_plan_groepeert_per_site():
+    entries = [triple('https://a.nl', 'l1'), triple('https://onbekend.nl', 'l2'),
+               triple('https://www.a.nl/', 'l3'), triple('https://b.nl', 'l4')]
+    groups, unresolved = plan_link_matrix(entries, resolve)
+    assert unresolved == [1]
+    assert [(group['config'].website_url, group['positions']) for group in groups] == [
+        ('https://a.nl', [0, 2]), ('https://b.nl', [3])]
+    assert groups[0]['links'] == [('Anker l1', 'l1'), ('Anker l3', 'l3')]
+
+
+def test_run_een_schrijfactie_per_site_in_invoervolgorde(monkeypatch):
+    schrijfacties = []
+    lock = threading.Lock()
+
+    def add_links_to_page(config, links, page_id, timeout):
+        with lock:
+            schrijfacties.append((config.website_url, len(links)))
+        return [LinkResponse(True, "Link successfully added", config.website_url, page_id or 1, True,
+                             fetch_ms=1.0, update_ms=2.0) for _ in links]
+    monkeypatch.setattr(link_matrix, 'add_links_to_page', add_links_to_page)
+
+    entries = [triple('https://a.nl', 'l1'), triple('https://onbekend.nl', 'l2'),
+               triple('https://www.a.nl', 'l3'), triple('https://b.nl', 'l4')]
+    results = run_link_matrix(entries, resolve)
+    assert sorted(schrijfacties) == [('https://a.nl', 2), ('https://b.nl', 1)]
+    assert [result['link_url'] for result in results] == ['l1', 'l2', 'l3', 'l4']
+    assert [result['success'] for result in results] == [True, False, True, True]
+    assert results[2]['resolved_url'] == 'https://a.nl' and results[2]['website_url'] == 'https://www.a.nl'
+    assert results[0]['fetch_ms'] == 1.0 and results[0]['duration_ms'] is not None
+
+    # Alle rijen hebben dezelfde velden, ook die zonder configuratie
+    assert results[1]['error'] == ERROR_NOT_FOUND
+    assert {frozenset(result) for result in results} == {frozenset(results[0])}
+
+
+def test_mislukte_schrijfactie_geeft_foutrijen(monkeypatch):
+    def add_links_to_page(config, links, page_id, timeout):
+        if config.website_url == 'https://a.nl':
+            raise RuntimeError('kapot')
+        # Een antwoord te weinig: die rij mag niet leeg blijven
+        return [LinkResponse(True, "Link successfully added", config.website_url, 1, True)][:len(links) - 1]
+    monkeypatch.setattr(link_matrix, 'add_links_to_page', add_links_to_page)
+
+    entries = [triple('https://a.nl', 'l1'), triple('https://b.nl', 'l2'), triple('https://b.nl', 'l3')]
+    results = run_link_matrix(entries, resolve, max_workers=1)
+    assert [(result['success'], result['error']) for result in results] == [
+        (False, ERROR_OTHER), (True, None), (False, ERROR_OTHER)]
+    assert 'kapot' in results[0]['message']
+    assert {frozenset(result) for result in results} == {frozenset(results[1])}
+
+
+def test_begrensde_wachtrij_bij_veel_sites(monkeypatch):
+    """Met veel meer sites dan workers komt toch elke rij terug"""
+    sites = {f'site{i}.nl': site(f'https://site{i}.nl') for i in range(40)}
+    monkeypatch.setattr(link_matrix, 'add_links_to_page', lambda config, links, page_id, timeout: [
+        LinkResponse(True, "ok", config.website_url, 1, True) for _ in links])
+    entries = [triple(f'https://site{i}.nl', 'l') for i in range(40)]
+    results = run_link_matrix(entries, lambda url: sites.get(url.split('//')[1]), max_workers=3)
+    assert [result['website_url'] for result in results] == [entry['website_url'] for entry in entries]
+    assert all(result['success'] for result in results)
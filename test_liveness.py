@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests voor de liveness checks van link targets
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils.liveness import LivenessChecker, extract_links  # noqa: E402
+from utils.rate_limit import rate_limiter  # noqa: E402
+
+
+@pytest.fixture
+def doel_server():
+    gelijktijdig = {'nu': 0, 'max': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _antwoord(self):
+            with lock:
+                gelijktijdig['nu'] += 1
+                gelijktijdig['max'] = max(gelijktijdig['max'], gelijktijdig['nu'])
+            time.sleep(0.05)
+            with lock:
+                gelijktijdig['nu'] -= 1
+            status = 429 if self.path.startswith('/druk') else 404 if self.path.startswith('/weg') else 200
+            self.send_response(status)
+            self.send_header('Retry-After', '60')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        do_HEAD = _antwoord
+        do_GET = _antwoord
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", gelijktijdig
+    server.shutdown()
+    server.server_close()
+
+
+def test_extract_links():
+    html = '<a href="https://a.nl">A</a> <a class="x" href=\'http://b.nl/p\'>B</a> <a href="/relatief">C</a>' \
+           '<a href="https://a.nl">A</a>'
+    assert extract_links(html) == ["https://a.nl", "http://b.nl/p"]
+
+
+def test_levend_dood_en_cache(doel_server):
+    base, _ = doel_server
+    checker = LivenessChecker()
+    assert checker.check(f"{base}/ok")['alive']
+    dood = checker.check(f"{base}/weg")
+    assert not dood['alive'] and dood['status_code'] == 404
+    assert checker.check(f"{base}/ok")['cached']
+
+
+def test_link_checks_gebruiken_de_wordpress_limiter_niet(doel_server):
+    """Een 429 van een link target pauzeert geen host in de WordPress limiter en kost geen tokens"""
+    base, _ = doel_server
+    rate_limiter.configure(site_rps=1, site_burst=1)
+    try:
+        checker = LivenessChecker()
+        start = time.perf_counter()
+        results = checker.check_many([f"{base}/druk/{i}" for i in range(4)])
+        assert [result['status_code'] for result in results] == [429] * 4
+        # Met de WordPress limiter (1 req/s per site) had dit seconden geduurd
+        assert time.perf_counter() - start < 1.5
+        stats = rate_limiter.stats()
+        assert stats['throttled_requests'] == 0 and stats['site_pauses'] == 0
+    finally:
+        rate_limiter.configure()
+
+
+def test_limiet_per_host(doel_server):
+    base, gelijktijdig = doel_server
+    checker = LivenessChecker(per_host_limit=2, max_workers=8)
+    checker.check_many([f"{base}/ok/{i}" for i in range(8)])
+    assert gelijktijdig['max'] <= 2
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests voor media uploads: deduplicatie op content hash en het ophalen van afbeeldingen
+"""
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils import media  # noqa: E402
+from utils.blogs import WordPressError  # noqa: E402
+from utils.media import MediaLibrary, MediaSources, check_public_url, content_disposition  # noqa: E402
+
+AFBEELDING = b'\x89PNG\r\n\x1a\n' + b'pixel' * 1000
+
+
+@pytest.fixture
+def wp_server():
+    """Een WordPress site die ook afbeeldingen serveert; uploads worden geteld"""
+    uploads = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, status, data):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith('/wp-json/wp/v2/media'):
+                self._json(200, [])
+            elif self.path.startswith('/omleiding'):
+                self.send_response(302)
+                self.send_header('Location', self.path.split('?naar=', 1)[1])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(AFBEELDING)))
+                self.end_headers()
+                self.wfile.write(AFBEELDING)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.path.startswith('/wp-json/wp/v2/media?') or self.path == '/wp-json/wp/v2/media':
+                uploads.append({'disposition': self.headers['Content-Disposition'], 'size': len(body)})
+                self._json(201, {'id': len(uploads), 'source_url': f"/uploads/{len(uploads)}.png"})
+            else:
+                self._json(200, {'id': 1})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", uploads
+    server.shutdown()
+    server.server_close()
+
+
+def site(url):
+    return SimpleNamespace(website_url=url, username='admin', app_password='geheim')
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/a.png", "http://localhost/a.png", "http://10.0.0.5/a.png", "http://192.168.1.1/a.png",
+    "http://169.254.169.254/latest/meta-data/", "http://[::1]/a.png", "http://0.0.0.0/a.png",
+    "file:///etc/passwd", "ftp://93.184.216.34/a.png", "gopher://93.184.216.34/",
+])
+def test_alleen_publieke_http_adressen(url):
+    with pytest.raises(WordPressError) as fout:
+        check_public_url(url)
+    assert fout.value.status_code == 400
+
+
+def test_publiek_adres_toegestaan():
+    check_public_url("https://93.184.216.34/a.png")
+
+
+def test_prive_url_niet_opgehaald(tmp_path, wp_server):
+    base, _ = wp_server
+    sources = MediaSources(str(tmp_path))
+    with pytest.raises(WordPressError, match="private or local"):
+        sources.get(f"{base}/foto.png")
+    assert not list(tmp_path.iterdir())
+
+
+def test_omleiding_wordt_ook_gecontroleerd(tmp_path, wp_server, monkeypatch):
+    """Een toegestane URL die doorstuurt naar een intern adres wordt geweigerd"""
+    base, _ = wp_server
+    gecontroleerd = []
+
+    def controle(url):
+        gecontroleerd.append(url)
+        if urlparse(url).path.startswith('/intern'):
+            raise WordPressError(f"Image {url} points to a private or local address", 400)
+    monkeypatch.setattr(media, 'check_public_url', controle)
+
+    sources = MediaSources(str(tmp_path))
+    with pytest.raises(WordPressError, match="private or local"):
+        sources.get(f"{base}/omleiding?naar={base}/intern/meta-data")
+    assert gecontroleerd == [f"{base}/omleiding?naar={base}/intern/meta-data", f"{base}/intern/meta-data"]
+    # Zonder omleiding naar intern gaat het goed
+    assert os.path.getsize(sources.get(f"{base}/omleiding?naar=/foto.png").path) == len(AFBEELDING)
+
+    sources = MediaSources(str(tmp_path), allow_private=True)
+    with pytest.raises(WordPressError, match="http"):
+        sources.get(f"{base}/omleiding?naar=file:///etc/passwd")
+
+
+def test_een_upload_per_site_en_hash(tmp_path, wp_server):
+    base, uploads = wp_server
+    sources = MediaSources(str(tmp_path / 'cache'), allow_private=True)
+    library = MediaLibrary(str(tmp_path / 'media_map.json'), sources)
+
+    eerste = library.ensure(site(base), f"{base}/foto.png")
+    # Dezelfde bytes onder een andere URL zijn hetzelfde bestand
+    assert library.ensure(site(base + '/'), f"{base}/kopie.png") == eerste
+    assert len(uploads) == 1 and uploads[0]['size'] == len(AFBEELDING)
+
+    # Een nieuwe library leest de map van schijf en uploadt niet opnieuw
+    opnieuw = MediaLibrary(str(tmp_path / 'media_map.json'), sources)
+    assert opnieuw.ensure(site(base), f"{base}/foto.png") == eerste
+    assert len(uploads) == 1
+
+    # Een andere site krijgt zijn eigen upload
+    andere = base.replace('127.0.0.1', 'localhost')
+    assert library.ensure(site(andere), f"{base}/foto.png")['id'] == 2
+
+
+def test_gelijktijdige_ensure_uploadt_een_keer(tmp_path, wp_server):
+    base, uploads = wp_server
+    library = MediaLibrary(None, MediaSources(str(tmp_path), allow_private=True))
+    threads = [threading.Thread(target=library.ensure, args=(site(base), f"{base}/foto.png")) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(uploads) == 1
+
+
+def test_content_disposition():
+    assert content_disposition("foto.png") == "attachment; filename=\"foto.png\"; filename*=UTF-8''foto.png"
+    kwaadaardig = content_disposition('a"; filename="x.php\r\nX-Extra: 1.png')
+    assert '\r' not in kwaadaardig and '\n' not in kwaadaardig
+    assert kwaadaardig.count('"') == 2
+    assert content_disposition("één.png").endswith("filename*=UTF-8''%C3%A9%C3%A9n.png")
+    assert 'filename="n.png"' in content_disposition("één.png")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests voor het automatisch vinden van de link pagina (page_id) per site
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils.page_discovery import PageListingCache, discover_page_ids, match_link_page, page_listings  # noqa: E402
+
+
+def pagina(page_id, slug, title='', parent=0):
+    return {'id': page_id, 'slug': slug, 'title': title or slug, 'parent': parent}
+
+
+def test_match_volgorde_en_vervolgpaginas():
+    pages = [
+        pagina(1, 'home'),
+        pagina(2, 'partners'),
+        pagina(3, 'links'),
+        pagina(4, 'links-2', parent=3),
+        pagina(5, 'overig', title='Handige links'),
+    ]
+    gevonden = match_link_page(pages, ['links', 'partners'], re.compile('links', re.IGNORECASE))
+    # Slugs in volgorde van voorkeur, daarna titels; de kindpagina van 'links' valt weg
+    assert [page['id'] for page in gevonden] == [3, 2, 5]
+
+
+@pytest.fixture
+def wp_server():
+    """Sites onderscheiden zich op het pad; /veel heeft 150 pagina's verdeeld over twee listings"""
+    listings = []
+    sites = {
+        '/een': [pagina(10, 'home'), pagina(11, 'links')],
+        '/dubbel': [pagina(20, 'overig', title='Links A'), pagina(21, 'anders', title='Links B')],
+        '/geen': [pagina(30, 'home')],
+        '/veel': [pagina(i, f'pagina-{i}') for i in range(1, 150)] + [pagina(150, 'partners')],
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            site = url.path.split('/wp-json')[0]
+            if site not in sites:
+                self.send_response(401)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            listings.append(site)
+            query = parse_qs(url.query)
+            per_page, nummer = int(query['per_page'][0]), int(query['page'][0])
+            pages = sites[site]
+            deel = pages[(nummer - 1) * per_page:nummer * per_page]
+            body = json.dumps([{'id': page['id'], 'slug': page['slug'], 'title': {'rendered': page['title']},
+                                'parent': page['parent']} for page in deel]).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('X-WP-TotalPages', str(-(-len(pages) // per_page)))
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    page_listings.clear()
+    yield f"http://127.0.0.1:{server.server_address[1]}", listings
+    page_listings.clear()
+    server.shutdown()
+    server.server_close()
+
+
+def site(url):
+    return SimpleNamespace(website_url=url, site_name=url.rsplit('/', 1)[1], username='admin', app_password='x')
+
+
+def test_discover_page_ids(wp_server):
+    base, listings = wp_server
+    configs = [site(f"{base}/{naam}") for naam in ('een', 'dubbel', 'geen', 'veel', 'kapot')]
+    resultaten = discover_page_ids(configs, title_pattern='links')
+
+    assert [result['website_url'] for result in resultaten] == [config.website_url for config in configs]
+    assert [(result['status'], result['page_id']) for result in resultaten] == [
+        ('found', 11), ('ambiguous', None), ('not_found', None), ('found', 150), ('error', None)]
+    # Twee listing pagina's voor /veel
+    assert listings.count('/veel') == 2
+
+    # Tweede run komt uit de cache, refresh haalt opnieuw op
+    discover_page_ids(configs[:1])
+    assert listings.count('/een') == 1
+    discover_page_ids(configs[:1], refresh=True)
+    assert listings.count('/een') == 2
+
+
+def test_listing_cache_verloopt(wp_server):
+    base, listings = wp_server
+    cache = PageListingCache(ttl_seconds=0)
+    config = site(f"{base}/een")
+    cache.get(config)
+    cache.get(config)
+    assert listings.count('/een') == 2
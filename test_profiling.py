@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests voor profileren per request (X-Profile) en van het hele proces (/debug/profile)
+"""
+
+import os
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+import index  # noqa: E402
+from utils import profiling  # noqa: E402
+from utils.profiling import CPROFILE_THREAD_NOTE, request_profile_mode  # noqa: E402
+
+TOKEN = 'geheim-token'
+
+
+def sync_endpoint():
+    time.sleep(0.05)
+    return {'ok': True}
+
+
+async def async_endpoint():
+    return {'ok': True}
+
+
+def test_request_profile_mode():
+    assert request_profile_mode('cprofile', sync_endpoint) == 'sampling'
+    assert request_profile_mode('cprofile', async_endpoint) == 'cprofile'
+    assert request_profile_mode('cprofile', None) == 'cprofile'
+    assert request_profile_mode('sampling', sync_endpoint) == 'sampling'
+    assert request_profile_mode('onbekend', sync_endpoint) == 'onbekend'
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, 'PROFILING_TOKEN', TOKEN)
+    monkeypatch.setattr(index, 'PROFILING_TOKEN', TOKEN)
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    routes = list(index.app.router.routes)
+    index.app.add_api_route('/test-sync', sync_endpoint)
+    yield TestClient(index.app)
+    index.app.router.routes[:] = routes
+
+
+def test_sync_endpoint_wordt_gesampled(client):
+    response = client.get('/test-sync', headers={'X-Profile': 'cprofile', 'X-Profile-Token': TOKEN})
+    assert response.json() == {'ok': True}
+    assert response.headers['X-Profile-Mode'] == 'sampling'
+    assert 'worker thread' in response.headers['X-Profile-Note']
+    assert response.headers['X-Profile-File'].endswith('.folded')
+    # De sampler ziet de worker thread waarin de endpoint draait
+    with open(response.headers['X-Profile-File'], encoding='utf-8') as file:
+        assert 'sync_endpoint' in file.read()
+
+
+def test_async_endpoint_met_cprofile(client):
+    response = client.get('/', headers={'X-Profile': 'cprofile', 'X-Profile-Token': TOKEN})
+    assert response.headers['X-Profile-Mode'] == 'cprofile'
+    assert response.headers['X-Profile-Note'] == CPROFILE_THREAD_NOTE
+    assert response.headers['X-Profile-File'].endswith('.pstats')
+
+
+def test_debug_profile_meldt_de_beperking_van_cprofile(client):
+    headers = {'X-Profile-Token': TOKEN}
+    cprofile = client.post('/debug/profile', params={'seconds': 0.05, 'mode': 'cprofile'}, headers=headers).json()
+    assert cprofile['note'] == CPROFILE_THREAD_NOTE
+    sampling = client.post('/debug/profile', params={'seconds': 0.05}, headers=headers).json()
+    assert sampling['mode'] == 'sampling' and sampling['note'] is None
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests voor het opsplitsen van volle link pagina's over vervolgpagina's (shards)
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils import wordpress  # noqa: E402
+from utils.config import WebsiteConfig  # noqa: E402
+
+
+class NepWordPress:
+    """Pagina's in het geheugen; net als WordPress krijgt een dubbele slug onder dezelfde parent een achtervoegsel"""
+
+    def __init__(self):
+        self.pages = {}
+        self.verwijderd = []
+        self.voor_aanmaken = None  # Wordt aangeroepen vlak voor een nieuwe pagina wordt aangemaakt
+        self.lock = threading.Lock()
+
+    def pagina(self, page_id, slug, title, content, status='publish', parent=0):
+        self.pages[page_id] = {'id': page_id, 'slug': slug, 'title': {'rendered': title},
+                               'content': {'raw': content}, 'status': status, 'parent': parent}
+        return self.pages[page_id]
+
+    def maak(self, slug, title, content, status, parent):
+        with self.lock:
+            uniek, nummer = slug, 2
+            while any(page['slug'] == uniek and page['parent'] == parent for page in self.pages.values()):
+                uniek, nummer = f"{slug}-{nummer}", nummer + 1
+            return self.pagina(max(self.pages) + 1, uniek, title, content, status, parent)
+
+
+@pytest.fixture
+def wp():
+    site = NepWordPress()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, data, status=200):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            match = re.search(r'/pages/(\d+)$', url.path)
+            if match:
+                return self._json(site.pages[int(match.group(1))])
+            query = parse_qs(url.query)
+            self._json([page for page in site.pages.values()
+                        if page['slug'] == query['slug'][0] and page['parent'] == int(query['parent'][0])])
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            match = re.search(r'/pages/(\d+)$', urlparse(self.path).path)
+            if match:
+                site.pages[int(match.group(1))]['content'] = {'raw': body['content']}
+                return self._json(site.pages[int(match.group(1))])
+            if site.voor_aanmaken:
+                site.voor_aanmaken()
+            self._json(site.maak(body['slug'], body['title'], body['content'], body['status'], body['parent']), 201)
+
+        def do_DELETE(self):
+            page_id = int(re.search(r'/pages/(\d+)', self.path).group(1))
+            site.verwijderd.append(site.pages.pop(page_id)['id'])
+            self._json({'deleted': True})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def gepubliceerd(monkeypatch):
+    """Vervolgpagina's die de listeners doorgeven (zoals record_continuation_page in de API)"""
+    lijsten = []
+    monkeypatch.setattr(wordpress, '_shard_listeners', [lambda config, page_ids: lijsten.append(page_ids)])
+    return lijsten
+
+
+def config_voor(wp, **extra):
+    return WebsiteConfig(wp.url, 1, 'admin', 'geheim', 'Test', max_page_bytes=300, **extra)
+
+
+def voeg_toe(config, *urls):
+    return wordpress.add_links_to_page(config, [(f"Anker {url}", url) for url in urls], timeout=5)
+
+
+def test_kleine_pagina_blijft_een_pagina(wp, gepubliceerd):
+    wp.pagina(1, 'links', 'Links', 'x' * 50)
+    result = voeg_toe(config_voor(wp), 'https://a.nl')[0]
+    assert (result.success, result.link_added, result.page_id) == (True, True, 1)
+    assert 'https://a.nl' in wp.pages[1]['content']['raw']
+    assert gepubliceerd == []
+
+
+def test_volle_pagina_krijgt_een_vervolgpagina(wp, gepubliceerd):
+    wp.pagina(1, 'links', 'Links', 'x' * 280, status='private')
+    config = config_voor(wp)
+    result = voeg_toe(config, 'https://a.nl')[0]
+
+    shard = wp.pages[result.page_id]
+    assert result.success and result.link_added and result.page_id != 1
+    assert (shard['slug'], shard['title']['rendered'], shard['parent']) == ('links-2', 'Links (2)', 1)
+    # Zelfde status als de pagina waar de keten op verder gaat
+    assert shard['status'] == 'private'
+    assert 'https://a.nl' in shard['content']['raw']
+    assert wp.pages[1]['content']['raw'] == 'x' * 280
+    assert gepubliceerd == [[shard['id']]]
+    # De config zelf is niet aangepast; het proces onthoudt de keten
+    assert config.continuation_page_ids == []
+    assert wordpress.shard_page_ids(config) == [1, shard['id']]
+
+
+def test_status_uit_de_omgeving(wp, gepubliceerd, monkeypatch):
+    monkeypatch.setattr(wordpress, 'PAGE_SHARD_STATUS', 'draft')
+    wp.pagina(1, 'links', 'Links', 'x' * 280)
+    result = voeg_toe(config_voor(wp), 'https://a.nl')[0]
+    assert wp.pages[result.page_id]['status'] == 'draft'
+
+
+def test_bestaande_vervolgpagina_wordt_gevonden(wp, gepubliceerd):
+    """Een vervolgpagina die niet in de config staat wordt op slug gevonden in plaats van opnieuw gemaakt"""
+    wp.pagina(1, 'links', 'Links', 'x' * 280)
+    wp.pagina(5, 'links-2', 'Links (2)', '<a href="https://oud.nl">Oud</a>', parent=1)
+    resultaten = voeg_toe(config_voor(wp), 'https://oud.nl', 'https://a.nl')
+    assert [(result.page_id, result.link_added) for result in resultaten] == [(5, False), (5, True)]
+    assert sorted(wp.pages) == [1, 5]
+    assert gepubliceerd == [[5]]
+
+
+def test_links_op_volle_paginas_tellen_mee(wp, gepubliceerd):
+    wp.pagina(1, 'links', 'Links', '<a href="https://al.nl">Al</a>' + 'x' * 250)
+    wp.pagina(5, 'links-2', 'Links (2)', '', parent=1)
+    config = config_voor(wp, continuation_page_ids=[5])
+    resultaten = voeg_toe(config, 'https://al.nl', 'https://nieuw.nl')
+    assert [(result.page_id, result.link_added) for result in resultaten] == [(5, False), (5, True)]
+    assert 'https://al.nl' not in wp.pages[5]['content']['raw']
+
+
+def test_gelijktijdig_aangemaakte_vervolgpagina(wp, gepubliceerd):
+    """Een ander proces maakt dezelfde vervolgpagina net eerder: de eigen kopie verdwijnt, de links gaan naar de eerste"""
+    wp.pagina(1, 'links', 'Links', 'x' * 280)
+
+    def ander_proces():
+        wp.voor_aanmaken = None
+        wp.maak('links-2', 'Links (2)', '<a href="https://ander.nl">Ander</a>', 'publish', 1)
+    wp.voor_aanmaken = ander_proces
+
+    result = voeg_toe(config_voor(wp), 'https://a.nl')[0]
+    winnaar = [page for page in wp.pages.values() if page['slug'] == 'links-2']
+    assert len(winnaar) == 1 and result.page_id == winnaar[0]['id']
+    assert 'https://a.nl' in winnaar[0]['content']['raw'] and 'https://ander.nl' in winnaar[0]['content']['raw']
+    assert len(wp.verwijderd) == 1 and sorted(wp.pages) == [1, winnaar[0]['id']]
+    assert gepubliceerd == [[winnaar[0]['id']]]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests voor de gedeelde config (SQLite) tussen uvicorn workers
+Elke ConfigStore met een eigen SharedConfig staat voor een worker proces
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils.config import WebsiteConfig  # noqa: E402
+from utils.config_snapshot import ConfigStore, with_continuation_pages  # noqa: E402
+from utils.shared_config import SharedConfig  # noqa: E402
+
+
+def website(url, page_id=1):
+    return WebsiteConfig(url, page_id, 'admin', 'geheim', url.split('//')[1])
+
+
+SEED = [website('https://a.nl'), website('https://b.nl')]
+
+
+@pytest.fixture
+def worker(tmp_path):
+    pad = str(tmp_path / 'config.db')
+
+    def nieuwe_worker():
+        return ConfigStore(shared=SharedConfig(pad), factory=lambda data: WebsiteConfig(**data))
+    return nieuwe_worker
+
+
+def urls(snapshot):
+    return [config.website_url for config in snapshot]
+
+
+def test_tweede_worker_neemt_de_gedeelde_config_over(worker):
+    eerste, tweede = worker(), worker()
+    eerste.seed(SEED, 'start', 'test')
+    eerste.update(lambda snapshot: tuple(snapshot) + (website('https://c.nl'),))
+
+    # Zelfde seed (zelfde deployment): de wijziging van de eerste worker blijft staan
+    snapshot = tweede.seed(SEED, 'start', 'test')
+    assert urls(snapshot) == ['https://a.nl', 'https://b.nl', 'https://c.nl']
+    assert snapshot.version == eerste.current.version == 2
+
+
+def test_nieuwe_seed_vervangt_de_gedeelde_config(worker):
+    eerste, tweede = worker(), worker()
+    eerste.seed(SEED, 'start', 'test')
+    eerste.update(lambda snapshot: tuple(snapshot) + (website('https://c.nl'),))
+    snapshot = tweede.seed([website('https://nieuw.nl')], 'deploy', 'test')
+    assert urls(snapshot) == ['https://nieuw.nl']
+    assert urls(eerste.refresh()) == ['https://nieuw.nl']
+
+
+def test_refresh_volgt_andere_workers(worker):
+    eerste, tweede = worker(), worker()
+    eerste.seed(SEED, 'start', 'test')
+    tweede.seed(SEED, 'start', 'test')
+    oud = tweede.current
+
+    eerste.replace([website('https://a.nl')])
+    # Zonder wijziging is refresh dezelfde snapshot
+    assert eerste.refresh() is eerste.current
+    nieuw = tweede.refresh()
+    assert nieuw is not oud and urls(nieuw) == ['https://a.nl']
+    assert nieuw.version == eerste.current.version
+
+
+def test_updates_van_workers_worden_samengevoegd(worker):
+    """Een update werkt op de laatste stand in de database, ook als de worker die nog niet zag"""
+    eerste, tweede = worker(), worker()
+    eerste.seed(SEED, 'start', 'test')
+    tweede.seed(SEED, 'start', 'test')
+    config = eerste.current.lookup('https://a.nl')
+
+    eerste.update(lambda snapshot: with_continuation_pages(snapshot, config, [11]))
+    tweede.update(lambda snapshot: with_continuation_pages(snapshot, config, [12]))
+    assert tweede.current.lookup('https://a.nl').continuation_page_ids == [11, 12]
+    assert eerste.refresh().lookup('https://a.nl').continuation_page_ids == [11, 12]
+
+
+def test_gelijktijdige_updates_van_meerdere_workers(worker):
+    workers = [worker() for _ in range(4)]
+    for store in workers:
+        store.seed(SEED, 'start', 'test')
+
+    def voeg_toe(store, i):
+        store.update(lambda snapshot: tuple(snapshot) + (website(f'https://site{i}.nl'),))
+
+    threads = [threading.Thread(target=voeg_toe, args=(workers[i % 4], i)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(workers[0].refresh()) == 14
+    assert {store.refresh().version for store in workers} == {13}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests voor SingleFlight: gelijktijdige page fetches delen één request
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils.singleflight import SingleFlight  # noqa: E402
+
+
+def test_gelijktijdige_aanroepen_delen_een_uitvoering():
+    group = SingleFlight()
+    gestart = threading.Event()
+    doorgaan = threading.Event()
+    aanroepen = []
+
+    def fetch():
+        aanroepen.append(1)
+        gestart.set()
+        doorgaan.wait(5)
+        return {'id': 7}
+
+    resultaten = []
+    leider = threading.Thread(target=lambda: resultaten.append(group.do('pagina', fetch)))
+    leider.start()
+    assert gestart.wait(5)
+    volgers = [threading.Thread(target=lambda: resultaten.append(group.do('pagina', fetch))) for _ in range(4)]
+    for thread in volgers:
+        thread.start()
+    time.sleep(0.1)
+    doorgaan.set()
+    for thread in [leider] + volgers:
+        thread.join(5)
+
+    assert len(aanroepen) == 1
+    assert sorted(shared for _, shared in resultaten) == [False, True, True, True, True]
+    assert all(result == {'id': 7} for result, _ in resultaten)
+
+
+def test_niets_gecachet_na_afloop():
+    group = SingleFlight()
+    teller = iter(range(10))
+    assert group.do('a', lambda: next(teller)) == (0, False)
+    assert group.do('a', lambda: next(teller)) == (1, False)
+    # Andere keys lopen los van elkaar
+    assert group.do('b', lambda: 'b') == ('b', False)
+
+
+def test_fout_gaat_naar_alle_wachtenden_en_niet_verder():
+    group = SingleFlight()
+
+    def kapot():
+        raise TimeoutError('WordPress traag')
+
+    with pytest.raises(TimeoutError):
+        group.do('a', kapot)
+    assert group.do('a', lambda: 'opnieuw') == ('opnieuw', False)
+
+
+def test_forget_start_een_nieuwe_fetch():
+    """Na een schrijfactie mag een volgende lezer de oude, lopende fetch niet delen"""
+    group = SingleFlight()
+    gestart = threading.Event()
+    doorgaan = threading.Event()
+
+    def oude_fetch():
+        gestart.set()
+        doorgaan.wait(5)
+        return 'oud'
+
+    resultaten = {}
+    leider = threading.Thread(target=lambda: resultaten.setdefault('leider', group.do('pagina', oude_fetch)))
+    leider.start()
+    assert gestart.wait(5)
+
+    group.forget('pagina')
+    assert group.do('pagina', lambda: 'nieuw') == ('nieuw', False)
+
+    doorgaan.set()
+    leider.join(5)
+    assert resultaten['leider'] == ('oud', False)
+    # De afgeronde oude fetch ruimt de nieuwe registratie niet op en laat niets achter
+    assert group.do('pagina', lambda: 'daarna') == ('daarna', False)
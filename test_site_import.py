@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests voor het normaliseren van website URLs bij het importeren van het site-overzicht
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils import site_import  # noqa: E402
+from utils.site_import import DUPLICATE, EXISTS, VALID, import_overview, normalize_site_url, site_key  # noqa: E402
+
+
+@pytest.mark.parametrize("invoer, verwacht", [
+    ("www.site.nl/", "https://www.site.nl"),
+    ("HTTPS://WWW.SITE.NL", "https://www.site.nl"),
+    ("  http://Site.nl  ", "http://site.nl"),
+    ("https://www.site.nl/wp-admin/", "https://www.site.nl"),
+    ("https://site.nl/wp-admin/post.php?post=12&action=edit", "https://site.nl"),
+    ("https://site.nl/wp-json/wp/v2/pages", "https://site.nl"),
+    ("https://site.nl/wp-login.php", "https://site.nl"),
+    # WordPress in een submap: het pad blijft, met zijn hoofdletters
+    ("Site.nl/Blog/", "https://site.nl/Blog"),
+    ("https://Site.nl/blog/wp-admin/", "https://site.nl/blog"),
+    ("https://site.nl:8443/wp/", "https://site.nl:8443/wp"),
+    ("https://site.nl/?p=1#top", "https://site.nl"),
+])
+def test_normalize_site_url(invoer, verwacht):
+    assert normalize_site_url(invoer) == verwacht
+
+
+@pytest.mark.parametrize("invoer", ["", "   ", None, "https://"])
+def test_normalize_site_url_leeg(invoer):
+    assert normalize_site_url(invoer) == ""
+
+
+def test_site_key():
+    assert site_key("https://www.site.nl/") == site_key("site.nl") == site_key("http://SITE.nl") == "site.nl"
+    assert site_key("https://site.nl/Blog/wp-admin/") == "site.nl/blog"
+    assert site_key("https://site.nl/blog") != site_key("https://site.nl")
+
+
+def overzicht(*urls):
+    regels = ["Website URL;Pagina ID;Gebruikersnaam;Application Password;Label"]
+    regels += [f"{url};12;admin;geheim;Site {i}" for i, url in enumerate(urls)]
+    return [regel + "\n" for regel in regels]
+
+
+def test_submappen_zijn_aparte_sites(monkeypatch):
+    """Een tweede WordPress installatie op hetzelfde domein is geen dubbele rij"""
+    monkeypatch.setattr(site_import, "verify_site", lambda row, timeout: {"status": VALID, "message": "ok"})
+    geconfigureerd = {site_key("https://site.nl")}
+    result = import_overview(
+        overzicht("https://site.nl/blog", "https://www.site.nl/blog/", "https://site.nl/shop", "https://site.nl"),
+        is_configured=lambda url: site_key(url) in geconfigureerd,
+    )
+    assert [entry["status"] for entry in result["report"]] == [VALID, DUPLICATE, VALID, EXISTS]
+    assert [row["website_url"] for row in result["valid"]] == ["https://site.nl/blog", "https://site.nl/shop"]
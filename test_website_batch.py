@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests voor het in één keer toevoegen, wijzigen en verwijderen van websites
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils.website_batch import plan_website_batch  # noqa: E402
+
+
+def site(url, naam=''):
+    return SimpleNamespace(website_url=url, site_name=naam or url)
+
+
+def build(data, previous):
+    return site(data['website_url'], data.get('site_name', ''))
+
+
+def test_batch_volgorde_verwijderen_wijzigen_toevoegen():
+    configs = [site('https://a.nl'), site('https://b.nl')]
+    nieuw, resultaten = plan_website_batch(
+        configs,
+        add=[{'website_url': 'https://a.nl'}, {'website_url': 'https://c.nl'}],
+        update=[{'original_url': 'https://b.nl', 'website_url': 'https://www.b.nl/'}],
+        delete=['https://www.a.nl', 'https://onbekend.nl'],
+        build=build,
+    )
+    # Het domein van a.nl is eerst vrijgemaakt en kan daarna opnieuw worden toegevoegd
+    assert [(r['action'], r['success']) for r in resultaten] == [
+        ('delete', True), ('delete', False), ('update', True), ('add', True), ('add', True)]
+    assert [config.website_url for config in nieuw] == ['https://www.b.nl/', 'https://a.nl', 'https://c.nl']
+
+
+def test_dubbel_domein_raakt_de_eerste_config():
+    """Net als WebsiteIndex.lookup wint de eerste config voor een domein"""
+    configs = [site('https://a.nl', 'Eerste'), site('https://www.a.nl', 'Tweede')]
+    nieuw, _ = plan_website_batch(configs, update=[
+        {'original_url': 'https://a.nl', 'website_url': 'https://a.nl', 'site_name': 'Gewijzigd'}], build=build)
+    assert [config.site_name for config in nieuw] == ['Gewijzigd', 'Tweede']
+
+    nieuw, _ = plan_website_batch(configs, delete=['https://a.nl'], build=build)
+    assert [config.site_name for config in nieuw] == ['Tweede']
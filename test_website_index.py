@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests voor de website index achter /websites: zoeken, opzoeken en cursor paginering
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api'))
+
+from utils.website_index import WebsiteIndex, decode_cursor, encode_cursor  # noqa: E402
+
+
+def site(url, name):
+    return SimpleNamespace(website_url=url, site_name=name)
+
+
+@pytest.fixture
+def index():
+    return WebsiteIndex([
+        site("https://www.zonnepanelen.nl", "Zonnepanelen Expert"),
+        site("https://allincv.nl", "AllInCV"),
+        site("https://www.aluminiumbedrijf.nl", "Aluminium Bedrijf"),
+        site("https://am-team.nl", "AM Team"),
+        site("https://asbestcrew.nl", "Asbest Crew"),
+        site("https://www.am-team.nl", "AM Team (www)"),
+    ], version=7)
+
+
+def urls(entries):
+    return [entry.website_url for entry in entries]
+
+
+def test_gesorteerd_op_domein(index):
+    assert urls(index.entries) == [
+        "https://allincv.nl", "https://www.aluminiumbedrijf.nl", "https://am-team.nl",
+        "https://www.am-team.nl", "https://asbestcrew.nl", "https://www.zonnepanelen.nl",
+    ]
+
+
+def test_korte_zoekopdracht_gebruikt_prefix(index):
+    """Minder dan 3 tekens: prefix van domein of naam (www. en schema tellen niet mee)"""
+    assert urls(index.entries[pos] for pos in index.search("al")) == [
+        "https://allincv.nl", "https://www.aluminiumbedrijf.nl"]
+    assert urls(index.entries[pos] for pos in index.search("https://www.am")) == [
+        "https://am-team.nl", "https://www.am-team.nl"]
+    assert index.search("zz") == []
+
+
+def test_lange_zoekopdracht_zoekt_in_de_tekst(index):
+    assert urls(index.entries[pos] for pos in index.search("crew")) == ["https://asbestcrew.nl"]
+    assert urls(index.entries[pos] for pos in index.search("BEDRIJF")) == ["https://www.aluminiumbedrijf.nl"]
+    assert index.search("nergens") == []
+
+
+def test_lookup_exact_en_op_domein(index):
+    assert index.lookup("https://www.am-team.nl").site_name == "AM Team (www)"
+    # Onbekende variant: het eerste geconfigureerde item voor het domein
+    assert index.lookup("http://am-team.nl/contact").site_name == "AM Team"
+    assert index.lookup("https://onbekend.nl") is None
+    assert index.lookup("") is None
+
+
+def test_cursor_paginering_loopt_alles_af(index):
+    gezien, cursor = [], None
+    while True:
+        entries, cursor, total = index.page(cursor=cursor, limit=4)
+        gezien.extend(urls(entries))
+        assert total == 6
+        if cursor is None:
+            break
+    assert gezien == urls(index.entries)
+
+
+def test_cursor_paginering_met_zoekopdracht(index):
+    entries, cursor, total = index.page(query="am", limit=1)
+    assert (urls(entries), total) == (["https://am-team.nl"], 2)
+    entries, cursor, total = index.page(query="am", cursor=cursor, limit=1)
+    assert urls(entries) == ["https://www.am-team.nl"]
+    assert cursor is None
+
+
+def test_cursor_blijft_geldig_na_wijziging():
+    """Een cursor is de sleutel van het laatste item, geen positie: toevoegingen verschuiven niets"""
+    oud = WebsiteIndex([site("https://a.nl", "A"), site("https://c.nl", "C"), site("https://d.nl", "D")])
+    _, cursor, _ = oud.page(limit=2)
+    nieuw = WebsiteIndex([site("https://a.nl", "A"), site("https://b.nl", "B"),
+                          site("https://c.nl", "C"), site("https://d.nl", "D")])
+    entries, _, _ = nieuw.page(cursor=cursor, limit=2)
+    assert urls(entries) == ["https://d.nl"]
+
+
+def test_cursor_codering():
+    assert decode_cursor(encode_cursor(("a.nl", "https://a.nl"))) == ("a.nl", "https://a.nl")
+    with pytest.raises(ValueError):
+        decode_cursor("geen-cursor")